@@ -0,0 +1,195 @@
+"""Load-test the REST API on catalogues of increasing size and record
+throughput, p50/p99 latency and queries per request for every endpoint.
+
+    python -m benchmarks.bench_api --items 1000 10000 100000 --output api.json
+    python -m benchmarks.bench_api --database default --items 1000000
+
+Catalogues are seeded in one throwaway database, topped up from one size to
+the next. Every item gets --fan-out of --suppliers suppliers, and names are
+drawn from a small vocabulary so searches match a fixed share of the
+catalogue. Read endpoints are measured 'warm' (the catalogue cache is kept
+between requests) and 'cold' (it is cleared before each one, so every request
+reaches the database). Requests are sent in process by an admin user, with
+--seed making the catalogue and request order reproducible.
+
+The JSON output records the commit and database it ran against, so runs can
+be diffed across commits.
+"""
+import argparse
+import platform
+import random
+import subprocess
+import time
+
+from benchmarks import common
+
+ADJECTIVES = ['red', 'steel', 'large', 'compact', 'wooden', 'spare', 'heavy', 'quiet']
+NOUNS = ['bolt', 'hinge', 'valve', 'bracket', 'pump', 'filter', 'bearing', 'cable']
+SEARCHES = ['steel', 'steel bolt', 'pum']
+BATCH_SIZE = 5000
+
+
+def seed_suppliers(count):
+    from inventory.models import Supplier
+
+    Supplier.objects.bulk_create(
+        Supplier(name=f'Supplier {i}', contact=f'{i:010d}', email=f'supplier{i}@example.com')
+        for i in range(1, count + 1)
+    )
+    return list(Supplier.objects.values_list('pk', flat=True))
+
+
+def seed_items(start, stop, supplier_pks, fan_out, rng):
+    # Adds items start..stop-1 and their supplier links in batches.
+    from inventory.models import Item
+
+    Link = Item.suppliers.through
+    for first in range(start, stop, BATCH_SIZE):
+        last = min(first + BATCH_SIZE, stop)
+        Item.objects.bulk_create(
+            Item(item_id=i, name=f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}', quantityInStock=10 ** 9,
+                 quantitySold=0, revenue=0, price=rng.randint(100, 10000) / 100)
+            for i in range(first, last)
+        )
+        pks = Item.objects.filter(item_id__gte=first, item_id__lt=last).values_list('pk', flat=True)
+        Link.objects.bulk_create(
+            Link(item_id=pk, supplier_id=supplier_pk)
+            for pk in pks
+            for supplier_pk in rng.sample(supplier_pks, min(fan_out, len(supplier_pks)))
+        )
+
+
+def refresh_derived_data():
+    # bulk_create skips the signals that keep these up to date.
+    from django.core.cache import cache
+
+    from inventory.search import get_search_backend
+    from inventory.stock_report import rebuild_report
+
+    get_search_backend().rebuild()
+    rebuild_report()
+    cache.clear()
+
+
+def run(send, paths, requests, cold):
+    from django.core.cache import cache
+
+    durations = []
+    queries = 0
+    sizes = 0
+    send(paths[0])
+    for i in range(requests):
+        if cold:
+            cache.clear()
+        with common.count_queries() as captured:
+            elapsed, response = common.timed(send, paths[i % len(paths)])
+        assert response.status_code == 200, (paths[i % len(paths)], response.status_code)
+        durations.append(elapsed)
+        queries += len(captured)
+        sizes += len(response.content)
+    return dict(common.summarize(durations), queries_per_request=queries / requests,
+                bytes_per_response=sizes / requests)
+
+
+def read_endpoints(pks, rng):
+    sample = rng.sample(pks, min(100, len(pks)))
+    return {
+        'item_list': ['/api/items/?page_size=20'],
+        'item_list_page_100': ['/api/items/?page_size=100'],
+        'item_detail': [f'/api/items/{pk}/' for pk in sample],
+        'item_search': [f'/api/items/?search={query}&page_size=20' for query in SEARCHES],
+        'supplier_list': ['/api/suppliers/'],
+        'stock_report': ['/stock_report/'],
+    }
+
+
+def run_purchases(client, pks, basket_size, baskets, rng):
+    from django.core.cache import cache
+
+    baskets = [
+        {'purchases': [{'item_id': pk, 'quantity': 1} for pk in rng.sample(pks, basket_size)]}
+        for _ in range(baskets)
+    ]
+    durations = []
+    queries = 0
+    for basket in baskets:
+        with common.count_queries() as captured:
+            elapsed, response = common.timed(client.put, '/api/purchase/', basket, format='json')
+        assert response.status_code == 200, response.status_code
+        durations.append(elapsed)
+        queries += len(captured)
+    cache.clear()
+    return dict(common.summarize(durations), queries_per_basket=queries / len(baskets))
+
+
+def environment(database):
+    import django
+    from django.db import connection
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=common.BASE_DIR).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'database': database,
+        'vendor': connection.vendor,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    common.add_arguments(parser)
+    parser.add_argument('--items', type=int, nargs='+', default=[1000, 10000], help='Catalogue sizes to measure.')
+    parser.add_argument('--suppliers', type=int, default=50)
+    parser.add_argument('--fan-out', type=int, default=3, help='Suppliers per item.')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint and cache mode.')
+    parser.add_argument('--basket-sizes', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--baskets', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    common.setup_django(args.database)
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from rest_framework.test import APIClient
+
+    from inventory.models import Item
+
+    settings.ALLOWED_HOSTS = ['*']
+    rng = random.Random(args.seed)
+    results = {
+        'suppliers': args.suppliers, 'fan_out': args.fan_out, 'requests': args.requests,
+        'baskets': args.baskets, 'seed': args.seed, 'runs': [],
+    }
+    with common.test_database():
+        results['environment'] = environment(args.database)
+        supplier_pks = seed_suppliers(args.suppliers)
+        client = APIClient()
+        client.force_authenticate(user=User.objects.create_user(username='bench', password='bench', is_staff=True))
+        seeded = 0
+        for size in sorted(args.items):
+            started = time.perf_counter()
+            seed_items(seeded + 1, size + 1, supplier_pks, args.fan_out, rng)
+            refresh_derived_data()
+            seeded = size
+            run_results = {'items': size, 'seed_seconds': time.perf_counter() - started, 'endpoints': {}}
+            pks = list(Item.objects.values_list('pk', flat=True))
+            for name, paths in read_endpoints(pks, rng).items():
+                run_results['endpoints'][name] = {
+                    'warm': run(client.get, paths, args.requests, cold=False),
+                    'cold': run(client.get, paths, args.requests, cold=True),
+                }
+            run_results['purchase'] = {
+                f'basket_{basket_size}': run_purchases(client, pks, basket_size, args.baskets, rng)
+                for basket_size in args.basket_sizes
+            }
+            results['runs'].append(run_results)
+    common.report(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""Load test the sync DRF endpoints under a WSGI worker against their async
+counterparts under an ASGI worker, at high concurrency.
+
+    python -m benchmarks.bench_asgi --concurrency 200 --requests 2000 --client-delay 0.05
+
+Each server is a single worker process (a gunicorn sync worker, uvicorn)
+against the same seeded database. Every request opens its own connection and,
+with --client-delay, sends the first half of its request, waits, then sends
+the rest, like a slow mobile client. The sync list and detail views answer
+from the catalogue cache after the first hit; the async ones always read the
+database.
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+from benchmarks import common
+
+SERVERS = {
+    'wsgi': ['gunicorn', 'inventory_management.wsgi:application', '--workers', '1',
+             '--bind', '127.0.0.1:{port}', '--backlog', '4096', '--timeout', '300'],
+    'asgi': ['uvicorn', 'inventory_management.asgi:application', '--workers', '1',
+             '--port', '{port}', '--backlog', '4096', '--no-access-log'],
+}
+
+ENDPOINTS = {
+    'wsgi': {
+        'list': ('GET', '/api/items/?page_size=20'),
+        'detail': ('GET', '/api/items/{pk}/'),
+        'purchase': ('PUT', '/api/purchase/'),
+    },
+    'asgi': {
+        'list': ('GET', '/api/async/items/?page_size=20'),
+        'detail': ('GET', '/api/async/items/{pk}/'),
+        'purchase': ('PUT', '/api/async/purchase/'),
+    },
+}
+
+
+def seed(count):
+    from django.contrib.auth.models import User
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from inventory.models import Item
+
+    Item.objects.bulk_create(
+        Item(item_id=i, name=f'Item {i}', quantityInStock=10 ** 9, quantitySold=0, revenue=0, price=9.99)
+        for i in range(1, count + 1)
+    )
+    user = User.objects.create_user(username='bench', password='bench')
+    return list(Item.objects.values_list('pk', flat=True)), str(AccessToken.for_user(user))
+
+
+@contextmanager
+def bench_database(database):
+    # Yields the environment that points the server processes at the
+    # seeded database.
+    from django.core.management import call_command
+    from django.db import connection
+
+    if database == 'sqlite':
+        call_command('migrate', verbosity=0)
+        yield {'BENCH_SQLITE_PATH': os.environ['BENCH_SQLITE_PATH']}
+    else:
+        with common.test_database():
+            yield {'BENCH_DB_NAME': connection.settings_dict['NAME']}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def server(kind, env):
+    port = free_port()
+    command = [sys.executable, '-m'] + [part.format(port=port) for part in SERVERS[kind]]
+    process = subprocess.Popen(
+        command, cwd=common.BASE_DIR, env=dict(os.environ, **env),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                break
+            except OSError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError(f'{kind} server did not start: {" ".join(command)}')
+                time.sleep(0.1)
+        yield port
+    finally:
+        process.terminate()
+        process.wait()
+
+
+async def send(port, method, path, body, token, delay):
+    start = time.perf_counter()
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        request = (
+            f'{method} {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n'
+            f'Authorization: Bearer {token}\r\nContent-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n\r\n'
+        ).encode() + body
+        if delay:
+            writer.write(request[:len(request) // 2])
+            await writer.drain()
+            await asyncio.sleep(delay)
+            request = request[len(request) // 2:]
+        writer.write(request)
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        status = int(response.split(b' ', 2)[1]) if response else 0
+    except (OSError, ValueError, IndexError):
+        status = 0
+    return time.perf_counter() - start, status
+
+
+async def load(port, method, path, pks, token, concurrency, total, delay):
+    durations = []
+    errors = 0
+    remaining = total
+
+    async def client():
+        nonlocal errors, remaining
+        while remaining > 0:
+            remaining -= 1
+            pk = random.choice(pks)
+            body = f'{{"purchases": [{{"item_id": {pk}, "quantity": 1}}]}}'.encode() if method == 'PUT' else b''
+            elapsed, status = await send(port, method, path.format(pk=pk), body, token, delay)
+            durations.append(elapsed)
+            if not 200 <= status < 300:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    return {
+        'count': len(durations),
+        'errors': errors,
+        'throughput_per_sec': len(durations) / wall,
+        'p50_ms': common.percentile(durations, 50) * 1000,
+        'p90_ms': common.percentile(durations, 90) * 1000,
+        'p99_ms': common.percentile(durations, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    common.add_arguments(parser)
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=2000, help='Requests per endpoint and server.')
+    parser.add_argument('--client-delay', type=float, default=0.0,
+                        help='Seconds each client pauses halfway through sending its request.')
+    parser.add_argument('--purchase-mode', choices=['pessimistic', 'optimistic'], default='optimistic',
+                        help='The ASGI server runs each request in its own thread, and on SQLite concurrent '
+                             'pessimistic baskets fail to upgrade their read locks.')
+    parser.add_argument('--servers', nargs='+', choices=list(SERVERS), default=list(SERVERS))
+    parser.add_argument('--endpoints', nargs='+', choices=['list', 'detail', 'purchase'],
+                        default=['list', 'detail', 'purchase'])
+    args = parser.parse_args()
+
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'benchmarks.server_settings'
+    tmpdir = tempfile.TemporaryDirectory()
+    if args.database == 'sqlite':
+        os.environ['BENCH_SQLITE_PATH'] = os.path.join(tmpdir.name, 'bench.sqlite3')
+    common.setup_django('default')
+
+    results = {
+        'items': args.items,
+        'concurrency': args.concurrency,
+        'requests': args.requests,
+        'client_delay': args.client_delay,
+        'purchase_mode': args.purchase_mode,
+        'servers': {},
+    }
+    with tmpdir, bench_database(args.database) as env:
+        pks, token = seed(args.items)
+        env['PYTHONPATH'] = str(common.BASE_DIR)
+        env['INVENTORY_PURCHASE_MODE'] = args.purchase_mode
+        for kind in args.servers:
+            results['servers'][kind] = {}
+            with server(kind, env) as port:
+                for endpoint in args.endpoints:
+                    method, path = ENDPOINTS[kind][endpoint]
+                    results['servers'][kind][endpoint] = asyncio.run(load(
+                        port, method, path, pks, token, args.concurrency, args.requests, args.client_delay,
+                    ))
+    common.report(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
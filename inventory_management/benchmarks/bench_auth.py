@@ -0,0 +1,80 @@
+"""Compare queries per request and throughput of JWT authentication that loads
+the user on every request against the stateless claims-based path.
+
+    python -m benchmarks.bench_auth --requests 2000
+
+Both token kinds are sent to the same endpoints in process. The catalogue
+reads answer from the catalogue cache after the first hit, so what is left
+of each request is mostly authentication.
+"""
+import argparse
+
+from benchmarks import common
+
+ENDPOINTS = {
+    'list': '/api/items/?page_size=20',
+    'detail': '/api/items/{pk}/',
+    'supplier_list': '/api/suppliers/',
+}
+
+
+def seed(count):
+    from django.contrib.auth.models import User
+
+    from inventory.models import Item, Supplier
+
+    Item.objects.bulk_create(
+        Item(item_id=i, name=f'Item {i}', quantityInStock=100, quantitySold=0, revenue=0, price=9.99)
+        for i in range(1, count + 1)
+    )
+    Supplier.objects.create(name='Supplier', contact='1234567890', email='supplier@example.com')
+    user = User.objects.create_user(username='bench', password='bench', is_staff=True)
+    return Item.objects.values_list('pk', flat=True).first(), user
+
+
+def run(client, path, requests):
+    durations = []
+    queries = 0
+    client.get(path)
+    for _ in range(requests):
+        with common.count_queries() as captured:
+            elapsed, response = common.timed(client.get, path)
+        assert response.status_code == 200, response.status_code
+        durations.append(elapsed)
+        queries += len(captured)
+    return dict(common.summarize(durations), queries_per_request=queries / requests)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    common.add_arguments(parser)
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=1000, help='Requests per endpoint and token kind.')
+    args = parser.parse_args()
+
+    common.setup_django(args.database)
+    from django.conf import settings
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from inventory.authentication import InventoryTokenObtainPairSerializer
+
+    settings.ALLOWED_HOSTS = ['*']
+    results = {'items': args.items, 'requests': args.requests, 'endpoints': {}}
+    with common.test_database():
+        pk, user = seed(args.items)
+        tokens = {
+            'user_lookup': str(AccessToken.for_user(user)),
+            'stateless': str(InventoryTokenObtainPairSerializer.get_token(user).access_token),
+        }
+        for name, path in ENDPOINTS.items():
+            results['endpoints'][name] = {}
+            for kind, token in tokens.items():
+                client = APIClient()
+                client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+                results['endpoints'][name][kind] = run(client, path.format(pk=pk), args.requests)
+    common.report(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
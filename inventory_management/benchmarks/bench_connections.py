@@ -0,0 +1,136 @@
+"""Measure what connection handling adds to each request: a new connection
+per request, persistent connections and the shared connection pool.
+
+    python -m benchmarks.bench_connections --database default --threads 1 8 --pool-size 4
+
+A request is what Django does around a view: close_if_unusable_or_obsolete
+when it starts and finishes, with one query in between. Each thread serves
+--requests requests with its own connection handler, as a threaded worker
+does.
+
+  connect     CONN_MAX_AGE = 0, a new connection (and handshake) per request
+  persistent  CONN_MAX_AGE = 60 with health checks, one connection per thread
+  pool        inventory.pool with --pool-size connections shared by the threads
+
+'connections' counts the connections opened. With more threads than pool
+connections, 'waits' counts the requests that waited for one. SQLite opens
+a connection in microseconds, so only --database default (MySQL) shows the
+handshake being saved.
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from benchmarks import common
+
+
+def wrapper_class(mode):
+    from django.db import connection
+    from django.db.utils import load_backend
+
+    backend = load_backend(connection.settings_dict['ENGINE'])
+    if mode != 'pool':
+        return backend.DatabaseWrapper
+    if connection.vendor == 'mysql':
+        return load_backend('inventory.pooled_mysql').DatabaseWrapper
+
+    from inventory.pool import PooledDatabaseWrapperMixin
+
+    return type('DatabaseWrapper', (PooledDatabaseWrapperMixin, backend.DatabaseWrapper), {})
+
+
+def serve(connection):
+    connection.close_if_unusable_or_obsolete()
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+    connection.close_if_unusable_or_obsolete()
+
+
+def run(mode, threads, requests, directory):
+    from django.db import connection
+    from django.db.backends.signals import connection_created
+
+    from inventory import pool
+
+    settings_dict = {
+        **connection.settings_dict,
+        'CONN_MAX_AGE': 60 if mode == 'persistent' else 0,
+        'CONN_HEALTH_CHECKS': mode != 'connect',
+    }
+    if connection.vendor == 'sqlite':
+        # Django never closes in-memory SQLite connections.
+        settings_dict['NAME'] = os.path.join(directory, 'bench.sqlite3')
+    DatabaseWrapper = wrapper_class(mode)
+    pool.pools.clear()
+    opened = []
+    durations = [[] for _ in range(threads)]
+    start = threading.Barrier(threads)
+
+    def count(sender, **kwargs):
+        opened.append(1)
+
+    def work(samples):
+        handler = DatabaseWrapper(dict(settings_dict), alias=f'bench_{mode}')
+        start.wait()
+        try:
+            for _ in range(requests):
+                began = time.perf_counter()
+                serve(handler)
+                samples.append(time.perf_counter() - began)
+        finally:
+            handler.close()
+
+    connection_created.connect(count)
+    workers = [threading.Thread(target=work, args=(samples,)) for samples in durations]
+    began = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - began
+    connection_created.disconnect(count)
+
+    result = common.summarize([duration for samples in durations for duration in samples])
+    result['p50_us'] = result.pop('p50_ms') * 1000
+    result['p99_us'] = result.pop('p99_ms') * 1000
+    result['wall_per_sec'] = result['count'] / elapsed
+    # The pool reconnects handlers to the same connections, counted again.
+    result['connections'] = sum(p.open + p.discarded for p in pool.pools.values()) if mode == 'pool' else len(opened)
+    if mode == 'pool':
+        result['waits'] = sum(p.waits for p in pool.pools.values())
+        result['timeouts'] = sum(p.timeouts for p in pool.pools.values())
+        for connection_pool in pool.pools.values():
+            while connection_pool.idle:
+                connection_pool.discard(connection_pool.idle.pop())
+        pool.pools.clear()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    common.add_arguments(parser)
+    parser.add_argument('--requests', type=int, default=2000, help='Requests per thread.')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--pool-size', type=int, default=4)
+    parser.add_argument('--modes', nargs='+', default=['connect', 'persistent', 'pool'])
+    args = parser.parse_args()
+
+    common.setup_django(args.database)
+    from django.conf import settings
+
+    settings.INVENTORY_DB_POOL_SIZE = args.pool_size
+    results = {'requests': args.requests, 'pool_size': args.pool_size, 'runs': []}
+    with tempfile.TemporaryDirectory() as directory:
+        for threads in args.threads:
+            results['runs'].append({
+                'threads': threads,
+                **{mode: run(mode, threads, args.requests, directory) for mode in args.modes},
+            })
+    common.report(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Measure concurrent purchases end to end, through PUT /api/purchase/, when
+every basket buys the same item against baskets spread over the catalogue.
+
+    python -m benchmarks.bench_hot_item --database default --threads 16 --modes pessimistic optimistic
+
+Every thread sends single-item baskets with its own client, and so runs its
+own transactions on its own database connection. A purchase takes the
+item's stock from its row and adds to its quantitySold and revenue there, so
+purchases of one item serialize on that row: 'hot' against 'spread' shows
+what that costs. Row locks need --database default (MySQL): SQLite locks the
+whole database for every write, so there the threads take turns in both
+workloads.
+"""
+import argparse
+import random
+import threading
+import time
+
+from benchmarks import common
+
+
+def seed(count):
+    from django.contrib.auth.models import User
+
+    from inventory.models import Item
+
+    Item.objects.bulk_create(
+        Item(item_id=i, name=f'Item {i}', quantityInStock=10 ** 9, quantitySold=0, revenue=0, price=9.99)
+        for i in range(1, count + 1)
+    )
+    return list(Item.objects.order_by('pk').values_list('pk', flat=True)), User.objects.create_user(username='bench')
+
+
+def run(user, pick, threads, baskets):
+    from django.db import connections
+    from rest_framework.test import APIClient
+
+    durations = [[] for _ in range(threads)]
+    rejected = [0] * threads
+    start = threading.Barrier(threads)
+
+    def work(number):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        rng = random.Random(number)
+        try:
+            start.wait()
+            for _ in range(baskets):
+                basket = {'purchases': [{'item_id': pick(rng), 'quantity': 1}]}
+                began = time.perf_counter()
+                response = client.put('/api/purchase/', basket, format='json')
+                if response.status_code != 200:
+                    # Conflicts after purchase_items ran out of retries, and
+                    # on SQLite a locked database.
+                    rejected[number] += 1
+                    continue
+                durations[number].append(time.perf_counter() - began)
+        finally:
+            connections.close_all()
+
+    workers = [threading.Thread(target=work, args=(number,)) for number in range(threads)]
+    began = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - began
+
+    result = common.summarize([duration for samples in durations for duration in samples])
+    result['wall_per_sec'] = result['count'] / elapsed
+    result['rejected'] = sum(rejected)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    common.add_arguments(parser)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--baskets', type=int, default=100, help='Baskets per thread.')
+    parser.add_argument('--items', type=int, default=1000, help='Catalogue size the spread baskets pick from.')
+    parser.add_argument('--modes', nargs='+', default=['pessimistic', 'optimistic'])
+    args = parser.parse_args()
+
+    common.setup_django(args.database)
+    from django.conf import settings
+    from django.db.models import Sum
+
+    from inventory.models import Item, SaleLine
+
+    settings.ALLOWED_HOSTS = ['*']
+    results = {'threads': args.threads, 'baskets': args.baskets, 'items': args.items, 'runs': []}
+    with common.test_database():
+        pks, user = seed(args.items)
+        workloads = {'hot': lambda rng: pks[0], 'spread': lambda rng: rng.choice(pks)}
+        for mode in args.modes:
+            settings.INVENTORY_PURCHASE_MODE = mode
+            results['runs'].append({
+                'mode': mode,
+                **{name: run(user, pick, args.threads, args.baskets) for name, pick in workloads.items()},
+            })
+        # Every accepted basket is counted exactly once, on the items and in
+        # the ledger.
+        results['sold'] = Item.objects.aggregate(total=Sum('quantitySold'))['total']
+        results['ledger_sold'] = SaleLine.objects.aggregate(total=Sum('quantity'))['total']
+        results['expected_sold'] = sum(run_results[name]['count'] for run_results in results['runs'] for name in workloads)
+    common.report(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
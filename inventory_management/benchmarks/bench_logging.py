@@ -0,0 +1,104 @@
+"""Compare what a logger.info call costs the calling thread with the original
+synchronous handlers against the queue and listener thread from settings.
+
+    python -m benchmarks.bench_logging --records 20000 --threads 1 4 16
+
+'sync' is the original setup, a console StreamHandler and a FileHandler both
+written on the calling thread. 'queue' sends the same records through
+inventory.log.QueueListenerHandler to the console and the rotating JSON file.
+The console output goes to a file too, so the terminal does not skew the
+numbers. Each thread logs --records records; per-call latency is measured
+on the logging threads, 'drain_ms' is how long the listener then took to
+write out the backlog.
+"""
+import argparse
+import logging
+import logging.handlers
+import os
+import tempfile
+import threading
+import time
+
+from benchmarks import common
+
+VERBOSE = '{levelname} {asctime} {module} {message}'
+
+
+def sync_handlers(directory):
+    console = logging.StreamHandler(open(os.path.join(directory, 'sync-console.log'), 'w'))
+    console.setFormatter(logging.Formatter(VERBOSE, style='{'))
+    file = logging.FileHandler(os.path.join(directory, 'sync.log'))
+    file.setFormatter(logging.Formatter(VERBOSE, style='{'))
+    return [console, file]
+
+
+def queue_handler(directory, queue_size):
+    from inventory.log import JSONFormatter, QueueListenerHandler
+
+    console = logging.StreamHandler(open(os.path.join(directory, 'queue-console.log'), 'w'))
+    console.setFormatter(logging.Formatter(VERBOSE, style='{'))
+    file = logging.handlers.WatchedFileHandler(os.path.join(directory, 'queue.log'))
+    file.setFormatter(JSONFormatter())
+    return QueueListenerHandler([console, file], queue_size=queue_size)
+
+
+def run(handlers, threads, records):
+    logger = logging.getLogger('benchmarks.logging')
+    logger.handlers = handlers
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+
+    durations = [[] for _ in range(threads)]
+    start = threading.Barrier(threads)
+
+    def log(samples):
+        start.wait()
+        for i in range(records):
+            began = time.perf_counter()
+            logger.info(f'User bench is making a purchase of item {i}')
+            samples.append(time.perf_counter() - began)
+
+    workers = [threading.Thread(target=log, args=(samples,)) for samples in durations]
+    began = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - began
+
+    result = common.summarize([duration for samples in durations for duration in samples])
+    result['p50_us'] = result.pop('p50_ms') * 1000
+    result['p99_us'] = result.pop('p99_ms') * 1000
+    result['wall_records_per_sec'] = threads * records / elapsed
+    drain = getattr(handlers[0], 'drain', None)
+    if drain:
+        drained, _ = common.timed(drain)
+        result['drain_ms'] = drained * 1000
+        result['dropped'] = handlers[0].dropped
+    for handler in handlers:
+        handler.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=20000, help='Records logged per thread.')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--queue-size', type=int, default=10000)
+    parser.add_argument('--output', help='Write the results as JSON to this file.')
+    args = parser.parse_args()
+
+    common.setup_django('sqlite')
+    results = {'records': args.records, 'queue_size': args.queue_size, 'runs': []}
+    with tempfile.TemporaryDirectory() as directory:
+        for threads in args.threads:
+            results['runs'].append({
+                'threads': threads,
+                'sync': run(sync_handlers(directory), threads, args.records),
+                'queue': run([queue_handler(directory, args.queue_size)], threads, args.records),
+            })
+    common.report(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
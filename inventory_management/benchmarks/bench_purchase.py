@@ -0,0 +1,77 @@
+"""Compare queries-per-basket and throughput of the pessimistic and optimistic
+purchase modes against the original one-item-at-a-time loop.
+
+    python -m benchmarks.bench_purchase --items 2000 --basket-sizes 1 10 50
+"""
+import argparse
+import random
+
+from benchmarks import common
+
+
+def legacy_purchase(purchases):
+    # The PurchaseAPIView.put loop this engine replaced, kept for comparison.
+    from inventory.models import Item
+
+    bill = 0
+    for purchase in purchases:
+        item = Item.objects.get(pk=purchase['item_id'])
+        quantity = purchase['quantity']
+        if item.quantityInStock < quantity:
+            continue
+        item.quantityInStock -= quantity
+        item.quantitySold += quantity
+        item.revenue += quantity * item.price
+        bill += quantity * item.price
+        item.save()
+    return bill
+
+
+def seed(count):
+    from inventory.models import Item
+
+    Item.objects.bulk_create(
+        Item(item_id=i, name=f'Item {i}', quantityInStock=10 ** 9, quantitySold=0, revenue=0, price=9.99)
+        for i in range(1, count + 1)
+    )
+    return list(Item.objects.values_list('pk', flat=True))
+
+
+def run(purchase, pks, basket_size, baskets):
+    durations = []
+    queries = 0
+    for _ in range(baskets):
+        basket = [{'item_id': pk, 'quantity': 1} for pk in random.sample(pks, basket_size)]
+        with common.count_queries() as captured:
+            elapsed, _ = common.timed(purchase, basket)
+        durations.append(elapsed)
+        queries += len(captured)
+    return dict(common.summarize(durations), queries_per_basket=queries / baskets)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    common.add_arguments(parser)
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--basket-sizes', type=int, nargs='+', default=[1, 5, 20, 100])
+    parser.add_argument('--baskets', type=int, default=200)
+    args = parser.parse_args()
+
+    common.setup_django(args.database)
+    from inventory.purchases import OPTIMISTIC, PESSIMISTIC, purchase_items
+
+    results = {'items': args.items, 'baskets': args.baskets, 'runs': []}
+    with common.test_database():
+        pks = seed(args.items)
+        for size in args.basket_sizes:
+            results['runs'].append({
+                'basket_size': size,
+                'legacy_loop': run(legacy_purchase, pks, size, args.baskets),
+                'pessimistic': run(lambda basket: purchase_items(basket, PESSIMISTIC), pks, size, args.baskets),
+                'optimistic': run(lambda basket: purchase_items(basket, OPTIMISTIC), pks, size, args.baskets),
+            })
+    common.report(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Measure rows per second through the catalogue serializers and through
+their row plans (inventory.rows), and through both JSON renderers.
+
+    python -m benchmarks.bench_serializers --rows 1000 10000 --repeat 5
+
+For each serializer, 'serializer' fetches model instances (with the same
+queryset as the list endpoint) and runs serializer(many=True).data, 'rows'
+fetches values() and runs the plan. 'render' times rendering the plan's
+output with DRF's JSONRenderer and with FastJSONRenderer. Every run checks
+that both ways produce the same bytes.
+"""
+import argparse
+import random
+
+from benchmarks import common
+from benchmarks.bench_api import seed_items, seed_suppliers
+
+
+def querysets():
+    from inventory.models import Item, Supplier
+    from inventory.serializers import ItemAdminSerializer, ItemCustomerSerializer, SupplierSerializer
+
+    return {
+        'item_customer': (ItemCustomerSerializer, Item.objects.only('id', 'item_id', 'name', 'price').order_by('id')),
+        'item_admin': (ItemAdminSerializer, Item.objects.prefetch_related('suppliers').order_by('id')),
+        'supplier': (SupplierSerializer, Supplier.objects.order_by('id')),
+    }
+
+
+def rows_per_sec(fn, rows, repeat):
+    durations = [common.timed(fn)[0] for _ in range(repeat)]
+    return rows / common.percentile(durations, 50)
+
+
+def measure(serializer_class, queryset, rows, repeat):
+    from rest_framework.renderers import JSONRenderer
+
+    from inventory.renderers import FastJSONRenderer
+    from inventory.rows import plan_for
+
+    queryset = queryset[:rows]
+    plan = plan_for(serializer_class)
+
+    def through_serializer():
+        return serializer_class(list(queryset), many=True).data
+
+    def through_plan():
+        return plan.represent(list(plan.values(queryset)), queryset.db)
+
+    data = through_plan()
+    identical = JSONRenderer().render(through_serializer()) == FastJSONRenderer().render(data)
+    with common.count_queries() as queries:
+        through_plan()
+    return {
+        'rows': len(data),
+        'identical': identical,
+        'rows_queries': len(queries),
+        'serializer_rows_per_sec': rows_per_sec(through_serializer, len(data), repeat),
+        'rows_rows_per_sec': rows_per_sec(through_plan, len(data), repeat),
+        'render_json_rows_per_sec': rows_per_sec(lambda: JSONRenderer().render(data), len(data), repeat),
+        'render_fast_rows_per_sec': rows_per_sec(lambda: FastJSONRenderer().render(data), len(data), repeat),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    common.add_arguments(parser)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--suppliers', type=int, default=50)
+    parser.add_argument('--fan-out', type=int, default=3, help='Suppliers per item.')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    common.setup_django(args.database)
+    results = {'suppliers': args.suppliers, 'fan_out': args.fan_out, 'repeat': args.repeat, 'runs': []}
+    with common.test_database():
+        supplier_pks = seed_suppliers(args.suppliers)
+        seed_items(1, max(args.rows) + 1, supplier_pks, args.fan_out, random.Random(args.seed))
+        for rows in args.rows:
+            run = {'rows': rows}
+            for name, (serializer_class, queryset) in querysets().items():
+                run[name] = measure(serializer_class, queryset, rows, args.repeat)
+            results['runs'].append(run)
+    common.report(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
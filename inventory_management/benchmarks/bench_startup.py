@@ -0,0 +1,94 @@
+"""Measure how long a fresh process takes to become ready to serve, phase by
+phase, as a gunicorn worker (or the preloading master) does.
+
+    python -m benchmarks.bench_startup --runs 10 --top 15
+
+--settings names another settings module (it must be importable from the
+current directory or PYTHONPATH); the backend of its default database is
+imported during setup.
+
+Each run starts a new interpreter and times:
+
+  settings  importing inventory_management.settings
+  setup     django.setup(): apps, models and logging
+  urlconf   importing the URLconf, and with it the views
+  wsgi      building the WSGI application, which loads the middleware
+
+'total' is the sum, interpreter start-up excluded. 'slowest_imports' comes
+from one extra run under python -X importtime: the modules that took the
+most time to import themselves, their own imports excluded.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks import common
+
+STARTUP = """
+import importlib, json, os, time
+os.environ.setdefault('DJANGO_DB_NAME', 'inventory_db')
+phases = {}
+began = time.perf_counter()
+importlib.import_module(os.environ['DJANGO_SETTINGS_MODULE'])
+phases['settings'] = time.perf_counter() - began
+began = time.perf_counter()
+import django
+django.setup()
+phases['setup'] = time.perf_counter() - began
+began = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+phases['urlconf'] = time.perf_counter() - began
+began = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+phases['wsgi'] = time.perf_counter() - began
+print(json.dumps(phases))
+"""
+
+
+def start(settings, *options):
+    environment = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings}
+    environment['PYTHONPATH'] = os.pathsep.join(filter(None, [str(common.BASE_DIR), os.getenv('PYTHONPATH')]))
+    return subprocess.run(
+        [sys.executable, *options, '-c', STARTUP],
+        cwd=common.BASE_DIR, env=environment, capture_output=True, text=True, check=True,
+    )
+
+
+def slowest_imports(stderr, top):
+    # Lines read 'import time: self [us] | cumulative | imported package'.
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, _, module = line[len('import time:'):].split('|')
+        imports.append((int(own), module.strip()))
+    imports.sort(reverse=True)
+    return [{'module': module, 'self_ms': own / 1000} for own, module in imports[:top]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--settings', default='inventory_management.settings')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--top', type=int, default=15, help='Slowest imports to list.')
+    parser.add_argument('--output', help='Write the results as JSON to this file.')
+    args = parser.parse_args()
+
+    runs = [json.loads(start(args.settings).stdout) for _ in range(args.runs)]
+    results = {'settings': args.settings, 'runs': args.runs, 'phases': {}}
+    for phase in [*runs[0], 'total']:
+        durations = [sum(run.values()) if phase == 'total' else run[phase] for run in runs]
+        results['phases'][phase] = {
+            'p50_ms': common.percentile(durations, 50) * 1000,
+            'max_ms': max(durations) * 1000,
+        }
+    results['slowest_imports'] = slowest_imports(start(args.settings, '-X', 'importtime').stderr, args.top)
+    common.report(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def add_arguments(parser):
+    parser.add_argument(
+        '--database', choices=['sqlite', 'default'], default='sqlite',
+        help="'sqlite' runs against an in-memory SQLite database, 'default' against a test "
+             "copy of the configured database.",
+    )
+    parser.add_argument('--output', help='Write the results as JSON to this file.')
+
+
+def setup_django(database='sqlite'):
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'inventory_management.settings')
+    os.environ.setdefault('DJANGO_DB_NAME', 'inventory_db')
+
+    import django
+    from django.conf import settings
+
+    if database == 'sqlite':
+        settings.DATABASES = {
+            'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'},
+        }
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    # Benchmarks seed and mutate data, so they always run against a throwaway
+    # test database rather than the configured one.
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+@contextmanager
+def count_queries():
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as context:
+        yield context
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(durations):
+    total = sum(durations)
+    return {
+        'count': len(durations),
+        'throughput_per_sec': len(durations) / total if total else 0.0,
+        'p50_ms': percentile(durations, 50) * 1000,
+        'p99_ms': percentile(durations, 99) * 1000,
+    }
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def report(results, output=None):
+    text = json.dumps(results, indent=2, default=str)
+    print(text)
+    if output:
+        Path(output).write_text(text + '\n')
@@ -0,0 +1,23 @@
+"""Settings for the servers that the HTTP benchmarks start: the project
+settings with DEBUG off, pointed at the benchmark's database."""
+import os
+
+os.environ.setdefault('DJANGO_DB_NAME', 'inventory_db')
+
+from inventory_management.settings import *  # noqa: E402,F401,F403
+
+DEBUG = False
+
+if os.environ.get('BENCH_SQLITE_PATH'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ['BENCH_SQLITE_PATH'],
+            'OPTIONS': {'timeout': 30},
+        },
+    }
+elif os.environ.get('BENCH_DB_NAME'):
+    DATABASES['default']['NAME'] = os.environ['BENCH_DB_NAME']
+
+# Per-request logging would dominate what is being measured.
+LOGGING['loggers']['']['level'] = 'WARNING'
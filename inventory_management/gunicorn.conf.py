@@ -0,0 +1,125 @@
+# Gunicorn settings for serving in production, read from the working
+# directory (the Dockerfile's CMD and docker-compose.yml run gunicorn here).
+# Environment variables override the defaults:
+#
+#   GUNICORN_BIND           address to listen on, 0.0.0.0:8000
+#   GUNICORN_WORKERS        worker processes, by default tuned to the cores
+#   GUNICORN_THREADS        threads per sync worker, 1
+#   GUNICORN_WORKER_CLASS   'sync', or 'uvicorn.workers.UvicornWorker' to
+#                           serve inventory_management.asgi:application
+#
+# The app is loaded once in the master before it forks the workers, so the
+# workers start with Django set up and the URLconf and views imported.
+#
+# State the workers must share lives outside them: the cache (set
+# DJANGO_REDIS_URL, more than one worker is refused with the local-memory
+# cache), request metrics (INVENTORY_METRICS_DIR, added up by /metrics) and
+# the log file (appended to by every worker, rotated with logrotate).
+import math
+import os
+import shutil
+import sys
+
+
+def _cpu_quota():
+    # The CPU limit of the container (cgroup v2, then v1), or None. CPU
+    # affinity does not reflect it.
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+    except (OSError, ValueError):
+        try:
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+                quota = f.read().strip()
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+                period = f.read().strip()
+        except OSError:
+            return None
+    if quota in ('max', '-1'):
+        return None
+    return max(1, math.ceil(int(quota) / int(period)))
+
+
+def _cores():
+    try:
+        # The CPUs this process may run on.
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+    return min(cores, _cpu_quota() or cores)
+
+
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+asgi = worker_class.startswith('uvicorn')
+
+wsgi_app = 'inventory_management.asgi:application' if asgi else 'inventory_management.wsgi:application'
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+# Sync workers block on the database, so there are more of them than cores;
+# an event loop per core is enough for ASGI workers.
+workers = int(os.getenv('GUNICORN_WORKERS', 0)) or (_cores() if asgi else 2 * _cores() + 1)
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+preload_app = True
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+# Workers are replaced after this many requests, at staggered times, which
+# bounds how far their memory can grow.
+max_requests = 10000
+max_requests_jitter = 1000
+
+accesslog = '-'
+errorlog = '-'
+
+
+def on_starting(server):
+    # Runs in the master once the app is loaded, before listening.
+    from django.conf import settings
+    from django.core.cache import caches
+    from django.core.cache.backends.locmem import LocMemCache
+
+    if server.num_workers > 1 and isinstance(caches['default'], LocMemCache):
+        sys.exit(
+            f'Refusing to start {server.num_workers} workers with the per process local-memory cache: '
+            'set DJANGO_REDIS_URL, or GUNICORN_WORKERS=1.'
+        )
+    if server.num_workers > 1 and not settings.INVENTORY_METRICS_DIR:
+        server.log.warning('INVENTORY_METRICS_DIR is not set, /metrics will only show the worker serving it')
+    if settings.INVENTORY_METRICS_DIR:
+        # Metrics of a previous run.
+        shutil.rmtree(settings.INVENTORY_METRICS_DIR, ignore_errors=True)
+        os.makedirs(settings.INVENTORY_METRICS_DIR)
+
+
+def when_ready(server):
+    # Runs in the master once the app is loaded and before any worker is
+    # forked: import what Django would otherwise import on the first request
+    # of every worker.
+    from django.urls import get_resolver
+
+    get_resolver().reverse_dict
+
+
+def pre_fork(server, worker):
+    # Database connections opened while loading belong to the master and
+    # must not be shared with the workers.
+    from django.db import connections
+
+    connections.close_all()
+
+
+def worker_exit(server, worker):
+    # Runs in the worker as it exits: its last requests go into the metrics.
+    from django.conf import settings
+
+    from inventory.metrics import registry
+
+    if settings.INVENTORY_METRICS_DIR:
+        registry.flush()
+
+
+def child_exit(server, worker):
+    # Runs in the master once a worker has exited.
+    from inventory.metrics import registry
+
+    registry.retire(worker.pid)
@@ -0,0 +1,122 @@
+import json
+import logging
+import urllib.request
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import STOCK_HEADROOM, Item, StockAlert, Supplier
+
+logger = logging.getLogger('inventory')
+
+ALERT_ITEM_FIELDS = ('id', 'item_id', 'name', 'quantityInStock', 'reorderThreshold')
+
+
+class LogAlertSink:
+    def send(self, alert):
+        supplier = alert['supplier']['name'] if alert['supplier'] else 'items without a supplier'
+        stock = ', '.join(f'{item["name"]} ({item["quantityInStock"]}/{item["reorderThreshold"]})' for item in alert['items'])
+        logger.warning(f'Reorder alert for {supplier}: {stock}')
+
+
+class FileAlertSink:
+    # Appends every alert to INVENTORY_STOCK_ALERT_FILE as a line of JSON.
+    def send(self, alert):
+        with open(settings.INVENTORY_STOCK_ALERT_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(alert) + '\n')
+
+
+class WebhookAlertSink:
+    # POSTs every alert as JSON to INVENTORY_STOCK_ALERT_WEBHOOK_URL.
+    def send(self, alert):
+        request = urllib.request.Request(
+            settings.INVENTORY_STOCK_ALERT_WEBHOOK_URL,
+            data=json.dumps(alert).encode(),
+            headers={'Content-Type': 'application/json'},
+            method='POST',
+        )
+        with urllib.request.urlopen(request, timeout=10):
+            pass
+
+
+ALERT_SINKS = {'log': LogAlertSink, 'file': FileAlertSink, 'webhook': WebhookAlertSink}
+
+
+def get_alert_sink():
+    sink = getattr(settings, 'INVENTORY_STOCK_ALERT_SINK', 'log')
+    if sink in ALERT_SINKS:
+        return ALERT_SINKS[sink]()
+    return import_string(sink)()
+
+
+def record_crossings(sales, sold):
+    # Called by the purchase engine inside its transaction with the sales it
+    # passed to record_sales and the units sold per item. Queues an alert for
+    # every item the basket took from its reorder threshold or above to below
+    # it, so an item is alerted once per crossing however often it sells. The
+    # suppliers are only looked up when a threshold is crossed.
+    crossed = [(item_id, stock, threshold) for item_id, stock, _, _, threshold in sales
+               if stock < threshold <= stock + sold[item_id]]
+    if not crossed:
+        return
+    suppliers = defaultdict(list)
+    links = Item.suppliers.through.objects.filter(item_id__in=[item_id for item_id, _, _ in crossed])
+    for item_id, supplier_id in links.values_list('item_id', 'supplier_id'):
+        suppliers[item_id].append(supplier_id)
+    StockAlert.objects.bulk_create([
+        StockAlert(item_id=item_id, supplier_id=supplier_id, quantityInStock=stock, reorderThreshold=threshold)
+        for item_id, stock, threshold in crossed
+        for supplier_id in suppliers.get(item_id, [None])
+    ])
+
+
+def supplier_alert(supplier_id, item_ids):
+    # The supplier's alert, listing each of the items once with its current
+    # stock, or None when all of them have been restocked since. Items
+    # without a supplier share an alert with supplier None.
+    items = list(
+        Item.objects.alias(headroom=STOCK_HEADROOM).filter(pk__in=item_ids, headroom__lt=0)
+        .order_by('id').values(*ALERT_ITEM_FIELDS)
+    )
+    if not items:
+        return None
+    supplier = None
+    if supplier_id is not None:
+        supplier = Supplier.objects.values('id', 'name', 'email').get(pk=supplier_id)
+    return {'supplier': supplier, 'items': items}
+
+
+def deliver_alerts(batch_size=None, sink=None):
+    # Sends the queued crossings to the alert sink and returns the number
+    # delivered. Each supplier's crossings are sent and marked in a short
+    # transaction of their own, up to batch_size at a time, so a failed
+    # delivery only leaves the crossings not yet delivered queued for the
+    # next run. Crossings locked by another running worker are skipped.
+    sink = sink or get_alert_sink()
+    batch_size = batch_size or settings.INVENTORY_STOCK_ALERT_BATCH_SIZE
+    pending = StockAlert.objects.filter(delivered_at__isnull=True)
+    suppliers = set(pending.values_list('supplier_id', flat=True).distinct())
+    delivered = 0
+    for supplier_id in sorted(suppliers, key=lambda supplier_id: (supplier_id is None, supplier_id)):
+        while True:
+            with transaction.atomic():
+                crossings = list(
+                    pending.select_for_update(skip_locked=True)
+                    .filter(supplier=supplier_id)
+                    .order_by('delivered_at', 'supplier', 'id')
+                    .values_list('id', 'item_id')[:batch_size]
+                )
+                if not crossings:
+                    break
+                alert = supplier_alert(supplier_id, {item_id for _, item_id in crossings})
+                if alert is not None:
+                    sink.send(alert)
+                StockAlert.objects.filter(pk__in=[pk for pk, _ in crossings]).update(delivered_at=timezone.now())
+            delivered += len(crossings)
+            logger.info(f'Delivered {len(crossings)} stock alerts to supplier {supplier_id}')
+            if len(crossings) < batch_size:
+                break
+    return delivered
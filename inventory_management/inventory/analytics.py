@@ -0,0 +1,131 @@
+import re
+from datetime import timedelta, timezone
+
+from django.conf import settings
+from django.db.models import Q, Sum
+from django.utils import timezone as django_timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ItemSalesBucket
+from .sales import bucket_start
+
+WINDOW_RE = re.compile(r'^(\d+)([hd])$')
+HOUR = timedelta(hours=1)
+DAY = timedelta(days=1)
+STEPS = {ItemSalesBucket.HOUR: HOUR, ItemSalesBucket.DAY: DAY}
+
+
+class AnalyticsError(Exception):
+    pass
+
+
+def _parse_time(value, name):
+    moment = parse_datetime(value)
+    if moment is None:
+        raise AnalyticsError(f'{name} must be an ISO 8601 date and time')
+    if django_timezone.is_naive(moment):
+        moment = django_timezone.make_aware(moment, timezone.utc)
+    return moment
+
+
+def parse_window(params):
+    # Either ?window=<n>h|<n>d ending now, or ?start=&end= (end defaults to
+    # now). Returns the window rounded out to whole hours, as buckets are.
+    end = _parse_time(params['end'], 'end') if params.get('end') else django_timezone.now()
+    if params.get('start'):
+        start = _parse_time(params['start'], 'start')
+    else:
+        match = WINDOW_RE.match(params.get('window', '24h'))
+        if not match:
+            raise AnalyticsError('window must look like 1h, 24h or 30d')
+        start = end - int(match.group(1)) * (HOUR if match.group(2) == 'h' else DAY)
+
+    start = bucket_start(start)
+    if bucket_start(end) != end:
+        end = bucket_start(end) + HOUR
+    if start >= end:
+        raise AnalyticsError('start must be before end')
+    return start, end
+
+
+def window_filter(start, end):
+    # Whole days inside the window are read from the daily buckets and only
+    # the partial days at either edge from the hourly ones, so a window
+    # touches O(days + 48) buckets per item however long it is.
+    first_day = bucket_start(start, ItemSalesBucket.DAY)
+    if first_day < start:
+        first_day += DAY
+    last_day = bucket_start(end, ItemSalesBucket.DAY)
+    if first_day >= last_day:
+        return Q(granularity=ItemSalesBucket.HOUR, start__gte=start, start__lt=end)
+    return (
+        Q(granularity=ItemSalesBucket.DAY, start__gte=first_day, start__lt=last_day)
+        | Q(granularity=ItemSalesBucket.HOUR, start__gte=start, start__lt=first_day)
+        | Q(granularity=ItemSalesBucket.HOUR, start__gte=last_day, start__lt=end)
+    )
+
+
+def _revenue(value):
+    return f'{value:.2f}'
+
+
+def top_items(start, end, order, limit):
+    rows = (
+        ItemSalesBucket.objects.filter(window_filter(start, end))
+        .values('item', 'item__item_id', 'item__name')
+        .annotate(quantity=Sum('quantity'), revenue=Sum('revenue'))
+        .order_by(f'-{order}', 'item')[:limit]
+    )
+    return [
+        {
+            'id': row['item'],
+            'item_id': row['item__item_id'],
+            'name': row['item__name'],
+            'quantity': row['quantity'],
+            'revenue': _revenue(row['revenue']),
+        }
+        for row in rows
+    ]
+
+
+def sales_summary(start, end, limit):
+    return {
+        'start': start,
+        'end': end,
+        'by_revenue': top_items(start, end, 'revenue', limit),
+        'by_quantity': top_items(start, end, 'quantity', limit),
+    }
+
+
+def item_series(item, start, end, granularity=None):
+    # One point per bucket in the window, zero when nothing sold. Windows up
+    # to two days default to hourly points, longer ones to daily points.
+    if granularity is None:
+        granularity = ItemSalesBucket.HOUR if end - start <= 2 * DAY else ItemSalesBucket.DAY
+    if granularity not in STEPS:
+        raise AnalyticsError(f'granularity must be one of {", ".join(STEPS)}')
+    step = STEPS[granularity]
+    first = bucket_start(start, granularity)
+    max_points = settings.INVENTORY_ANALYTICS_MAX_POINTS
+    if (end - first) / step > max_points:
+        raise AnalyticsError(f'The window has more than {max_points} {granularity} buckets')
+
+    sold = {
+        when: (quantity, revenue)
+        for when, quantity, revenue in ItemSalesBucket.objects.filter(
+            item=item, granularity=granularity, start__gte=first, start__lt=end,
+        ).values_list('start', 'quantity', 'revenue')
+    }
+    series = []
+    moment = first
+    while moment < end:
+        quantity, revenue = sold.get(moment, (0, 0))
+        series.append({'start': moment, 'quantity': quantity, 'revenue': _revenue(revenue)})
+        moment += step
+    return {
+        'item': {'id': item.pk, 'item_id': item.item_id, 'name': item.name},
+        'granularity': granularity,
+        'start': start,
+        'end': end,
+        'series': series,
+    }
@@ -0,0 +1,133 @@
+import json
+import logging
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser, User
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_http_methods
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .authentication import InventoryTokenUser, aget_denylist, check_revoked, has_user_claims
+from .models import Item
+from .pagination import KeysetPagination
+from .purchases import apurchase_items, PurchaseError, PurchaseConflict
+from .search import ItemSearchFilter
+from .serializers import ItemAdminSerializer, ItemCustomerSerializer, PurchaseSerializer
+
+logger = logging.getLogger('inventory')
+
+# Native async counterparts of the catalogue reads and the purchase endpoint,
+# for serving under ASGI. They answer like the DRF views, authenticate with
+# the same JWTs and never block the event loop on the database.
+
+
+async def authenticate(request):
+    # Same as StatelessJWTAuthentication, on the event loop; only tokens
+    # issued without the user claims need the database.
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else None
+    if raw_token is None:
+        return AnonymousUser()
+    token = authentication.get_validated_token(raw_token)
+    check_revoked(token, await aget_denylist())
+    if has_user_claims(token):
+        return InventoryTokenUser(token)
+    try:
+        user = await User.objects.aget(**{jwt_settings.USER_ID_FIELD: token[jwt_settings.USER_ID_CLAIM]})
+    except (KeyError, User.DoesNotExist):
+        raise AuthenticationFailed('User not found', code='user_not_found')
+    if not user.is_active:
+        raise AuthenticationFailed('User is inactive', code='user_inactive')
+    return user
+
+
+def jwt_authenticated(view):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            request.user = await authenticate(request)
+        except AuthenticationFailed as e:
+            return JsonResponse({'detail': e.detail}, status=status.HTTP_401_UNAUTHORIZED)
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def is_admin(user):
+    return user.is_staff or user.is_superuser
+
+
+def catalogue(user):
+    # Same column selection as ItemDetailsViewSet.get_queryset for reads.
+    if is_admin(user):
+        return Item.objects.prefetch_related('suppliers'), ItemAdminSerializer
+    return Item.objects.only('id', 'item_id', 'name', 'price'), ItemCustomerSerializer
+
+
+class ItemListView:
+    # What KeysetPagination asks of the view: ItemSearchFilter, which orders
+    # searches by rank.
+    filter_backends = [ItemSearchFilter]
+
+
+@require_GET
+@jwt_authenticated
+async def item_list(request):
+    # The same ?search=, ?page_size= and cursor links as GET /api/items/.
+    # KeysetPagination fetches the page in the sync thread.
+    queryset, serializer_class = catalogue(request.user)
+    drf_request = Request(request)
+    queryset = ItemSearchFilter().filter_queryset(drf_request, queryset, ItemListView)
+    paginator = KeysetPagination()
+    page = await sync_to_async(paginator.paginate_queryset)(queryset, drf_request, ItemListView)
+    return JsonResponse({
+        'next': paginator.get_next_link(),
+        'previous': paginator.get_previous_link(),
+        'results': serializer_class(page, many=True).data,
+    })
+
+
+@require_GET
+@jwt_authenticated
+async def item_detail(request, pk):
+    queryset, serializer_class = catalogue(request.user)
+    try:
+        item = await queryset.aget(pk=pk)
+    except Item.DoesNotExist:
+        return JsonResponse({'detail': 'No Item matches the given query.'}, status=status.HTTP_404_NOT_FOUND)
+    return JsonResponse(serializer_class(item).data)
+
+
+@csrf_exempt
+@require_http_methods(['PUT'])
+@jwt_authenticated
+async def purchase(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=status.HTTP_401_UNAUTHORIZED)
+    logger.info(f'User {request.user} is making a purchase')
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'detail': 'JSON parse error'}, status=status.HTTP_400_BAD_REQUEST)
+    serializer = PurchaseSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        bill = await apurchase_items(serializer.validated_data['purchases'], user=request.user)
+    except PurchaseConflict as e:
+        return JsonResponse({'errors': e.errors}, status=status.HTTP_409_CONFLICT)
+    except PurchaseError as e:
+        return JsonResponse({'errors': e.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    logger.info(f'Purchase successful, Amount to pay: {bill}')
+    # DRF's encoder, which writes the Decimal bill as a number like the
+    # renderer of PurchaseAPIView does.
+    return JsonResponse({'message': 'Purchase successful.', 'AmountToPay': bill}, encoder=JSONEncoder)
@@ -0,0 +1,96 @@
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .models import TokenRevocation
+
+logger = logging.getLogger('inventory')
+
+# Claims copied from the user into every token, which is all the views and
+# permission classes read from request.user.
+USER_CLAIMS = ('username', 'is_staff', 'is_superuser')
+
+# {user id: revoked_at as a timestamp} of the revocations recent enough to
+# matter, shared through the cache.
+DENYLIST_KEY = 'auth:denylist'
+
+
+class InventoryTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        # Access tokens minted from this refresh token copy its claims.
+        token = super().get_token(user)
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
+
+class InventoryTokenUser(TokenUser):
+    def __str__(self):
+        return self.username
+
+
+def has_user_claims(token):
+    return all(claim in token for claim in USER_CLAIMS)
+
+
+def load_denylist():
+    # A token outlives its refresh token by at most one access token
+    # lifetime, so older revocations can no longer match anything.
+    horizon = timezone.now() - jwt_settings.REFRESH_TOKEN_LIFETIME - jwt_settings.ACCESS_TOKEN_LIFETIME
+    denylist = {
+        user_id: revoked_at.timestamp()
+        for user_id, revoked_at in TokenRevocation.objects.filter(revoked_at__gte=horizon)
+        .values_list('user_id', 'revoked_at')
+    }
+    cache.set(DENYLIST_KEY, denylist, settings.INVENTORY_TOKEN_DENYLIST_CACHE_TIMEOUT)
+    return denylist
+
+
+def get_denylist():
+    denylist = cache.get(DENYLIST_KEY)
+    return load_denylist() if denylist is None else denylist
+
+
+async def aget_denylist():
+    denylist = await cache.aget(DENYLIST_KEY)
+    return await sync_to_async(load_denylist)() if denylist is None else denylist
+
+
+def check_revoked(token, denylist):
+    # iat is in whole seconds, so a token issued in the second of the
+    # revocation is rejected too.
+    revoked_at = denylist.get(token.get(jwt_settings.USER_ID_CLAIM))
+    if revoked_at is not None and token.get('iat', 0) <= revoked_at:
+        raise AuthenticationFailed('Token has been revoked', code='token_revoked')
+
+
+def revoke_user_tokens(user_id):
+    # Rejects every token the user holds. Other processes drop their cached
+    # denylist within INVENTORY_TOKEN_DENYLIST_CACHE_TIMEOUT seconds when the
+    # cache is not shared.
+    TokenRevocation.objects.update_or_create(user_id=user_id, defaults={'revoked_at': timezone.now()})
+    cache.delete(DENYLIST_KEY)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: cache.delete(DENYLIST_KEY))
+    logger.info(f'Revoked the tokens of user {user_id}')
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    # Builds request.user from the token's claims instead of loading the
+    # user on every request. Tokens issued without the claims still load it.
+
+    def get_user(self, validated_token):
+        check_revoked(validated_token, get_denylist())
+        if has_user_claims(validated_token):
+            return InventoryTokenUser(validated_token)
+        return super().get_user(validated_token)
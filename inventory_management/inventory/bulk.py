@@ -0,0 +1,300 @@
+import logging
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Q
+from rest_framework import serializers
+
+from .cache import invalidate_catalogue
+from .models import Item, Supplier
+from .sales import adjust_opening_balances
+from .search import get_search_backend
+from .signals import SALES_FIELDS, muted_signals
+from .stock_report import rebuild_report
+
+logger = logging.getLogger('inventory')
+
+ITEM_FIELDS = ['item_id', 'name', 'quantityInStock', 'quantitySold', 'revenue', 'price', 'reorderThreshold']
+SUPPLIER_FIELDS = ['name', 'contact', 'email']
+
+
+class BulkError(Exception):
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+# Row serializers without the per-row database checks (unique validators and
+# supplier lookups); those run once per request as set-based queries instead.
+
+class BulkItemSerializer(serializers.ModelSerializer):
+    suppliers = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+    class Meta:
+        model = Item
+        fields = ITEM_FIELDS + ['suppliers']
+        extra_kwargs = {'item_id': {'validators': []}}
+
+
+class BulkSupplierSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Supplier
+        fields = SUPPLIER_FIELDS
+        extra_kwargs = {
+            'contact': {'validators': Supplier._meta.get_field('contact').validators},
+            'email': {'validators': []},
+        }
+
+
+def validate_rows(serializer_class, rows, partial=False, key=None):
+    # With key, every row must also hold an integer key that no other row of
+    # the payload has, which updates match rows on.
+    if not isinstance(rows, list):
+        raise BulkError([{'error': 'Expected a list of rows'}])
+    max_rows = settings.INVENTORY_BULK_MAX_ROWS
+    if len(rows) > max_rows:
+        raise BulkError([{'error': f'At most {max_rows} rows are accepted per request'}])
+
+    valid = []
+    errors = []
+    key_field = serializers.IntegerField(min_value=1)
+    for index, row in enumerate(rows):
+        serializer = serializer_class(data=row, partial=partial)
+        if not serializer.is_valid():
+            errors.append({'index': index, 'errors': serializer.errors})
+        elif key and key not in row:
+            errors.append({'index': index, 'errors': {key: ['This field is required.']}})
+        else:
+            data = dict(serializer.validated_data)
+            if key:
+                try:
+                    data[key] = key_field.run_validation(row[key])
+                except serializers.ValidationError as e:
+                    errors.append({'index': index, 'errors': {key: e.detail}})
+                    continue
+            valid.append((index, data))
+    if key:
+        errors += _duplicates(valid, key)
+    return valid, errors
+
+
+def _duplicates(rows, field):
+    # Rows whose value for field repeats an earlier row of the same payload.
+    seen = set()
+    errors = []
+    for index, data in rows:
+        value = data.get(field)
+        if value is None:
+            continue
+        if value in seen:
+            errors.append({'index': index, 'errors': {field: [f'Duplicate {field} in request: {value}']}})
+        seen.add(value)
+    return errors
+
+
+def _missing_suppliers(rows):
+    supplier_ids = {pk for _, data in rows for pk in data.get('suppliers', [])}
+    existing = set(Supplier.objects.filter(pk__in=supplier_ids).values_list('pk', flat=True))
+    errors = []
+    for index, data in rows:
+        missing = [pk for pk in data.get('suppliers', []) if pk not in existing]
+        if missing:
+            errors.append({'index': index, 'errors': {'suppliers': [f'Invalid pk "{pk}" - object does not exist.' for pk in missing]}})
+    return errors
+
+
+def _raise_errors(errors):
+    if errors:
+        errors.sort(key=lambda error: error.get('index', -1))
+        raise BulkError(errors)
+
+
+def _set_suppliers(item_suppliers):
+    # Replaces the suppliers of the given items through the M2M table in bulk.
+    # item_suppliers maps item pk to a list of supplier pks.
+    Through = Item.suppliers.through
+    Through.objects.filter(item_id__in=item_suppliers).delete()
+    Through.objects.bulk_create(
+        [Through(item_id=item_pk, supplier_id=supplier_pk)
+         for item_pk, supplier_pks in item_suppliers.items() for supplier_pk in set(supplier_pks)],
+        batch_size=settings.INVENTORY_BULK_BATCH_SIZE,
+    )
+
+
+def refresh_derived():
+    # Bulk writes mute the per-row signal handlers; the stock report and the
+    # catalogue cache are refreshed once afterwards instead.
+    rebuild_report()
+    invalidate_catalogue()
+
+
+def write_items(new_rows, updated_rows):
+    # new_rows are validated item dicts to insert; updated_rows are
+    # (existing Item, validated changes) pairs. Returns the written items.
+    # Where the backend can upsert on item_id, both go out as one upsert:
+    # bulk_update's CASE WHEN per row costs far more to build and run than
+    # INSERT ... ON CONFLICT. MySQL's ON DUPLICATE KEY UPDATE cannot name the
+    # conflicting column, so there new rows are inserted and existing ones
+    # updated separately. Sales counters set here, on new items too, are
+    # added to the opening balances.
+    created = [Item(**{field: data[field] for field in ITEM_FIELDS if field in data}) for data in new_rows]
+    updated = []
+    renamed = []
+    changed = [field for field in ITEM_FIELDS if field != 'item_id']
+    with transaction.atomic(), muted_signals():
+        # The counters are read locked and written back, so no purchase adds
+        # to them in between.
+        current = {}
+        if updated_rows:
+            locked = Item.objects.select_for_update().filter(pk__in=[item.pk for item, _ in updated_rows])
+            current = {pk: counters for pk, *counters in locked.values_list('pk', *SALES_FIELDS)}
+        adjustments = {}
+        for item, data in updated_rows:
+            if data.get('name', item.name) != item.name:
+                renamed.append(item)
+            for field, value in zip(SALES_FIELDS, current[item.pk]):
+                setattr(item, field, value)
+            for field in ITEM_FIELDS:
+                if field in data:
+                    setattr(item, field, data[field])
+            adjustments[item.pk] = [getattr(item, field) - value for field, value in zip(SALES_FIELDS, current[item.pk])]
+            updated.append(item)
+
+        batch_size = settings.INVENTORY_BULK_BATCH_SIZE
+        if connections[router.db_for_write(Item)].features.supports_update_conflicts_with_target:
+            Item.objects.bulk_create(
+                created + updated, batch_size=batch_size,
+                update_conflicts=True, unique_fields=['item_id'], update_fields=changed,
+            )
+        else:
+            Item.objects.bulk_create(created, batch_size=batch_size)
+            if updated:
+                Item.objects.bulk_update(updated, changed, batch_size=batch_size)
+        # MySQL does not return primary keys from bulk inserts.
+        pks = dict(Item.objects.filter(item_id__in=[item.item_id for item in created]).values_list('item_id', 'pk'))
+        for item in created:
+            item.pk = pks[item.item_id]
+            adjustments[item.pk] = [getattr(item, field) for field in SALES_FIELDS]
+        adjust_opening_balances(adjustments)
+
+        item_suppliers = {item.pk: data['suppliers'] for item, data in zip(created, new_rows) if 'suppliers' in data}
+        item_suppliers.update({item.pk: data['suppliers'] for item, data in updated_rows if 'suppliers' in data})
+        if item_suppliers:
+            _set_suppliers(item_suppliers)
+
+        get_search_backend().index_items(created + renamed)
+    return created, updated
+
+
+def create_items(rows):
+    valid, errors = validate_rows(BulkItemSerializer, rows)
+    errors += _duplicates(valid, 'item_id')
+    existing = set(Item.objects.filter(item_id__in=[data['item_id'] for _, data in valid]).values_list('item_id', flat=True))
+    errors += [
+        {'index': index, 'errors': {'item_id': ['item with this item id already exists.']}}
+        for index, data in valid if data['item_id'] in existing
+    ]
+    errors += _missing_suppliers(valid)
+    _raise_errors(errors)
+
+    with transaction.atomic():
+        created, _ = write_items([data for _, data in valid], [])
+        refresh_derived()
+    logger.info(f'Bulk created {len(created)} items')
+    return created
+
+
+def update_items(rows):
+    # Rows are matched on item_id and may hold any subset of the fields.
+    valid, errors = validate_rows(BulkItemSerializer, rows, partial=True, key='item_id')
+    items = Item.objects.in_bulk([data['item_id'] for _, data in valid], field_name='item_id')
+    errors += [
+        {'index': index, 'errors': {'item_id': [f'Item not found: {data["item_id"]}']}}
+        for index, data in valid if data['item_id'] not in items
+    ]
+    errors += _missing_suppliers(valid)
+    _raise_errors(errors)
+
+    with transaction.atomic():
+        _, updated = write_items([], [(items[data['item_id']], data) for _, data in valid])
+        refresh_derived()
+    logger.info(f'Bulk updated {len(updated)} items')
+    return updated
+
+
+def delete_items(item_ids):
+    if not isinstance(item_ids, list) or not all(isinstance(item_id, int) for item_id in item_ids):
+        raise BulkError([{'error': 'Expected a list of item ids'}])
+    with transaction.atomic(), muted_signals():
+        _, deleted = Item.objects.filter(item_id__in=item_ids).delete()
+        refresh_derived()
+    logger.info(f'Bulk deleted items {item_ids}')
+    return deleted.get(Item._meta.label, 0)
+
+
+def _supplier_conflicts(rows):
+    # One query for every contact and email in the payload that is already
+    # taken by another supplier.
+    contacts = [data['contact'] for _, data in rows if 'contact' in data]
+    emails = [data['email'] for _, data in rows if 'email' in data]
+    taken = Supplier.objects.filter(Q(contact__in=contacts) | Q(email__in=emails)).values_list('pk', 'contact', 'email')
+    taken_contacts = {contact: pk for pk, contact, _ in taken}
+    taken_emails = {email: pk for pk, _, email in taken}
+
+    errors = []
+    for index, data in rows:
+        field_errors = {}
+        for field, taken_values in (('contact', taken_contacts), ('email', taken_emails)):
+            owner = taken_values.get(data.get(field))
+            if owner is not None and owner != data.get('id'):
+                field_errors[field] = [f'supplier with this {field} already exists.']
+        if field_errors:
+            errors.append({'index': index, 'errors': field_errors})
+    return errors + _duplicates(rows, 'contact') + _duplicates(rows, 'email')
+
+
+def create_suppliers(rows):
+    valid, errors = validate_rows(BulkSupplierSerializer, rows)
+    errors += _supplier_conflicts(valid)
+    _raise_errors(errors)
+
+    suppliers = [Supplier(**data) for _, data in valid]
+    with transaction.atomic():
+        Supplier.objects.bulk_create(suppliers, batch_size=settings.INVENTORY_BULK_BATCH_SIZE)
+    logger.info(f'Bulk created {len(suppliers)} suppliers')
+    return suppliers
+
+
+def update_suppliers(rows):
+    # Rows are matched on id and may hold any subset of the fields.
+    valid, errors = validate_rows(BulkSupplierSerializer, rows, partial=True, key='id')
+    suppliers = Supplier.objects.in_bulk([data['id'] for _, data in valid])
+    errors += [
+        {'index': index, 'errors': {'id': [f'Supplier not found: {data["id"]}']}}
+        for index, data in valid if data['id'] not in suppliers
+    ]
+    errors += _supplier_conflicts(valid)
+    _raise_errors(errors)
+
+    changed_fields = set()
+    for _, data in valid:
+        supplier = suppliers[data['id']]
+        for field in SUPPLIER_FIELDS:
+            if field in data:
+                setattr(supplier, field, data[field])
+                changed_fields.add(field)
+    with transaction.atomic():
+        if changed_fields:
+            Supplier.objects.bulk_update(list(suppliers.values()), sorted(changed_fields), batch_size=settings.INVENTORY_BULK_BATCH_SIZE)
+    logger.info(f'Bulk updated {len(suppliers)} suppliers')
+    return list(suppliers.values())
+
+
+def delete_suppliers(supplier_ids):
+    if not isinstance(supplier_ids, list) or not all(isinstance(pk, int) for pk in supplier_ids):
+        raise BulkError([{'error': 'Expected a list of supplier ids'}])
+    with transaction.atomic(), muted_signals():
+        _, deleted = Supplier.objects.filter(pk__in=supplier_ids).delete()
+        invalidate_catalogue()
+    logger.info(f'Bulk deleted suppliers {supplier_ids}')
+    return deleted.get(Supplier._meta.label, 0)
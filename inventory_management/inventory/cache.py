@@ -0,0 +1,117 @@
+import hashlib
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .routers import use_primary
+
+logger = logging.getLogger('inventory')
+
+# Cached catalogue responses are keyed on change stamps: the time the
+# catalogue, or a single item, last changed. Invalidating is bumping a stamp,
+# which also serves as the Last-Modified date. The epoch stamp covers changes
+# that touch every item at once, such as deleting a supplier. Stock and
+# sales figures, which purchases change, have stamps of their own that only
+# the admin responses showing them are keyed on, so purchases leave the
+# customer responses cached.
+EPOCH_KEY = 'catalogue:epoch'
+LIST_KEY = 'catalogue:list'
+STOCK_KEY = 'catalogue:stock'
+ITEM_KEY = 'catalogue:item:{}'
+ITEM_STOCK_KEY = 'catalogue:item:{}:stock'
+
+
+def _stamps(*keys):
+    stamps = cache.get_many(keys)
+    missing = {key: time.time() for key in keys if key not in stamps}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        stamps.update(missing)
+    return [stamps[key] for key in keys]
+
+
+def _bump(keys):
+    # Inside a transaction the stamps are bumped again on commit, so that a
+    # request reading the old rows meanwhile cannot keep its cached response
+    # under the latest stamp.
+    cache.set_many(dict.fromkeys(keys, time.time()), timeout=None)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: cache.set_many(dict.fromkeys(keys, time.time()), timeout=None))
+
+
+def catalogue_version():
+    # Changes whenever an item, or the catalogue as a whole, changes.
+    return _stamps(EPOCH_KEY, LIST_KEY, STOCK_KEY)
+
+
+def invalidate_items(item_ids):
+    _bump([LIST_KEY, STOCK_KEY] + [key.format(pk) for pk in item_ids for key in (ITEM_KEY, ITEM_STOCK_KEY)])
+
+
+def invalidate_stock(item_ids):
+    # For changes to stock and sales figures only.
+    _bump([STOCK_KEY] + [ITEM_STOCK_KEY.format(pk) for pk in item_ids])
+
+
+def invalidate_catalogue():
+    _bump([EPOCH_KEY, LIST_KEY])
+
+
+class CachedCatalogueMixin:
+    # Read-through cache for list and retrieve, kept per role because staff
+    # and customers get different serializers. Responses carry an ETag and a
+    # Last-Modified date so clients can revalidate and get a 304.
+
+    def get_cache_role(self):
+        return 'admin' if self.is_admin() else 'customer'
+
+    def list(self, request, *args, **kwargs):
+        stamps = self.get_stamps(EPOCH_KEY, LIST_KEY, STOCK_KEY)
+        key = ':'.join([LIST_KEY, *map(str, stamps)])
+        return self.cached_response(key, max(stamps), super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        stamps = self.get_stamps(EPOCH_KEY, ITEM_KEY.format(pk), ITEM_STOCK_KEY.format(pk))
+        key = ':'.join([ITEM_KEY.format(pk), *map(str, stamps)])
+        return self.cached_response(key, max(stamps), super().retrieve, request, *args, **kwargs)
+
+    def get_stamps(self, epoch_key, key, stock_key):
+        # Customers are not shown stock or sales figures.
+        if self.get_cache_role() == 'admin':
+            return _stamps(epoch_key, key, stock_key)
+        return _stamps(epoch_key, key)
+
+    def cached_response(self, key, changed, view, request, *args, **kwargs):
+        url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+        key = f'{key}:{self.get_cache_role()}:{url}'
+        entry = cache.get(key)
+        if entry is None:
+            # Replicas may not have the change yet, and the response is cached
+            # under its stamp.
+            if time.time() - changed < settings.INVENTORY_DB_REPLICA_MAX_LAG:
+                use_primary()
+            response = view(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            body = json.dumps(response.data, cls=JSONEncoder, sort_keys=True)
+            entry = {'data': response.data, 'etag': quote_etag(hashlib.md5(body.encode()).hexdigest())}
+            cache.set(key, entry, settings.INVENTORY_CATALOGUE_CACHE_TIMEOUT)
+        else:
+            logger.debug(f'Catalogue cache hit: {key}')
+
+        response = Response(entry['data'])
+        response['ETag'] = entry['etag']
+        response['Last-Modified'] = http_date(changed)
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Authorization', 'Cookie'])
+        return get_conditional_response(request, etag=entry['etag'], last_modified=int(changed), response=response)
@@ -0,0 +1,65 @@
+import csv
+
+from .renderers import FastJSONRenderer
+from .rows import plan_for
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def chunks(queryset, chunk_size):
+    # Lists of up to chunk_size rows, each fetched with WHERE id > <last id>
+    # ORDER BY id LIMIT chunk_size. iterator() would not stream on MySQL,
+    # where mysqlclient buffers the whole result set on the client.
+    pk = queryset.model._meta.pk.attname
+    queryset = queryset.order_by(pk)
+    chunk = list(queryset[:chunk_size])
+    while chunk:
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        last = chunk[-1]
+        last = last[pk] if isinstance(last, dict) else last.pk
+        chunk = list(queryset.filter(pk__gt=last)[:chunk_size])
+
+
+def export_rows(queryset, serializer, chunk_size):
+    # Streams the queryset in chunks through the serializer's field selection,
+    # so memory stays flat however large the catalogue is.
+    plan = plan_for(type(serializer))
+    if plan is not None:
+        for chunk in chunks(plan.values(queryset), chunk_size):
+            yield from plan.represent(chunk, queryset.db)
+        return
+    for chunk in chunks(queryset, chunk_size):
+        for instance in chunk:
+            yield serializer.to_representation(instance)
+
+
+def ndjson_lines(rows):
+    renderer = FastJSONRenderer()
+    for row in rows:
+        yield renderer.render(row) + b'\n'
+
+
+def csv_lines(rows, fields):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(
+            ';'.join(str(value) for value in row[field]) if isinstance(row[field], list) else row[field]
+            for field in fields
+        )
+
+
+def export_lines(rows, fields, output):
+    if output == 'csv':
+        return csv_lines(rows, fields)
+    return ndjson_lines(rows)
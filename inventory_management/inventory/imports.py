@@ -0,0 +1,206 @@
+import csv
+import itertools
+import json
+import logging
+import os
+import time
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .bulk import ITEM_FIELDS, refresh_derived, write_items
+from .models import Item, Supplier
+
+logger = logging.getLogger('inventory')
+
+IMPORT_FORMATS = ('csv', 'xlsx')
+REQUIRED_COLUMNS = ('item_id', 'name', 'revenue', 'price')
+
+
+class ImportFileError(Exception):
+    pass
+
+
+def import_format(path):
+    return os.path.splitext(path)[1].lstrip('.').lower()
+
+
+def csv_records(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = [column.strip() for column in next(reader, [])]
+        yield header
+        for row in reader:
+            yield dict(zip(header, row))
+
+
+def _cell(value):
+    # Spreadsheet numbers arrive as int or float; hand them to the model
+    # fields as the text a CSV would hold, so 10.0 is a valid integer and
+    # 9.99 does not pick up binary float digits.
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def xlsx_records(path):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFileError('Importing .xlsx files requires openpyxl (pip install openpyxl).')
+
+    # read_only mode streams the sheet instead of loading it whole.
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [_cell(value).strip() for value in next(rows, ())]
+        yield header
+        for row in rows:
+            yield dict(zip(header, (_cell(value) for value in row)))
+    finally:
+        workbook.close()
+
+
+def read_records(path, output=None):
+    # The first value yielded is the header, then one dict per row.
+    output = output or import_format(path)
+    if output not in IMPORT_FORMATS:
+        raise ImportFileError(f'Unsupported import format: {output}')
+    records = csv_records(path) if output == 'csv' else xlsx_records(path)
+    header = next(records)
+    missing = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing:
+        raise ImportFileError(f'Missing columns: {", ".join(missing)}')
+    return records
+
+
+def supplier_lookup():
+    # Every supplier by contact and by email, loaded once per import.
+    lookup = {}
+    for pk, contact, email in Supplier.objects.values_list('pk', 'contact', 'email').iterator():
+        lookup[contact] = pk
+        lookup[email.lower()] = pk
+    return lookup
+
+
+def parse_record(record, suppliers):
+    data = {}
+    errors = {}
+    for field in ITEM_FIELDS:
+        model_field = Item._meta.get_field(field)
+        value = record.get(field, '').strip()
+        if value == '' and model_field.has_default():
+            data[field] = model_field.get_default()
+            continue
+        try:
+            data[field] = model_field.clean(value, None)
+        except ValidationError as e:
+            errors[field] = e.messages
+
+    if 'suppliers' in record:
+        tokens = [token.strip().lower() for token in record['suppliers'].split(';') if token.strip()]
+        unknown = [token for token in tokens if token not in suppliers]
+        if unknown:
+            errors['suppliers'] = [f'Unknown supplier: {token}' for token in unknown]
+        else:
+            data['suppliers'] = [suppliers[token] for token in tokens]
+    return data, errors
+
+
+class ItemImporter:
+    # Upserts items on item_id, one transaction per chunk of rows. After each
+    # chunk commits, the number of rows consumed is saved to the checkpoint
+    # file, and a rerun after a crash skips that many rows. Replaying a chunk
+    # is harmless since rows are upserts.
+
+    def __init__(self, path, chunk_size, dry_run=False, checkpoint_path=None, restart=False, output=None, log=None):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.checkpoint_path = checkpoint_path or f'{path}.checkpoint'
+        self.restart = restart
+        self.output = output
+        self.log = log or logger.info
+        self.rows = self.created = self.updated = self.rejected = 0
+
+    def file_state(self):
+        stat = os.stat(self.path)
+        return {'path': os.path.abspath(self.path), 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    def load_checkpoint(self):
+        if self.dry_run or self.restart or not os.path.exists(self.checkpoint_path):
+            return 0
+        with open(self.checkpoint_path) as f:
+            checkpoint = json.load(f)
+        if {key: checkpoint.get(key) for key in ('path', 'size', 'mtime')} != self.file_state():
+            self.log(f'{self.path} changed since the checkpoint was written, starting over.')
+            return 0
+        return checkpoint['rows']
+
+    def save_checkpoint(self):
+        # Written to a temporary file and renamed, so a crash never leaves a
+        # truncated checkpoint behind.
+        tmp_path = f'{self.checkpoint_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(dict(self.file_state(), rows=self.rows), f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def run(self):
+        records = read_records(self.path, self.output)
+        suppliers = supplier_lookup()
+        self.rows = self.load_checkpoint()
+        if self.rows:
+            self.log(f'Resuming after row {self.rows}.')
+            records = itertools.islice(records, self.rows, None)
+
+        started = time.monotonic()
+        resumed_at = self.rows
+        while True:
+            chunk = list(itertools.islice(records, self.chunk_size))
+            if not chunk:
+                break
+            self.write_chunk(chunk, suppliers)
+            if not self.dry_run:
+                self.save_checkpoint()
+            rate = (self.rows - resumed_at) / max(time.monotonic() - started, 1e-9)
+            self.log(f'{self.rows} rows: {self.created} created, {self.updated} updated, '
+                     f'{self.rejected} rejected ({rate:.0f} rows/sec)')
+
+        if not self.dry_run:
+            if self.created or self.updated:
+                refresh_derived()
+            if os.path.exists(self.checkpoint_path):
+                os.remove(self.checkpoint_path)
+        elapsed = time.monotonic() - started
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'updated': self.updated,
+            'rejected': self.rejected,
+            'seconds': elapsed,
+            'rows_per_second': (self.rows - resumed_at) / max(elapsed, 1e-9),
+        }
+
+    def write_chunk(self, chunk, suppliers):
+        # Rows are keyed on item_id, so a later row in the chunk wins over an
+        # earlier one for the same item.
+        rows = {}
+        for record in chunk:
+            self.rows += 1
+            data, errors = parse_record(record, suppliers)
+            if errors:
+                self.rejected += 1
+                self.log(f'Row {self.rows} rejected: {errors}')
+                continue
+            rows[data['item_id']] = data
+
+        existing = Item.objects.in_bulk(list(rows), field_name='item_id')
+        new_rows = [data for item_id, data in rows.items() if item_id not in existing]
+        updated_rows = [(existing[item_id], data) for item_id, data in rows.items() if item_id in existing]
+        if not self.dry_run:
+            with transaction.atomic():
+                write_items(new_rows, updated_rows)
+        self.created += len(new_rows)
+        self.updated += len(updated_rows)
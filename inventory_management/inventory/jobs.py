@@ -0,0 +1,273 @@
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connections
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .cache import catalogue_version
+from .exports import EXPORT_FORMATS, export_lines, export_rows
+from .imports import ItemImporter
+from .models import Item, Job
+from .search import get_search_backend
+from .serializers import ItemAdminSerializer, ItemCustomerSerializer
+from .stock_report import get_report
+
+logger = logging.getLogger('inventory')
+
+# Jobs are rows in the Job table: views queue them, and the processes
+# started by manage.py run_workers claim and run them. Results are files in
+# INVENTORY_JOB_DIR or, for imports, the import statistics.
+
+
+def job_path(job, extension):
+    return os.path.join(settings.INVENTORY_JOB_DIR, f'{job.pk}.{extension}')
+
+
+def upload_path(name):
+    return os.path.join(settings.INVENTORY_JOB_DIR, 'uploads', name)
+
+
+def run_stock_report(job):
+    path = job_path(job, 'html')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(render_to_string('inventory/stock_report.html', get_report()))
+    return {'file': path, 'content_type': 'text/html; charset=utf-8'}
+
+
+def run_export(job):
+    # The rows GET /api/items/export/ streams for the submitter's role.
+    output = job.params['output']
+    if job.params['admin']:
+        queryset, serializer = Item.objects.prefetch_related('suppliers'), ItemAdminSerializer()
+    else:
+        queryset, serializer = Item.objects.only('id', 'item_id', 'name', 'price'), ItemCustomerSerializer()
+    if job.params.get('search'):
+        queryset = get_search_backend().search(queryset, job.params['search'])
+    rows = export_rows(queryset.order_by('id'), serializer, settings.INVENTORY_EXPORT_CHUNK_SIZE)
+
+    path = job_path(job, output)
+    with open(path, 'wb') as f:
+        for line in export_lines(rows, list(serializer.fields), output):
+            f.write(line.encode() if isinstance(line, str) else line)
+    return {'file': path, 'content_type': EXPORT_FORMATS[output]}
+
+
+def run_import(job):
+    importer = ItemImporter(
+        job.params['path'],
+        settings.INVENTORY_IMPORT_CHUNK_SIZE,
+        dry_run=job.params.get('dry_run', False),
+        output=job.params.get('format'),
+    )
+    return importer.run()
+
+
+JOB_KINDS = {
+    'stock_report': run_stock_report,
+    'export': run_export,
+    'import': run_import,
+}
+
+# Kinds whose result only depends on the catalogue, so an identical
+# submission made before the catalogue changes gets the same job.
+CACHED_KINDS = {'stock_report', 'export'}
+
+
+def submit_job(kind, params, user=None):
+    user_id = user.pk if getattr(user, 'is_authenticated', False) else None
+    cache_key = ''
+    if kind in CACHED_KINDS:
+        cache_key = hashlib.md5(json.dumps([kind, params, user_id, catalogue_version()], sort_keys=True).encode()).hexdigest()
+        fresh = timezone.now() - timedelta(seconds=settings.INVENTORY_JOB_RESULT_TIMEOUT)
+        job = (
+            Job.objects.filter(cache_key=cache_key, created_at__gte=fresh)
+            .exclude(status=Job.FAILED)
+            .order_by('-id')
+            .first()
+        )
+        if job is not None:
+            logger.info(f'Reusing job {job.pk} for {kind}')
+            return job
+
+    job = Job.objects.create(kind=kind, params=params, user_id=user_id, cache_key=cache_key)
+    logger.info(f'Queued job {job.pk}: {kind}')
+    return job
+
+
+def claim_job():
+    # Claims the oldest queued job with a conditional UPDATE, so two workers
+    # never run the same job on any database, SQLite included.
+    queued = Job.objects.filter(status=Job.QUEUED).order_by('status', 'id').values_list('pk', flat=True)
+    for pk in queued[:10]:
+        now = timezone.now()
+        claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, started_at=now, heartbeat_at=now, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def _owned(job):
+    # The job while this run of it still owns it: running, on this attempt.
+    # Once it has been requeued as lost, its updates match nothing.
+    return Job.objects.filter(pk=job.pk, status=Job.RUNNING, attempts=job.attempts)
+
+
+@contextmanager
+def heartbeat(job):
+    # Bumps heartbeat_at every INVENTORY_JOB_HEARTBEAT_INTERVAL seconds from
+    # a thread while the job runs, so requeue_stale_jobs leaves it alone
+    # however long it takes.
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(settings.INVENTORY_JOB_HEARTBEAT_INTERVAL):
+                try:
+                    if not _owned(job).update(heartbeat_at=timezone.now()):
+                        return
+                except DatabaseError as e:
+                    logger.warning(f'Job {job.pk} heartbeat failed: {e!r}')
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=beat, name=f'inventory-job-{job.pk}-heartbeat', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _finish(job, **changes):
+    if _owned(job).update(finished_at=timezone.now(), **changes):
+        return True
+    logger.warning(f'Job {job.pk} ({job.kind}) was requeued while it ran, discarding the outcome of attempt {job.attempts}')
+    return False
+
+
+def run_job(job):
+    os.makedirs(settings.INVENTORY_JOB_DIR, exist_ok=True)
+    started = time.monotonic()
+    try:
+        with heartbeat(job):
+            result = JOB_KINDS[job.kind](job)
+    except Exception as e:
+        logger.exception(f'Job {job.pk} ({job.kind}) failed')
+        _finish(job, status=Job.FAILED, error=str(e) or repr(e))
+        return False
+    if not _finish(job, status=Job.SUCCEEDED, result=result):
+        return False
+    logger.info(f'Job {job.pk} ({job.kind}) finished in {time.monotonic() - started:.1f}s')
+    return True
+
+
+def run_pending_jobs():
+    # Runs queued jobs in this process until none are left.
+    ran = 0
+    while (job := claim_job()) is not None:
+        run_job(job)
+        ran += 1
+    return ran
+
+
+def requeue_stale_jobs():
+    # Running jobs without a heartbeat for INVENTORY_JOB_TIMEOUT seconds
+    # belonged to a worker that died; they are queued again up to
+    # INVENTORY_JOB_MAX_ATTEMPTS times.
+    stale = Job.objects.filter(
+        status=Job.RUNNING, heartbeat_at__lt=timezone.now() - timedelta(seconds=settings.INVENTORY_JOB_TIMEOUT),
+    )
+    failed = stale.filter(attempts__gte=settings.INVENTORY_JOB_MAX_ATTEMPTS).update(
+        status=Job.FAILED, error='Timed out', finished_at=timezone.now(),
+    )
+    requeued = stale.update(status=Job.QUEUED)
+    if failed or requeued:
+        logger.warning(f'Requeued {requeued} and failed {failed} stale jobs')
+    return requeued
+
+
+def prune_jobs(before):
+    # Deletes finished jobs created before the given time with their files.
+    job_dir = os.path.abspath(settings.INVENTORY_JOB_DIR) + os.sep
+    jobs = Job.objects.filter(created_at__lt=before, status__in=[Job.SUCCEEDED, Job.FAILED])
+    for result, params in jobs.values_list('result', 'params'):
+        for path in ((result or {}).get('file'), params.get('path')):
+            if path and os.path.abspath(path).startswith(job_dir):
+                for leftover in (path, f'{path}.checkpoint'):
+                    if os.path.exists(leftover):
+                        os.remove(leftover)
+    deleted, _ = jobs.delete()
+    logger.info(f'Pruned {deleted} jobs created before {before}')
+    return deleted
+
+
+def work(stop, poll_interval):
+    # Body of each worker process.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    connections.close_all()
+    while not stop.is_set():
+        close_old_connections()
+        job = claim_job()
+        if job is None:
+            stop.wait(poll_interval)
+        else:
+            run_job(job)
+    connections.close_all()
+
+
+def run_pool(processes, poll_interval):
+    # Forks the worker processes, which claim jobs independently, and
+    # restarts any that die until SIGTERM or Ctrl-C.
+    context = multiprocessing.get_context('fork')
+    stop = context.Event()
+
+    def start_worker(number):
+        worker = context.Process(target=work, args=(stop, poll_interval), name=f'inventory-worker-{number}')
+        worker.start()
+        return worker
+
+    # Children must open their own database connections.
+    connections.close_all()
+    workers = [start_worker(number) for number in range(processes)]
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    logger.info(f'Started {processes} job workers')
+    try:
+        while not stop.is_set():
+            requeue_stale_jobs()
+            for number, worker in enumerate(workers):
+                if not worker.is_alive():
+                    logger.warning(f'{worker.name} exited with {worker.exitcode}, restarting it')
+                    connections.close_all()
+                    workers[number] = start_worker(number)
+            stop.wait(max(poll_interval, 5))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join()
+    logger.info('Job workers stopped')
+
+
+def save_upload(uploaded, extension):
+    # Keeps an uploaded import file until its job is pruned.
+    os.makedirs(upload_path(''), exist_ok=True)
+    path = upload_path(f'{timezone.now():%Y%m%d%H%M%S}-{os.urandom(8).hex()}.{extension}')
+    with open(path, 'wb') as f:
+        for chunk in uploaded.chunks():
+            f.write(chunk)
+    return path
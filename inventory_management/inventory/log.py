@@ -0,0 +1,108 @@
+import json
+import logging
+import os
+import queue
+import weakref
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Logging that stays off the request path: views only put records on a
+# queue, and a listener thread formats them and writes them out. Used from
+# settings.LOGGING, see the 'queue' handler there.
+
+# Attributes every LogRecord has; anything else was passed through extra=.
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+
+# Every QueueListenerHandler, for the count of dropped records in /metrics.
+queue_handlers = weakref.WeakSet()
+
+
+class JSONFormatter(logging.Formatter):
+    # One JSON object per line, with the fields passed through extra=.
+    def format(self, record):
+        data = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'process': record.process,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        data.update((key, value) for key, value in vars(record).items() if key not in RECORD_ATTRIBUTES)
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            data['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(data, default=str)
+
+
+class QueueListenerHandler(QueueHandler):
+    # Puts records on a bounded in-memory queue and writes them out to
+    # `handlers` from a listener thread. `handlers` are given in LOGGING as
+    # 'cfg://handlers.<name>'. When the queue is full, records below WARNING
+    # are dropped and counted (see /metrics) rather than blocking the
+    # caller; warnings and errors are written out by the caller instead. A
+    # forked child (gunicorn and run_workers workers) starts a listener of
+    # its own.
+
+    def __init__(self, handlers, queue_size=10000):
+        handlers = [handlers[i] for i in range(len(handlers))]
+        if not all(isinstance(handler, logging.Handler) for handler in handlers):
+            # dictConfig retries handlers failing with this message once
+            # the others have been configured.
+            raise ValueError('target not configured yet')
+        self.handlers = handlers
+        self.queue_size = queue_size
+        self.dropped = 0
+        super().__init__(queue.Queue(queue_size))
+        queue_handlers.add(self)
+        self.listener = None
+        self.start()
+        os.register_at_fork(after_in_child=self.restart)
+
+    def start(self):
+        self.listener = QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self):
+        # Writes out the queued records and stops the listener thread.
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def restart(self):
+        # The parent's listener thread does not survive a fork.
+        if self.listener is not None:
+            self.queue = queue.Queue(self.queue_size)
+            self.start()
+
+    def drain(self):
+        # Waits until every record queued so far has been written.
+        self.stop()
+        self.start()
+
+    def prepare(self, record):
+        # Only merge the arguments into the message, so that the record no
+        # longer refers to objects the caller may change; the formatting is
+        # left to the listener thread.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if record.levelno < logging.WARNING:
+                self.dropped += 1
+                return
+            # Possibly ahead of records still queued.
+            for handler in self.handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+
+    def close(self):
+        self.stop()
+        super().close()
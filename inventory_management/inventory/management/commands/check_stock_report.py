@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.stock_report import check_report, rebuild_report
+
+
+class Command(BaseCommand):
+    help = 'Check the stock report snapshot against the Item table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Rebuild the snapshot if it is inconsistent.')
+
+    def handle(self, *args, **options):
+        problems = check_report()
+        if not problems:
+            self.stdout.write(self.style.SUCCESS('Stock report is consistent.'))
+            return
+
+        for problem in problems:
+            self.stderr.write(problem)
+        if options['fix']:
+            rebuild_report()
+            self.stdout.write(self.style.SUCCESS('Stock report rebuilt.'))
+            return
+        raise CommandError(f'Stock report has {len(problems)} inconsistencies.')
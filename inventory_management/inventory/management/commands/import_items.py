@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.imports import IMPORT_FORMATS, ImportFileError, ItemImporter
+
+
+class Command(BaseCommand):
+    help = 'Upsert items from a CSV or XLSX file, keyed on item_id.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File with a header row naming Item fields, plus an optional '
+                                         'suppliers column of ;-separated supplier emails or contacts.')
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help='Defaults to the file extension.')
+        parser.add_argument('--chunk-size', type=int, default=settings.INVENTORY_IMPORT_CHUNK_SIZE,
+                            help='Rows upserted per transaction.')
+        parser.add_argument('--dry-run', action='store_true', help='Validate and count rows without writing.')
+        parser.add_argument('--checkpoint', help='Checkpoint file, defaults to <path>.checkpoint.')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint.')
+
+    def handle(self, *args, **options):
+        importer = ItemImporter(
+            options['path'],
+            options['chunk_size'],
+            dry_run=options['dry_run'],
+            checkpoint_path=options['checkpoint'],
+            restart=options['restart'],
+            output=options['format'],
+            log=self.stdout.write,
+        )
+        try:
+            stats = importer.run()
+        except (ImportFileError, OSError) as e:
+            raise CommandError(str(e))
+
+        prefix = 'Dry run: ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{stats['rows']} rows, {stats['created']} created, {stats['updated']} updated, "
+            f"{stats['rejected']} rejected in {stats['seconds']:.1f}s ({stats['rows_per_second']:.0f} rows/sec)."
+        ))
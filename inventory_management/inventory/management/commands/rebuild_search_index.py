@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from inventory.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the item name search index of the configured search backend.'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Search index rebuilt with {type(backend).__name__}.'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from inventory.stock_report import rebuild_report
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the stock report snapshot from the Item table.'
+
+    def handle(self, *args, **options):
+        report = rebuild_report()
+        self.stdout.write(self.style.SUCCESS(
+            f'Stock report rebuilt: most sold by revenue {report.most_sold_item_revenue}, '
+            f'by quantity {report.most_sold_item_quantity}'
+        ))
@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from inventory.sales import check_item_counters, prune_ledger, rebuild_item_counters, rollup_sales
+
+
+class Command(BaseCommand):
+    help = 'Fold new sales ledger lines into the hourly per-item sales buckets.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prune-days', type=int,
+                            help='Afterwards delete rolled up sales older than this many days.')
+        parser.add_argument('--check', action='store_true',
+                            help="Compare every item's quantitySold and revenue with its rollups.")
+        parser.add_argument('--rebuild-counters', action='store_true',
+                            help="Reset every item's quantitySold and revenue to its rollups.")
+
+    def handle(self, *args, **options):
+        folded = rollup_sales()
+        self.stdout.write(self.style.SUCCESS(f'Rolled up {folded} sale lines.'))
+
+        if options['prune_days'] is not None:
+            pruned = prune_ledger(timezone.now() - timedelta(days=options['prune_days']))
+            self.stdout.write(self.style.SUCCESS(f'Pruned {pruned} sales.'))
+
+        if options['rebuild_counters']:
+            updated = rebuild_item_counters()
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt the sales counters of {updated} items.'))
+        elif options['check']:
+            problems = check_item_counters()
+            for problem in problems:
+                self.stderr.write(problem)
+            if problems:
+                raise CommandError(f'{len(problems)} items disagree with their sales rollups.')
+            self.stdout.write(self.style.SUCCESS('Item sales counters match the rollups.'))
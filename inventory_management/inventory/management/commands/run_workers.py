@@ -0,0 +1,34 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from inventory.jobs import prune_jobs, run_pending_jobs, run_pool
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (stock reports, exports, imports) in a pool of worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.INVENTORY_JOB_WORKERS or os.cpu_count(),
+                            help='Worker processes, defaults to INVENTORY_JOB_WORKERS or one per core.')
+        parser.add_argument('--poll-interval', type=float, default=settings.INVENTORY_JOB_POLL_INTERVAL,
+                            help='Seconds an idle worker waits before looking for jobs again.')
+        parser.add_argument('--once', action='store_true',
+                            help='Run the queued jobs in this process and exit.')
+        parser.add_argument('--prune-days', type=int,
+                            help='First delete finished jobs older than this many days, with their files.')
+
+    def handle(self, *args, **options):
+        if options['prune_days'] is not None:
+            pruned = prune_jobs(timezone.now() - timedelta(days=options['prune_days']))
+            self.stdout.write(self.style.SUCCESS(f'Pruned {pruned} jobs.'))
+
+        if options['once']:
+            ran = run_pending_jobs()
+            self.stdout.write(self.style.SUCCESS(f'Ran {ran} jobs.'))
+            return
+        self.stdout.write(f"Starting {options['processes']} job workers.")
+        run_pool(options['processes'], options['poll_interval'])
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventory.alerts import deliver_alerts
+
+
+class Command(BaseCommand):
+    help = 'Send queued reorder alerts to the suppliers of the items that ran low.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running, delivering new alerts every --interval seconds.')
+        parser.add_argument('--interval', type=float, default=60,
+                            help='Seconds between deliveries with --loop.')
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                delivered = deliver_alerts()
+                self.stdout.write(self.style.SUCCESS(f'Delivered {delivered} stock alerts.'))
+            except Exception as e:
+                if not options['loop']:
+                    raise
+                self.stderr.write(f'Delivering stock alerts failed, retrying: {e!r}')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
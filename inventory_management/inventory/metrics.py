@@ -0,0 +1,331 @@
+import glob
+import heapq
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .log import queue_handlers
+from .pool import pools as db_pools
+
+logger = logging.getLogger('inventory')
+
+# Per-request timings collected by RequestMetricsMiddleware and kept in
+# memory per process. The SQL of each request is recorded by an execute
+# wrapper installed on every database connection, which is a no-op outside
+# a request. The wrapper finds the request through a context variable, so
+# queries that async views run in sync_to_async threads are counted too.
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current = ContextVar('inventory_request_stats', default=None)
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_time = 0.0
+        self.queries = []
+        self.seen = Counter()
+
+    @property
+    def duplicates(self):
+        # Queries repeating the SQL of an earlier one, whatever the parameters,
+        # as an N+1 does. Comparing parameters too would format every one.
+        return sum(count - 1 for count in self.seen.values())
+
+    def add(self, sql, params, elapsed):
+        self.db_time += elapsed
+        self.queries.append((sql, elapsed))
+        self.seen[sql] += 1
+
+    def statements(self, limit):
+        # The request's SQL grouped by statement, slowest in total first.
+        # Parameters are left out, so samples never hold request data.
+        grouped = defaultdict(lambda: [0, 0.0])
+        for sql, elapsed in self.queries:
+            grouped[sql][0] += 1
+            grouped[sql][1] += elapsed
+        ordered = sorted(grouped.items(), key=lambda statement: -statement[1][1])
+        return [
+            {'sql': sql, 'count': count, 'duration_ms': round(elapsed * 1000, 3)}
+            for sql, (count, elapsed) in ordered[:limit]
+        ]
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add(sql, params, time.perf_counter() - started)
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def measure():
+    stats = RequestStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+class Series:
+    __slots__ = ('count', 'duration', 'buckets', 'db_time', 'queries', 'duplicates', 'response_bytes')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.db_time = 0.0
+        self.queries = 0
+        self.duplicates = 0
+        self.response_bytes = 0
+
+
+def _labels(view, method, status):
+    escaped = [str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in (view, method, status)]
+    return 'view="{}",method="{}",status="{}"'.format(*escaped)
+
+
+class Registry:
+    # With INVENTORY_METRICS_DIR set, each process also writes its metrics to
+    # a file of its own in that directory, at most every
+    # INVENTORY_METRICS_FLUSH_INTERVAL seconds and before /metrics is served,
+    # and /metrics adds up the files of every process. Files of processes
+    # that exited are folded into one by retire() (gunicorn.conf.py calls it
+    # from the master), without their pools.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.series = defaultdict(Series)
+        self.slow = []
+        self.sequence = itertools.count()
+        # Unique to the process, as pids are reused.
+        self.file = f'{os.getpid()}-{uuid.uuid4().hex[:12]}.json'
+        self.flushed = time.monotonic()
+
+    def observe(self, request, response, stats, duration, size):
+        view = request.resolver_match.view_name if request.resolver_match else 'unmatched'
+        with self.lock:
+            series = self.series[view, request.method, response.status_code]
+            series.count += 1
+            series.duration += duration
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    series.buckets[i] += 1
+            series.db_time += stats.db_time
+            series.queries += len(stats.queries)
+            series.duplicates += stats.duplicates
+            series.response_bytes += size or 0
+
+        if duration >= settings.INVENTORY_SLOW_REQUEST_SECONDS:
+            self.sample(request, response, stats, duration, view)
+
+        if settings.INVENTORY_METRICS_DIR:
+            with self.lock:
+                due = time.monotonic() - self.flushed >= settings.INVENTORY_METRICS_FLUSH_INTERVAL
+                if due:
+                    self.flushed = time.monotonic()
+            if due:
+                self.flush()
+
+    def sample(self, request, response, stats, duration, view):
+        # Keeps the INVENTORY_SLOW_REQUEST_SAMPLES slowest requests seen.
+        sample = {
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 3),
+            'db_ms': round(stats.db_time * 1000, 3),
+            'queries': len(stats.queries),
+            'duplicate_queries': stats.duplicates,
+            'sql': stats.statements(settings.INVENTORY_SLOW_REQUEST_MAX_STATEMENTS),
+        }
+        logger.warning(
+            f'Slow request {request.method} {request.path}: {sample["duration_ms"]}ms, '
+            f'{sample["queries"]} queries in {sample["db_ms"]}ms'
+        )
+        with self.lock:
+            entry = (duration, next(self.sequence), sample)
+            if len(self.slow) < settings.INVENTORY_SLOW_REQUEST_SAMPLES:
+                heapq.heappush(self.slow, entry)
+            elif duration > self.slow[0][0]:
+                heapq.heapreplace(self.slow, entry)
+
+    def state(self):
+        # This process's metrics, as written to INVENTORY_METRICS_DIR.
+        with self.lock:
+            series = [[*key, *(getattr(s, name) for name in Series.__slots__)] for key, s in self.series.items()]
+            slow = [list(entry) for entry in self.slow]
+        pools = defaultdict(Counter)
+        for pool in list(db_pools.values()):
+            pools[pool.alias].update({
+                'checkouts': pool.checkouts, 'waits': pool.waits, 'timeouts': pool.timeouts,
+                'discarded': pool.discarded, 'in_use': pool.in_use, 'idle': len(pool.idle),
+            })
+        dropped = sum(handler.dropped for handler in list(queue_handlers))
+        return {'series': series, 'slow': slow, 'pools': pools, 'log_records_dropped': dropped}
+
+    def flush(self):
+        _write_state(os.path.join(settings.INVENTORY_METRICS_DIR, self.file), self.state())
+
+    def collect(self):
+        # The state of this process, or added up over every process writing
+        # to INVENTORY_METRICS_DIR.
+        directory = settings.INVENTORY_METRICS_DIR
+        if not directory:
+            return self.state()
+        self.flush()
+        # The processes before the archive: a process is only removed once
+        # the archive listing it as retired is in place.
+        states = {os.path.basename(path): _read_state(path) for path in glob.glob(os.path.join(directory, '*-*.json'))}
+        archive = _read_state(os.path.join(directory, ARCHIVE)) or {}
+        states = [state for name, state in states.items() if name not in archive.get('retired', ())]
+        return _merge([archive, *states])
+
+    def retire(self, pid):
+        # Folds the files of an exited process into the archive.
+        directory = settings.INVENTORY_METRICS_DIR
+        paths = glob.glob(os.path.join(directory, f'{pid}-*.json')) if directory else []
+        if not paths:
+            return
+        archive_path = os.path.join(directory, ARCHIVE)
+        archive = _read_state(archive_path) or {}
+        exited = [{**state, 'pools': {}} for state in map(_read_state, paths) if state]
+        merged = _merge([archive, *exited])
+        names = [os.path.basename(path) for path in paths]
+        # Only names whose files are still there need listing.
+        merged['retired'] = [name for name in archive.get('retired', []) if os.path.exists(os.path.join(directory, name))] + names
+        _write_state(archive_path, merged)
+        for path in paths:
+            os.remove(path)
+
+    def slow_requests(self):
+        slow = self.collect()['slow']
+        return [sample for _, _, sample in sorted(slow, key=lambda entry: (-entry[0], entry[1]))]
+
+    def render(self):
+        # Prometheus text exposition format.
+        state = self.collect()
+        series = sorted((_labels(*row[:3]), _series(row[3:])) for row in state['series'])
+        lines = []
+
+        def counter(name, help_text, value_of, rows=series, kind='counter'):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(f'{name}{{{labels}}} {value_of(s)}' for labels, s in rows)
+
+        counter('inventory_requests_total', 'Requests served.', lambda s: s.count)
+        lines.append('# HELP inventory_request_duration_seconds Wall time of requests.')
+        lines.append('# TYPE inventory_request_duration_seconds histogram')
+        for labels, s in series:
+            for bound, count in zip(DURATION_BUCKETS, s.buckets):
+                lines.append(f'inventory_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'inventory_request_duration_seconds_bucket{{{labels},le="+Inf"}} {s.count}')
+            lines.append(f'inventory_request_duration_seconds_sum{{{labels}}} {s.duration}')
+            lines.append(f'inventory_request_duration_seconds_count{{{labels}}} {s.count}')
+        counter('inventory_request_db_seconds_total', 'Time spent in database queries.', lambda s: s.db_time)
+        counter('inventory_request_queries_total', 'Database queries run.', lambda s: s.queries)
+        counter('inventory_request_duplicate_queries_total',
+                'Queries repeating an earlier query of the same request.', lambda s: s.duplicates)
+        counter('inventory_response_bytes_total', 'Response body bytes, streamed responses excluded.',
+                lambda s: s.response_bytes)
+        lines.append('# HELP inventory_log_records_dropped_total Log records below WARNING dropped on a full logging queue.')
+        lines.append('# TYPE inventory_log_records_dropped_total counter')
+        lines.append(f'inventory_log_records_dropped_total {state["log_records_dropped"]}')
+
+        # Connection pools (inventory.pool) of the running processes.
+        pools = [(f'database="{alias}"', pool) for alias, pool in sorted(state['pools'].items())]
+        if pools:
+            counter('inventory_db_pool_checkouts_total', 'Connections taken from the pool.',
+                    lambda p: p['checkouts'], pools)
+            counter('inventory_db_pool_waits_total', 'Checkouts that waited for a connection to be handed back.',
+                    lambda p: p['waits'], pools)
+            counter('inventory_db_pool_timeouts_total', 'Checkouts that gave up waiting.', lambda p: p['timeouts'], pools)
+            counter('inventory_db_pool_discarded_total', 'Connections closed instead of handed back.',
+                    lambda p: p['discarded'], pools)
+            counter('inventory_db_pool_connections_in_use', 'Connections checked out.', lambda p: p['in_use'], pools, 'gauge')
+            counter('inventory_db_pool_connections_idle', 'Connections waiting in the pool.',
+                    lambda p: p['idle'], pools, 'gauge')
+        return '\n'.join(lines) + '\n'
+
+
+# Holds the metrics of processes that exited, in INVENTORY_METRICS_DIR.
+ARCHIVE = 'exited.json'
+
+
+def _series(values):
+    series = Series()
+    for name, value in zip(Series.__slots__, values):
+        setattr(series, name, value)
+    return series
+
+
+def _merge(states):
+    # Adds up states: series by labels, pools by alias, and keeps the slowest
+    # requests of all.
+    series = {}
+    slow = []
+    pools = defaultdict(Counter)
+    dropped = 0
+    for state in states:
+        dropped += state.get('log_records_dropped', 0)
+        for row in state.get('series', ()):
+            key = tuple(row[:3])
+            if key not in series:
+                series[key] = list(row)
+                continue
+            total = series[key]
+            for i, value in enumerate(row[3:], 3):
+                total[i] = [a + b for a, b in zip(total[i], value)] if isinstance(value, list) else total[i] + value
+        slow.extend(state.get('slow', ()))
+        for alias, pool in state.get('pools', {}).items():
+            pools[alias].update(pool)
+    slow = heapq.nlargest(settings.INVENTORY_SLOW_REQUEST_SAMPLES, slow, key=lambda entry: (entry[0], -entry[1]))
+    return {'series': list(series.values()), 'slow': slow, 'pools': pools, 'log_records_dropped': dropped}
+
+
+def _read_state(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_state(path, state):
+    # Readers only ever see a whole file.
+    temporary = f'{path}.{threading.get_ident()}.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(state, f)
+    os.replace(temporary, path)
+
+
+registry = Registry()
+# A forked child starts counting from zero in a file of its own.
+os.register_at_fork(after_in_child=registry.reset)
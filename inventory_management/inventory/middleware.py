@@ -0,0 +1,98 @@
+import math
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DatabaseError
+
+from .metrics import measure, registry
+from .routers import recheck_replica, routing, use_primary
+
+# Set on responses to requests that wrote, so the client's next requests read
+# from the primary until the replicas have caught up.
+PRIMARY_COOKIE = 'inventory_primary'
+UNSAFE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+
+class RequestMetricsMiddleware:
+    # Times every request, counts its queries and records it in the metrics
+    # registry. Works both ways so ASGI requests to the async views stay on
+    # the event loop. Keep it first in MIDDLEWARE so the wall time covers
+    # the rest of the stack.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with measure() as stats:
+            response = self.get_response(request)
+        return self.finish(request, response, stats)
+
+    async def __acall__(self, request):
+        with measure() as stats:
+            response = await self.get_response(request)
+        return self.finish(request, response, stats)
+
+    def finish(self, request, response, stats):
+        duration = time.perf_counter() - stats.started
+        size = None if response.streaming else len(response.content)
+        registry.observe(request, response, stats, duration, size)
+        if settings.INVENTORY_SERVER_TIMING:
+            response['Server-Timing'] = (
+                f'db;dur={stats.db_time * 1000:.1f};desc="{len(stats.queries)} queries, '
+                f'{stats.duplicates} duplicates", total;dur={duration * 1000:.1f}'
+            )
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    # Lets PrimaryReplicaRouter send the request's reads to a replica. Unsafe
+    # methods, views with read_from_primary set and clients that wrote within
+    # the last INVENTORY_DB_REPLICA_MAX_LAG seconds read from the primary.
+    # Does nothing without INVENTORY_DB_REPLICAS.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.INVENTORY_DB_REPLICAS:
+            return self.get_response(request)
+        with routing(primary=self.read_from_primary(request)) as state:
+            response = self.get_response(request)
+        return self.finish(response, state)
+
+    async def __acall__(self, request):
+        if not settings.INVENTORY_DB_REPLICAS:
+            return await self.get_response(request)
+        with routing(primary=self.read_from_primary(request)) as state:
+            response = await self.get_response(request)
+        return self.finish(response, state)
+
+    def read_from_primary(self, request):
+        return request.method in UNSAFE_METHODS or PRIMARY_COOKIE in request.COOKIES
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if getattr(getattr(view_func, 'cls', None), 'read_from_primary', False):
+            use_primary()
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, DatabaseError):
+            recheck_replica()
+
+    def finish(self, response, state):
+        lag = settings.INVENTORY_DB_REPLICA_MAX_LAG
+        if state.wrote and lag > 0:
+            response.set_cookie(PRIMARY_COOKIE, '1', max_age=math.ceil(lag), httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_alter_item_quantityinstock_alter_item_quantitysold'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LowStockItem',
+            fields=[
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='low_stock', serialize=False, to='inventory.item')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StockReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('most_sold_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=30)),
+                ('most_sold_quantity', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('most_sold_item_quantity', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='inventory.item')),
+                ('most_sold_item_revenue', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='inventory.item')),
+            ],
+        ),
+    ]
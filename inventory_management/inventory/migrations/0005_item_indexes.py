@@ -0,0 +1,26 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:15
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_stock_report'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['quantityInStock', 'id'], name='item_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['-quantitySold'], name='item_sold_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(models.OrderBy(models.ExpressionWrapper(django.db.models.expressions.CombinedExpression(models.F('quantitySold'), '*', models.F('price')), output_field=models.FloatField()), descending=True), name='item_sales_value_idx'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:17
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def index_item_names(apps, schema_editor):
+    # Same trigrams as inventory.search.name_grams, inlined so the migration
+    # does not depend on application code. Items are indexed 2000 at a time,
+    # in id order. MySQL searches its FULLTEXT index instead, and does not
+    # keep this table up to date, so it is left empty there
+    # (rebuild_search_index fills it when the trigram backend is chosen).
+    if schema_editor.connection.vendor == 'mysql':
+        return
+    Item = apps.get_model('inventory', 'Item')
+    ItemSearchGram = apps.get_model('inventory', 'ItemSearchGram')
+    items = Item.objects.order_by('id').values_list('id', 'name')
+    batch = list(items[:2000])
+    while batch:
+        grams = []
+        for pk, name in batch:
+            for word in re.findall(r'\w+', name.lower()):
+                padded = '  ' + word
+                for gram in {padded[i:i + 3] for i in range(len(padded) - 2)}:
+                    grams.append(ItemSearchGram(item_id=pk, gram=gram))
+        ItemSearchGram.objects.bulk_create(grams, batch_size=2000)
+        batch = list(items.filter(id__gt=batch[-1][0])[:2000])
+
+
+def add_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('CREATE FULLTEXT INDEX item_name_fulltext ON inventory_item (name)')
+
+
+def remove_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('DROP INDEX item_name_fulltext ON inventory_item')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_item_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemSearchGram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gram', models.CharField(max_length=3)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_grams', to='inventory.item')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='itemsearchgram',
+            constraint=models.UniqueConstraint(fields=('gram', 'item'), name='item_search_gram_unique'),
+        ),
+        migrations.RunPython(index_item_names, migrations.RunPython.noop),
+        migrations.RunPython(add_fulltext_index, remove_fulltext_index),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:38
+
+import datetime
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Q
+
+
+def open_balances(apps, schema_editor):
+    # Sales made before the ledger existed become one bucket per item at
+    # inventory.sales.OPENING_BALANCE_START, so the rollups add up to the
+    # current counters.
+    Item = apps.get_model('inventory', 'Item')
+    ItemSalesBucket = apps.get_model('inventory', 'ItemSalesBucket')
+    start = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+    sold = Item.objects.filter(Q(quantitySold__gt=0) | Q(revenue__gt=0))
+    ItemSalesBucket.objects.bulk_create(
+        (ItemSalesBucket(item_id=pk, start=start, quantity=quantity, revenue=revenue)
+         for pk, quantity, revenue in sold.values_list('id', 'quantitySold', 'revenue').iterator(chunk_size=2000)),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_item_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sale',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('total', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SaleLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('created_at', models.DateTimeField()),
+                ('rolled_up', models.BooleanField(default=False)),
+                ('item', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sale_lines', to='inventory.item')),
+                ('sale', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='inventory.sale')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ItemSalesBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateTimeField()),
+                ('quantity', models.PositiveBigIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=30)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_buckets', to='inventory.item')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['start'], name='item_sales_bucket_start_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='itemsalesbucket',
+            constraint=models.UniqueConstraint(fields=('item', 'start'), name='item_sales_bucket_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['created_at'], name='sale_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saleline',
+            index=models.Index(fields=['rolled_up', 'id'], name='sale_line_pending_idx'),
+        ),
+        migrations.RunPython(open_balances, migrations.RunPython.noop),
+    ]
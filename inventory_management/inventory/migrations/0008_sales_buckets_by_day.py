@@ -0,0 +1,57 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:40
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def add_day_buckets(apps, schema_editor):
+    # Sums the existing hourly buckets (and opening balances) into day buckets.
+    ItemSalesBucket = apps.get_model('inventory', 'ItemSalesBucket')
+    days = defaultdict(lambda: [0, 0])
+    hours = ItemSalesBucket.objects.filter(granularity='hour').values_list('item_id', 'start', 'quantity', 'revenue')
+    for item_id, start, quantity, revenue in hours.iterator(chunk_size=2000):
+        day = days[item_id, start.replace(hour=0, minute=0, second=0, microsecond=0)]
+        day[0] += quantity
+        day[1] += revenue
+    ItemSalesBucket.objects.bulk_create(
+        [ItemSalesBucket(item_id=item_id, granularity='day', start=start, quantity=quantity, revenue=revenue)
+         for (item_id, start), (quantity, revenue) in days.items()],
+        batch_size=2000,
+    )
+
+
+def remove_day_buckets(apps, schema_editor):
+    apps.get_model('inventory', 'ItemSalesBucket').objects.filter(granularity='day').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_sales_ledger'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='itemsalesbucket',
+            name='item_sales_bucket_unique',
+        ),
+        migrations.RemoveIndex(
+            model_name='itemsalesbucket',
+            name='item_sales_bucket_start_idx',
+        ),
+        migrations.AddField(
+            model_name='itemsalesbucket',
+            name='granularity',
+            field=models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], default='hour', max_length=4),
+        ),
+        migrations.AddIndex(
+            model_name='itemsalesbucket',
+            index=models.Index(fields=['granularity', 'start'], name='item_sales_bucket_window_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='itemsalesbucket',
+            constraint=models.UniqueConstraint(fields=('item', 'granularity', 'start'), name='item_sales_bucket_unique'),
+        ),
+        migrations.RunPython(add_day_buckets, remove_day_buckets),
+    ]
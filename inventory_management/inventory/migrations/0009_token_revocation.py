@@ -0,0 +1,24 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_sales_buckets_by_day'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenRevocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.BigIntegerField(unique=True)),
+                ('revoked_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['revoked_at'], name='token_revocation_at_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:50
+
+import django.db.models.deletion
+import django.db.models.expressions
+import django.db.models.functions.comparison
+import django.utils.timezone
+import inventory.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_token_revocation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantityInStock', models.PositiveIntegerField()),
+                ('reorderThreshold', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('delivered_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='item',
+            name='item_stock_idx',
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='reorderThreshold',
+            field=models.PositiveIntegerField(default=inventory.models.default_reorder_threshold),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(models.ExpressionWrapper(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('quantityInStock', models.BigIntegerField()), '-', django.db.models.functions.comparison.Cast('reorderThreshold', models.BigIntegerField())), output_field=models.BigIntegerField()), name='item_reorder_idx'),
+        ),
+        migrations.AddField(
+            model_name='stockalert',
+            name='item',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='inventory.item'),
+        ),
+        migrations.AddIndex(
+            model_name='stockalert',
+            index=models.Index(fields=['delivered_at', 'id'], name='stock_alert_pending_idx'),
+        ),
+    ]
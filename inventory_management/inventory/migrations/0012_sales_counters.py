@@ -0,0 +1,28 @@
+# Generated by Django 5.0.7 on 2026-10-18 20:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0011_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemSalesCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('quantity', models.PositiveBigIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=30)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_counters', to='inventory.item')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='itemsalescounter',
+            constraint=models.UniqueConstraint(fields=('item', 'shard'), name='item_sales_counter_unique'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.0.7 on 2026-10-18 21:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def queue_per_supplier(apps, schema_editor):
+    # Pending crossings are queued again once per current supplier of their
+    # item; those of items without a supplier keep supplier None.
+    StockAlert = apps.get_model('inventory', 'StockAlert')
+    Links = apps.get_model('inventory', 'Item').suppliers.through
+    pending = list(StockAlert.objects.filter(delivered_at__isnull=True))
+    suppliers = {}
+    for item_id, supplier_id in Links.objects.filter(item_id__in={alert.item_id for alert in pending}).values_list(
+        'item_id', 'supplier_id',
+    ):
+        suppliers.setdefault(item_id, []).append(supplier_id)
+
+    fanned_out = []
+    for alert in pending:
+        first, *others = suppliers.get(alert.item_id, [None])
+        alert.supplier_id = first
+        fanned_out += [
+            StockAlert(item_id=alert.item_id, supplier_id=supplier_id, quantityInStock=alert.quantityInStock,
+                       reorderThreshold=alert.reorderThreshold, created_at=alert.created_at)
+            for supplier_id in others
+        ]
+    StockAlert.objects.bulk_update(pending, ['supplier'])
+    StockAlert.objects.bulk_create(fanned_out)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0013_job_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockalert',
+            name='supplier',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE,
+                                    related_name='+', to='inventory.supplier'),
+        ),
+        migrations.RemoveIndex(
+            model_name='stockalert',
+            name='stock_alert_pending_idx',
+        ),
+        migrations.AddIndex(
+            model_name='stockalert',
+            index=models.Index(fields=['delivered_at', 'supplier', 'id'], name='stock_alert_pending_idx'),
+        ),
+        migrations.RunPython(queue_per_supplier, migrations.RunPython.noop),
+    ]
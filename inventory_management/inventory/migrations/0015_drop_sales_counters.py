@@ -0,0 +1,32 @@
+# Generated by Django 5.0.7 on 2026-10-18 22:10
+
+from django.db import migrations
+from django.db.models import F, OuterRef, Subquery, Sum
+
+
+def fold_counters(apps, schema_editor):
+    # Sales still held in counter rows are added to their items before the
+    # rows go. Their ledger lines were written with the purchases, so the
+    # rollups already count them.
+    Item = apps.get_model('inventory', 'Item')
+    ItemSalesCounter = apps.get_model('inventory', 'ItemSalesCounter')
+    using = schema_editor.connection.alias
+    counters = ItemSalesCounter.objects.using(using).filter(item=OuterRef('pk')).order_by().values('item')
+    Item.objects.using(using).filter(pk__in=ItemSalesCounter.objects.using(using).values('item')).update(
+        quantitySold=F('quantitySold') + Subquery(counters.annotate(total=Sum('quantity')).values('total')),
+        revenue=F('revenue') + Subquery(counters.annotate(total=Sum('revenue')).values('total')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0014_stock_alert_supplier'),
+    ]
+
+    operations = [
+        migrations.RunPython(fold_counters, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='ItemSalesCounter',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-18 22:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0015_drop_sales_counters'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='itemsalesbucket',
+            name='quantity',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -1,5 +1,22 @@
+from django.conf import settings
 from django.db import models
+from django.db.models import BigIntegerField, ExpressionWrapper, F, FloatField
+from django.db.models.functions import Cast
 from django.core.validators import RegexValidator
+from django.utils import timezone
+
+# Units sold times unit price, the figure the stock report ranks items by.
+SALES_VALUE = ExpressionWrapper(F('quantitySold') * F('price'), output_field=FloatField())
+
+# Units in stock above the item's reorder threshold, negative once it is low
+# on stock. Signed, as MySQL refuses to subtract unsigned columns below zero.
+STOCK_HEADROOM = ExpressionWrapper(
+    Cast('quantityInStock', BigIntegerField()) - Cast('reorderThreshold', BigIntegerField()),
+    output_field=BigIntegerField(),
+)
+
+def default_reorder_threshold():
+    return getattr(settings, 'INVENTORY_LOW_STOCK_THRESHOLD', 5)
 
 class Supplier(models.Model):
     name = models.CharField(max_length=100, blank=False, null=False)
@@ -27,7 +44,165 @@ class Item(models.Model):
     quantitySold = models.PositiveIntegerField(default=0)
     revenue = models.DecimalField(max_digits=20, decimal_places=2, blank=False, null=False)
     price = models.DecimalField(max_digits=10, decimal_places=2, blank=False, null=False)
+    # The item is low on stock, and its suppliers are alerted, once
+    # quantityInStock drops below this.
+    reorderThreshold = models.PositiveIntegerField(default=default_reorder_threshold)
     suppliers = models.ManyToManyField(Supplier)
 
+    class Meta:
+        indexes = [
+            # Low-stock scan: items whose headroom is below zero.
+            models.Index(STOCK_HEADROOM, name='item_reorder_idx'),
+            # Best sellers by quantity and by quantitySold * price.
+            models.Index(fields=['-quantitySold'], name='item_sold_idx'),
+            models.Index(SALES_VALUE.desc(), name='item_sales_value_idx'),
+        ]
+
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+class StockReport(models.Model):
+    # Single-row snapshot of the stock report's best sellers, kept up to date
+    # by purchases and item changes (see inventory.stock_report).
+    most_sold_item_revenue = models.ForeignKey(Item, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    most_sold_revenue = models.DecimalField(max_digits=30, decimal_places=2, default=0)
+    most_sold_item_quantity = models.ForeignKey(Item, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    most_sold_quantity = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class LowStockItem(models.Model):
+    item = models.OneToOneField(Item, primary_key=True, on_delete=models.CASCADE, related_name='low_stock')
+
+    def __str__(self):
+        return self.item.name
+
+
+class ItemSearchGram(models.Model):
+    # Inverted index of item name trigrams used by the trigram search backend.
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='search_grams')
+    gram = models.CharField(max_length=3)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['gram', 'item'], name='item_search_gram_unique'),
+        ]
+
+
+class Sale(models.Model):
+    # Append-only ledger of purchases: one Sale per basket and one SaleLine
+    # per item in it. inventory.sales rolls the lines up into ItemSalesBucket.
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    created_at = models.DateTimeField(default=timezone.now)
+    total = models.DecimalField(max_digits=20, decimal_places=2)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='sale_created_idx'),
+        ]
+
+
+class SaleLine(models.Model):
+    sale = models.ForeignKey(Sale, on_delete=models.CASCADE, related_name='lines')
+    # Kept when the item is deleted, so the ledger still adds up.
+    item = models.ForeignKey(Item, null=True, on_delete=models.SET_NULL, related_name='sale_lines')
+    quantity = models.PositiveIntegerField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    amount = models.DecimalField(max_digits=20, decimal_places=2)
+    # Copied from the sale so the rollup can bucket lines without a join.
+    created_at = models.DateTimeField()
+    rolled_up = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['rolled_up', 'id'], name='sale_line_pending_idx'),
+        ]
+
+
+class ItemSalesBucket(models.Model):
+    # Units sold and revenue per item per hour and per day, kept up to date
+    # by purchases (or the rollup job). Sales from before the ledger existed
+    # are one opening bucket per item at inventory.sales.OPENING_BALANCE_START,
+    # outside every analytics window. Setting an item's quantitySold or
+    # revenue directly adds the difference there, which may take it below 0.
+    HOUR = 'hour'
+    DAY = 'day'
+    GRANULARITIES = [(HOUR, 'Hour'), (DAY, 'Day')]
+
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='sales_buckets')
+    granularity = models.CharField(max_length=4, choices=GRANULARITIES, default=HOUR)
+    start = models.DateTimeField()
+    quantity = models.BigIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=30, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['item', 'granularity', 'start'], name='item_sales_bucket_unique'),
+        ]
+        indexes = [
+            # Windowed top-N scans: every bucket of one granularity in a range.
+            models.Index(fields=['granularity', 'start'], name='item_sales_bucket_window_idx'),
+        ]
+
+
+class TokenRevocation(models.Model):
+    # JWTs carry the user's flags, so requests are authorized without
+    # loading the user. Tokens a user was issued up to revoked_at are
+    # rejected. A plain id rather than a foreign key, so the row outlives a
+    # deleted user until their tokens have expired.
+    user_id = models.BigIntegerField(unique=True)
+    revoked_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['revoked_at'], name='token_revocation_at_idx'),
+        ]
+
+
+class StockAlert(models.Model):
+    # Outbox of reorder threshold crossings, written by purchases in their
+    # transaction and delivered to the suppliers by inventory.alerts. A
+    # crossing is queued once per supplier of the item (once with no supplier
+    # for items without one), so each supplier's delivery is tracked apart.
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='+')
+    supplier = models.ForeignKey(Supplier, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    quantityInStock = models.PositiveIntegerField()
+    reorderThreshold = models.PositiveIntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['delivered_at', 'supplier', 'id'], name='stock_alert_pending_idx'),
+        ]
+
+
+class Job(models.Model):
+    # Background job run by manage.py run_workers (see inventory.jobs).
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUSES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (SUCCEEDED, 'Succeeded'), (FAILED, 'Failed')]
+
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED)
+    user_id = models.BigIntegerField(null=True, blank=True)
+    # Identical submissions share a job while its result is fresh.
+    cache_key = models.CharField(max_length=32, blank=True, default='')
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Bumped by the worker running the job, which is presumed lost once this
+    # is INVENTORY_JOB_TIMEOUT seconds old.
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id'], name='job_status_idx'),
+            models.Index(fields=['cache_key', 'id'], name='job_cache_key_idx'),
+        ]
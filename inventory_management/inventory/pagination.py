@@ -0,0 +1,9 @@
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    # Pages are fetched with WHERE id > <cursor> ORDER BY id LIMIT n, so a deep
+    # page costs the same as the first one. Cursors are opaque base64 tokens.
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
@@ -0,0 +1,138 @@
+import logging
+import os
+import threading
+from collections import deque
+
+from django.conf import settings
+
+logger = logging.getLogger('inventory')
+
+# With INVENTORY_DB_POOL_SIZE set, the threads of a process share a bounded
+# pool of database connections per database: closing a connection, as Django
+# does when a request finishes, hands it back instead, and the next connect
+# takes it from the pool instead of going through the handshake again. When
+# every connection is in use, connecting waits up to INVENTORY_DB_POOL_TIMEOUT
+# seconds for one to be handed back.
+
+# (alias, name, host, port, user): ConnectionPool
+pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    def __init__(self, alias, size, timeout):
+        self.alias = alias
+        self.size = size
+        self.timeout = timeout
+        self.idle = deque()
+        self.open = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.discarded = 0
+        self.condition = threading.Condition()
+
+    @property
+    def in_use(self):
+        return self.open - len(self.idle)
+
+    def acquire(self, connect, usable=None):
+        # Returns an idle connection that passes usable(), or a new one from
+        # connect(), or None after waiting timeout seconds for either.
+        with self.condition:
+            self.checkouts += 1
+            if not self.idle and self.open >= self.size:
+                self.waits += 1
+                if not self.condition.wait_for(lambda: self.idle or self.open < self.size, self.timeout):
+                    self.timeouts += 1
+                    return None
+            if self.idle:
+                connection = self.idle.pop()
+            else:
+                connection = None
+                self.open += 1
+
+        if connection is not None:
+            if usable is None or usable(connection):
+                return connection
+            # Replaced by a new connection in the same slot.
+            self.discard(connection)
+            with self.condition:
+                self.open += 1
+        try:
+            return connect()
+        except BaseException:
+            with self.condition:
+                self.open -= 1
+                self.condition.notify()
+            raise
+
+    def release(self, connection):
+        with self.condition:
+            self.idle.append(connection)
+            self.condition.notify()
+
+    def discard(self, connection):
+        with self.condition:
+            self.open -= 1
+            self.discarded += 1
+            self.condition.notify()
+        try:
+            connection.close()
+        except Exception as e:
+            logger.debug(f'Closing a discarded {self.alias} connection failed: {e}')
+
+
+def get_pool(wrapper):
+    key = tuple(wrapper.settings_dict[setting] for setting in ('NAME', 'HOST', 'PORT', 'USER'))
+    key = (wrapper.alias, *key)
+    with _pools_lock:
+        pool = pools.get(key)
+        if pool is None:
+            pool = pools[key] = ConnectionPool(
+                wrapper.alias, settings.INVENTORY_DB_POOL_SIZE, settings.INVENTORY_DB_POOL_TIMEOUT,
+            )
+        return pool
+
+
+def _forget_pools():
+    # A forked worker must not reuse its parent's sockets.
+    pools.clear()
+
+
+os.register_at_fork(after_in_child=_forget_pools)
+
+
+class PooledDatabaseWrapperMixin:
+    # Mixed into a backend's DatabaseWrapper (see inventory.pooled_mysql).
+    # Connections with an open transaction, or that raised a database error,
+    # are closed rather than handed back. With CONN_HEALTH_CHECKS, idle
+    # connections are checked before they are reused.
+
+    def get_new_connection(self, conn_params):
+        pool = get_pool(self)
+        connect = super().get_new_connection
+        usable = self.is_usable_connection if self.settings_dict['CONN_HEALTH_CHECKS'] else None
+        connection = pool.acquire(lambda: connect(conn_params), usable)
+        if connection is None:
+            raise self.Database.OperationalError(
+                f'No {self.alias} connection free after {pool.timeout} seconds '
+                f'({pool.size} in the pool)'
+            )
+        return connection
+
+    def is_usable_connection(self, connection):
+        current, self.connection = self.connection, connection
+        try:
+            return self.is_usable()
+        finally:
+            self.connection = current
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool = get_pool(self)
+        if self.in_atomic_block or self.errors_occurred or not self.get_autocommit():
+            pool.discard(self.connection)
+        else:
+            pool.release(self.connection)
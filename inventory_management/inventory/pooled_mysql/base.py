@@ -0,0 +1,9 @@
+from django.db.backends.mysql import base
+
+from ..pool import PooledDatabaseWrapperMixin
+
+
+# The MySQL backend with connections from a shared pool: set ENGINE to
+# 'inventory.pooled_mysql' (settings.py does with DJANGO_DB_POOL_SIZE).
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    pass
@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import random
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import OperationalError, transaction
+from django.db.models import F
+
+from .alerts import record_crossings
+from .cache import invalidate_stock
+from .models import Item
+from .sales import append_sale
+from .stock_report import record_sales
+
+logger = logging.getLogger('inventory')
+
+PESSIMISTIC = 'pessimistic'
+OPTIMISTIC = 'optimistic'
+
+
+class PurchaseError(Exception):
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+class PurchaseConflict(PurchaseError):
+    pass
+
+
+class _Retry(Exception):
+    pass
+
+
+def purchase_items(purchases, mode=None, user=None):
+    # Applies a whole basket atomically and returns the bill. Baskets that
+    # lose a race (deadlock, lock timeout, or an optimistic update that found
+    # the stock changed underneath it) are retried with jittered exponential
+    # backoff before giving up with PurchaseConflict.
+    attempt_purchase = _attempt_for(mode)
+    max_attempts = getattr(settings, 'INVENTORY_PURCHASE_MAX_ATTEMPTS', 5)
+    for attempt in range(max_attempts):
+        try:
+            return attempt_purchase(purchases, user)
+        except (OperationalError, _Retry) as e:
+            delay = _retry_delay(e, attempt, max_attempts)
+        if delay is not None:
+            time.sleep(delay)
+    _give_up()
+
+
+async def apurchase_items(purchases, mode=None, user=None):
+    # Async entry point for the ASGI purchase view. Django has no async
+    # transactions, so each attempt at the basket is made by the sync
+    # thread; a basket that cannot succeed is turned away first with an
+    # async read, without taking that thread. The backoff between attempts
+    # is waited out on the event loop, as every sync ORM call of the worker
+    # queues behind that one thread.
+    items = await Item.objects.ain_bulk({purchase['item_id'] for purchase in purchases})
+    errors, _ = _check_basket(purchases, items)
+    if errors:
+        raise PurchaseError(errors)
+
+    attempt_purchase = sync_to_async(_attempt_for(mode))
+    max_attempts = getattr(settings, 'INVENTORY_PURCHASE_MAX_ATTEMPTS', 5)
+    for attempt in range(max_attempts):
+        try:
+            return await attempt_purchase(purchases, user)
+        except (OperationalError, _Retry) as e:
+            delay = _retry_delay(e, attempt, max_attempts)
+        if delay is not None:
+            await asyncio.sleep(delay)
+    _give_up()
+
+
+def _attempt_for(mode):
+    mode = mode or getattr(settings, 'INVENTORY_PURCHASE_MODE', PESSIMISTIC)
+    if mode == PESSIMISTIC:
+        return _purchase_pessimistic
+    if mode == OPTIMISTIC:
+        return _purchase_optimistic
+    raise ValueError(f'Unknown purchase mode: {mode}')
+
+
+def _retry_delay(error, attempt, max_attempts):
+    # Seconds to wait before the next attempt, or None after the last one.
+    logger.warning(f'Purchase attempt {attempt + 1}/{max_attempts} failed: {error!r}')
+    if attempt + 1 >= max_attempts:
+        return None
+    backoff = getattr(settings, 'INVENTORY_PURCHASE_RETRY_BACKOFF', 0.01)
+    return backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+
+
+def _give_up():
+    error_message = 'Purchase could not be completed due to concurrent updates, please retry'
+    logger.error(error_message)
+    raise PurchaseConflict([{'error': error_message}])
+
+
+def _check_basket(purchases, items):
+    # Validates every line against the given items and returns the errors and
+    # the total quantity sold per item. Repeated lines share the stock left
+    # by the lines before them.
+    errors = []
+    remaining = {pk: item.quantityInStock for pk, item in items.items()}
+    sold = {}
+    for purchase in purchases:
+        item_id = purchase['item_id']
+        quantity = purchase['quantity']
+
+        if item_id not in items:
+            error_message = f'Item not found: {item_id}'
+            logger.error(error_message)
+            errors.append({'item_id': item_id, 'error': error_message})
+            continue
+
+        if quantity <= 0:
+            error_message = 'Quantity must be greater than zero'
+            logger.error(f'Item {item_id}: {error_message}')
+            errors.append({'item_id': item_id, 'error': error_message})
+            continue
+
+        if remaining[item_id] < quantity:
+            error_message = 'Not enough stock available'
+            logger.error(f'Item {item_id}: {error_message}')
+            errors.append({'item_id': item_id, 'error': error_message})
+            continue
+
+        remaining[item_id] -= quantity
+        sold[item_id] = sold.get(item_id, 0) + quantity
+    return errors, sold
+
+
+def _purchase_pessimistic(purchases, user):
+    # One locking SELECT for every requested item and one UPDATE for all of
+    # them, so the query count does not grow with the basket.
+    item_ids = sorted({purchase['item_id'] for purchase in purchases})
+    with transaction.atomic():
+        items = Item.objects.select_for_update().in_bulk(item_ids)
+        errors, sold = _check_basket(purchases, items)
+        if errors:
+            raise PurchaseError(errors)
+
+        bill = 0
+        updated = []
+        sales = []
+        lines = []
+        for item_id, quantity in sold.items():
+            item = items[item_id]
+            amount = quantity * item.price
+            sales.append((item_id, item.quantityInStock - quantity, item.quantitySold + quantity, item.price,
+                          item.reorderThreshold))
+            lines.append((item_id, quantity, item.price))
+            item.quantityInStock = F('quantityInStock') - quantity
+            item.quantitySold = F('quantitySold') + quantity
+            item.revenue = F('revenue') + amount
+            bill += amount
+            updated.append(item)
+
+        if updated:
+            Item.objects.bulk_update(updated, ['quantityInStock', 'quantitySold', 'revenue'])
+        append_sale(user, lines)
+        record_sales(sales)
+        record_crossings(sales, sold)
+        invalidate_stock(sold)
+
+    return bill
+
+
+def _purchase_optimistic(purchases, user):
+    # Decrements stock with one conditional UPDATE per item and never reads
+    # before writing: an UPDATE that matches no row means the item is missing
+    # or short of stock. Only then is the basket rolled back and read to work
+    # out which lines failed.
+    sold = {}
+    for purchase in purchases:
+        if purchase['quantity'] > 0:
+            sold[purchase['item_id']] = sold.get(purchase['item_id'], 0) + purchase['quantity']
+    has_invalid_quantity = any(purchase['quantity'] <= 0 for purchase in purchases)
+
+    try:
+        with transaction.atomic():
+            failed = has_invalid_quantity
+            for item_id in sorted(sold):
+                quantity = sold[item_id]
+                updated = Item.objects.filter(pk=item_id, quantityInStock__gte=quantity).update(
+                    quantityInStock=F('quantityInStock') - quantity,
+                    quantitySold=F('quantitySold') + quantity,
+                    revenue=F('revenue') + F('price') * quantity,
+                )
+                if not updated:
+                    failed = True
+                    break
+            if failed:
+                raise _Retry('basket rejected')
+
+            sales = list(Item.objects.filter(pk__in=sold).values_list(
+                'pk', 'quantityInStock', 'quantitySold', 'price', 'reorderThreshold',
+            ))
+            sale = append_sale(user, [(item_id, sold[item_id], price) for item_id, _, _, price, _ in sales])
+            record_sales(sales)
+            record_crossings(sales, sold)
+            invalidate_stock(sold)
+            return sale.total
+    except _Retry:
+        items = Item.objects.in_bulk(sorted({purchase['item_id'] for purchase in purchases}))
+        errors, _ = _check_basket(purchases, items)
+        if errors:
+            raise PurchaseError(errors)
+        # The basket fits the current stock, so another purchase or a restock
+        # changed it between our UPDATE and this read.
+        raise
@@ -0,0 +1,28 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.compat import LONG_SEPARATORS, SHORT_SEPARATORS
+
+# JSONRenderer's output, from one encoder built up front instead of one per
+# response, which also skips the check for circular references (response
+# data is plain dicts and lists, built afresh). Decimals and the other types
+# serializers leave in the data are encoded by the same encoder class.
+# Indented output (Accept: application/json; indent=4) is left to
+# JSONRenderer.
+_encoder = JSONRenderer.encoder_class(
+    ensure_ascii=JSONRenderer.ensure_ascii,
+    allow_nan=not JSONRenderer.strict,
+    separators=SHORT_SEPARATORS if JSONRenderer.compact else LONG_SEPARATORS,
+    check_circular=False,
+)
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = _encoder.encode(data)
+        # As JSONRenderer does, for JavaScript's sake.
+        if '\u2028' in ret or '\u2029' in ret:
+            ret = ret.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+        return ret.encode()
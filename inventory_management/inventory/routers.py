@@ -0,0 +1,113 @@
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger('inventory')
+
+# With replicas in INVENTORY_DB_REPLICAS, requests passing through
+# ReplicaRoutingMiddleware read from one of them, picked once per request
+# among those that are healthy. Everything else reads from the primary:
+# writes, reads inside a transaction, the rest of a request once it has
+# written, and code running outside a request (management commands, jobs).
+_state = ContextVar('inventory_db_routing', default=None)
+
+# alias: (healthy, time.monotonic() of the last check)
+_health = {}
+
+
+class RoutingState:
+    def __init__(self, primary=False):
+        self.primary = primary
+        self.replica = None
+        self.wrote = False
+
+
+@contextmanager
+def routing(primary=False):
+    state = RoutingState(primary)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+def use_primary():
+    # Sends the current request's remaining reads to the primary.
+    state = _state.get()
+    if state is not None:
+        state.primary = True
+
+
+def recheck_replica():
+    # After a database error, the replica the request read from is checked
+    # again before the next request is sent to it.
+    state = _state.get()
+    if state is not None and state.replica not in (None, DEFAULT_DB_ALIAS):
+        _health.pop(state.replica, None)
+
+
+def check_replica(alias):
+    connection = connections[alias]
+    try:
+        connection.ensure_connection()
+        if connection.vendor == 'mysql':
+            with connection.cursor() as cursor:
+                cursor.execute('SHOW REPLICA STATUS')
+                row = cursor.fetchone()
+                columns = [column[0] for column in cursor.description or ()]
+            # No row: the server is not replicating, e.g. a local stand-in.
+            if row is not None:
+                lag = dict(zip(columns, row)).get('Seconds_Behind_Source')
+                if lag is None or lag > settings.INVENTORY_DB_REPLICA_MAX_LAG:
+                    logger.warning(f'Replica {alias} is {lag} seconds behind the primary')
+                    return False
+    except DatabaseError as e:
+        logger.warning(f'Replica {alias} is unavailable: {e}')
+        connection.close()
+        return False
+    return True
+
+
+def is_healthy(alias):
+    healthy, checked = _health.get(alias, (None, None))
+    now = time.monotonic()
+    if checked is None or now - checked >= settings.INVENTORY_DB_REPLICA_CHECK_INTERVAL:
+        was_healthy, healthy = healthy, check_replica(alias)
+        if healthy and was_healthy is False:
+            logger.info(f'Replica {alias} is back')
+        _health[alias] = (healthy, now)
+    return healthy
+
+
+def pick_replica():
+    replicas = settings.INVENTORY_DB_REPLICAS
+    for alias in random.sample(replicas, len(replicas)):
+        if is_healthy(alias):
+            return alias
+    return DEFAULT_DB_ALIAS
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.primary or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if state.replica is None:
+            state.replica = pick_replica()
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.primary = state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
@@ -0,0 +1,128 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+# Read-only fast path for lists: rows are fetched with values() and turned
+# into exactly what the serializer's to_representation would return, by a
+# plan compiled once per serializer class, without model instances or a
+# serializer per row. Many-to-many primary keys come from one query on the
+# through table per page. Serializers with fields the plan cannot reproduce
+# keep going through DRF.
+
+# Fields whose to_representation is a plain conversion of the column value.
+CONVERSIONS = {
+    serializers.IntegerField: int,
+    serializers.CharField: str,
+    serializers.EmailField: str,
+}
+
+_plans = {}
+
+
+def decimal_conversion(field):
+    # DecimalField.to_representation quantizes every value in a fresh
+    # context. Column values already have the field's decimal places, so
+    # those only need formatting; anything else still goes through the field.
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or field.localize or field.normalize_output or field.decimal_places is None:
+        return field.to_representation
+    exponent = -field.decimal_places
+    to_representation = field.to_representation
+
+    def convert(value):
+        if type(value) is Decimal and value.as_tuple().exponent == exponent:
+            return f'{value:f}'
+        return to_representation(value)
+    return convert
+
+
+def conversion(field):
+    if type(field) is serializers.DecimalField:
+        return decimal_conversion(field)
+    return CONVERSIONS.get(type(field), field.to_representation)
+
+
+class RowPlan:
+    def __init__(self, serializer_class):
+        self.serializer = serializer_class()
+        model = self.serializer.Meta.model
+        self.pk = model._meta.pk.attname
+        self.columns = []
+        self.many = []
+        for name, field in self.serializer.fields.items():
+            if field.write_only:
+                continue
+            model_field = model._meta.get_field(field.source)
+            if isinstance(field, ManyRelatedField):
+                if type(field.child_relation) is not PrimaryKeyRelatedField or field.child_relation.pk_field:
+                    raise TypeError(f'{name}: only primary keys of many-to-many fields are supported')
+                through = model_field.remote_field.through
+                self.many.append((name, through, model_field.m2m_column_name(), model_field.m2m_reverse_name()))
+            elif model_field.is_relation:
+                raise TypeError(f'{name}: related fields are not supported')
+            else:
+                self.columns.append((name, field.source, conversion(field)))
+        self.fields = [name for name, field in self.serializer.fields.items() if not field.write_only]
+        self.reorder = self.fields != [column[0] for column in self.columns] + [many[0] for many in self.many]
+
+    def values(self, queryset):
+        # Annotations ride along: the pagination's cursor may be positioned
+        # on one (the search rank).
+        columns = {self.pk, *(source for _, source, _ in self.columns), *queryset.query.annotations}
+        return queryset.prefetch_related(None).values(*columns)
+
+    def related(self, rows, using):
+        related = {}
+        keys = [row[self.pk] for row in rows]
+        for name, through, column, reverse_column in self.many:
+            related[name] = values = defaultdict(list)
+            pairs = through.objects.using(using).filter(**{f'{column}__in': keys}).values_list(column, reverse_column)
+            for key, value in pairs:
+                values[key].append(value)
+        return related
+
+    def represent(self, rows, using):
+        related = self.related(rows, using) if self.many and rows else {}
+        data = []
+        for row in rows:
+            item = {}
+            for name, source, convert in self.columns:
+                value = row[source]
+                item[name] = None if value is None else convert(value)
+            for name, values in related.items():
+                item[name] = values.get(row[self.pk], [])
+            # In the serializer's field order.
+            data.append({name: item[name] for name in self.fields} if self.reorder else item)
+        return data
+
+
+def plan_for(serializer_class):
+    # None when rows cannot replace the serializer.
+    if not settings.INVENTORY_ROW_SERIALIZERS:
+        return None
+    if serializer_class not in _plans:
+        try:
+            _plans[serializer_class] = RowPlan(serializer_class)
+        except (AttributeError, FieldDoesNotExist, TypeError):
+            _plans[serializer_class] = None
+    return _plans[serializer_class]
+
+
+class RowListMixin:
+    # list() through the serializer's row plan, paginated as usual.
+
+    def list(self, request, *args, **kwargs):
+        plan = plan_for(self.get_serializer_class())
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+        queryset = plan.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(plan.represent(page, queryset.db))
+        return Response(plan.represent(list(queryset), queryset.db))
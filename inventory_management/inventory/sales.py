@@ -0,0 +1,190 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BigIntegerField, Case, DecimalField, F, OuterRef, PositiveBigIntegerField, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone as django_timezone
+
+from .cache import invalidate_catalogue
+from .models import Item, ItemSalesBucket, Sale, SaleLine
+from .stock_report import rebuild_report
+
+logger = logging.getLogger('inventory')
+
+# Bucket holding each item's sales from before the ledger existed, and the
+# changes made to its quantitySold and revenue other than by purchases.
+OPENING_BALANCE_START = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+QUANTITY = BigIntegerField()
+REVENUE = DecimalField(max_digits=30, decimal_places=2)
+
+
+def _per_row(values, output_field):
+    # CASE expression giving each row of one UPDATE its own value.
+    return Case(
+        *[When(pk=pk, then=Value(value, output_field=output_field)) for pk, value in values.items()],
+        default=Value(0, output_field=output_field), output_field=output_field,
+    )
+
+
+def bucket_start(moment, granularity=ItemSalesBucket.HOUR):
+    if granularity == ItemSalesBucket.DAY:
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _bucketize(lines):
+    # Sums (item id, time, quantity, amount) lines per item into hourly and
+    # daily buckets: {(item id, granularity, start): [quantity, revenue]}.
+    buckets = defaultdict(lambda: [0, 0])
+    for item_id, created_at, quantity, amount in lines:
+        if item_id is None:
+            continue
+        for granularity, _ in ItemSalesBucket.GRANULARITIES:
+            bucket = buckets[item_id, granularity, bucket_start(created_at, granularity)]
+            bucket[0] += quantity
+            bucket[1] += amount
+    return buckets
+
+
+def append_sale(user, lines):
+    # Writes a basket to the ledger with one INSERT for the sale and one for
+    # its lines, given as (item id, quantity, unit price). Called by the
+    # purchase engine inside its transaction, which also adds the basket to
+    # the sales buckets unless INVENTORY_SALES_ROLLUP_ON_PURCHASE is off and
+    # that is left to rollup_sales.
+    fold = settings.INVENTORY_SALES_ROLLUP_ON_PURCHASE
+    sale = Sale.objects.create(
+        # By id, as request.user may be a token user rather than a User.
+        user_id=user.pk if getattr(user, 'is_authenticated', False) else None,
+        created_at=django_timezone.now(),
+        total=sum((quantity * price for _, quantity, price in lines), 0),
+    )
+    sale_lines = SaleLine.objects.bulk_create([
+        SaleLine(sale=sale, item_id=item_id, quantity=quantity, price=price, amount=quantity * price,
+                 created_at=sale.created_at, rolled_up=fold)
+        for item_id, quantity, price in lines
+    ])
+    if fold:
+        _fold(_bucketize((line.item_id, line.created_at, line.quantity, line.amount) for line in sale_lines))
+    return sale
+
+
+def _fold(buckets):
+    # Adds {(item id, granularity, start): [quantity, revenue]} to
+    # ItemSalesBucket. The buckets are created empty if missing and locked in
+    # key order, then all of them are added to with one UPDATE, so concurrent
+    # purchases and rollups cannot overwrite each other's totals. An increment
+    # rather than an upsert: MySQL cannot name the conflicting columns.
+    keys = sorted(buckets)
+    ItemSalesBucket.objects.bulk_create(
+        [ItemSalesBucket(item_id=item_id, granularity=granularity, start=start) for item_id, granularity, start in keys],
+        ignore_conflicts=True,
+    )
+    existing = ItemSalesBucket.objects.select_for_update().filter(
+        item_id__in={item_id for item_id, _, _ in keys},
+        granularity__in={granularity for _, granularity, _ in keys},
+        start__in={start for _, _, start in keys},
+    ).order_by('item_id', 'granularity', 'start').values_list('pk', 'item_id', 'granularity', 'start')
+    added = {}
+    for pk, item_id, granularity, start in existing:
+        if (item_id, granularity, start) in buckets:
+            added[pk] = buckets[item_id, granularity, start]
+    ItemSalesBucket.objects.filter(pk__in=added).update(
+        quantity=F('quantity') + _per_row({pk: total[0] for pk, total in added.items()}, QUANTITY),
+        revenue=F('revenue') + _per_row({pk: total[1] for pk, total in added.items()}, REVENUE),
+    )
+
+
+def adjust_opening_balances(changes):
+    # Adds {item id: (quantity, revenue)} set on items directly, rather than
+    # sold through purchases, to their opening balance buckets, so that the
+    # rollups keep adding up to quantitySold and revenue.
+    buckets = _bucketize(
+        (item_id, OPENING_BALANCE_START, quantity, revenue)
+        for item_id, (quantity, revenue) in changes.items() if quantity or revenue
+    )
+    if buckets:
+        with transaction.atomic():
+            _fold(buckets)
+
+
+def rollup_sales(batch_size=None):
+    # Folds ledger lines that have not been rolled up yet into the sales
+    # buckets, one transaction per batch. Lines locked by another running
+    # rollup are skipped. Returns the number of lines folded.
+    batch_size = batch_size or settings.INVENTORY_SALES_ROLLUP_BATCH_SIZE
+    folded = 0
+    while True:
+        with transaction.atomic():
+            lines = list(
+                SaleLine.objects.select_for_update(skip_locked=True)
+                .filter(rolled_up=False)
+                .order_by('rolled_up', 'id')
+                .values_list('id', 'item_id', 'created_at', 'quantity', 'amount')[:batch_size]
+            )
+            if not lines:
+                break
+            buckets = _bucketize(line[1:] for line in lines)
+            if buckets:
+                _fold(buckets)
+            SaleLine.objects.filter(pk__in=[line[0] for line in lines]).update(rolled_up=True)
+        folded += len(lines)
+        logger.info(f'Rolled up {len(lines)} sale lines into {len(buckets)} buckets')
+        if len(lines) < batch_size:
+            break
+    return folded
+
+
+def _rolled_up_totals():
+    buckets = ItemSalesBucket.objects.filter(item=OuterRef('pk'), granularity=ItemSalesBucket.DAY).values('item')
+    return {
+        'quantitySold': Coalesce(
+            Subquery(buckets.annotate(total=Sum('quantity')).values('total')),
+            Value(0), output_field=PositiveBigIntegerField(),
+        ),
+        'revenue': Coalesce(
+            Subquery(buckets.annotate(total=Sum('revenue')).values('total')),
+            Value(0), output_field=DecimalField(max_digits=30, decimal_places=2),
+        ),
+    }
+
+
+def check_item_counters():
+    # Rolls up pending lines, then lists the items whose quantitySold or
+    # revenue differ from their rollups, such as counters edited by hand.
+    rollup_sales()
+    problems = []
+    totals = Item.objects.annotate(**{f'rolled_up_{field}': expression for field, expression in _rolled_up_totals().items()})
+    for item in totals.only('pk', 'item_id', 'quantitySold', 'revenue').order_by('pk'):
+        if item.quantitySold != item.rolled_up_quantitySold or item.revenue != item.rolled_up_revenue:
+            problems.append(
+                f'Item {item.item_id} has sold {item.quantitySold} for {item.revenue}, '
+                f'its sales add up to {item.rolled_up_quantitySold} for {item.rolled_up_revenue}'
+            )
+    return problems
+
+
+def rebuild_item_counters():
+    # Resets every item's quantitySold and revenue to the sum of its rollups
+    # with one UPDATE, after rolling up pending lines.
+    rollup_sales()
+    with transaction.atomic():
+        updated = Item.objects.update(**_rolled_up_totals())
+        rebuild_report()
+        invalidate_catalogue()
+    logger.info(f'Rebuilt sales counters of {updated} items from the rollups')
+    return updated
+
+
+def prune_ledger(before):
+    # Deletes rolled up sales older than before; their totals stay in the
+    # buckets. Sales with lines still pending are kept.
+    pending = SaleLine.objects.filter(rolled_up=False).values('sale_id')
+    _, deleted = Sale.objects.filter(created_at__lt=before).exclude(pk__in=pending).delete()
+    deleted = deleted.get(Sale._meta.label, 0)
+    logger.info(f'Pruned {deleted} sales older than {before}')
+    return deleted
@@ -0,0 +1,143 @@
+import logging
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, FloatField, IntegerField, OuterRef, Subquery
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+from rest_framework.filters import BaseFilterBackend
+
+from .cache import invalidate_catalogue
+from .models import Item, ItemSearchGram
+
+logger = logging.getLogger('inventory')
+
+SEARCH_RANK = 'search_rank'
+GRAM_SIZE = 3
+PADDING = ' ' * (GRAM_SIZE - 1)
+
+
+def words(text):
+    return re.findall(r'\w+', text.lower())
+
+
+def _grams(text):
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+def name_grams(name):
+    # Trigrams of every word, padded at the front so that the first letters
+    # of a word get grams of their own for prefix matching.
+    grams = set()
+    for word in words(name):
+        grams |= _grams(PADDING + word)
+    return grams
+
+
+class TrigramSearchBackend:
+    # Works on every database: names are indexed as trigrams in
+    # ItemSearchGram. The items having every trigram of the query are found
+    # on the (gram, item) index and ranked by the number of query trigrams
+    # they share. Words shorter than a trigram only match the beginning of a
+    # word.
+
+    def search(self, queryset, query):
+        query_words = words(query)
+        if not query_words:
+            return queryset.filter(name__icontains=query).annotate(**{SEARCH_RANK: Count('pk')})
+
+        required = set()
+        ranked = set()
+        for word in query_words:
+            prefix = _grams(PADDING + word)
+            required |= _grams(word) if len(word) >= GRAM_SIZE else prefix
+            ranked |= prefix
+        ranked |= required
+
+        candidates = (
+            ItemSearchGram.objects.filter(gram__in=required).values('item_id')
+            .annotate(matched=Count('gram')).filter(matched=len(required)).values('item_id')
+        )
+        rank = (
+            ItemSearchGram.objects.filter(item_id=OuterRef('pk'), gram__in=ranked).order_by().values('item_id')
+            .annotate(shared=Count('gram')).values('shared')
+        )
+        queryset = queryset.filter(pk__in=candidates)
+        # Having the trigrams of a word does not make a name contain it (they
+        # can come from several words), so the candidates, and only they, are
+        # checked with LIKE. The database applies it to the rows the index
+        # found, never to the whole table.
+        for word in query_words:
+            queryset = queryset.filter(name__icontains=word)
+        return queryset.annotate(**{SEARCH_RANK: Subquery(rank, output_field=IntegerField())})
+
+    def index_items(self, items):
+        items = list(items)
+        with transaction.atomic():
+            ItemSearchGram.objects.filter(item_id__in=[item.pk for item in items]).delete()
+            ItemSearchGram.objects.bulk_create(
+                [ItemSearchGram(item_id=item.pk, gram=gram) for item in items for gram in name_grams(item.name)],
+                batch_size=1000,
+            )
+
+    def rebuild(self, batch_size=2000):
+        with transaction.atomic():
+            ItemSearchGram.objects.all().delete()
+            batch = []
+            for pk, name in Item.objects.values_list('id', 'name').iterator(chunk_size=batch_size):
+                batch.extend(ItemSearchGram(item_id=pk, gram=gram) for gram in name_grams(name))
+                if len(batch) >= batch_size:
+                    ItemSearchGram.objects.bulk_create(batch)
+                    batch = []
+            ItemSearchGram.objects.bulk_create(batch)
+            invalidate_catalogue()
+
+
+class MySQLFullTextSearchBackend:
+    # Uses the FULLTEXT index on inventory_item.name created by migration
+    # 0006 on MySQL. Every query word must match, as a word prefix.
+
+    def search(self, queryset, query):
+        query_words = words(query)
+        if not query_words:
+            return queryset.filter(name__icontains=query).annotate(**{SEARCH_RANK: Count('pk')})
+
+        terms = ' '.join(f'+{word}*' for word in query_words)
+        rank = RawSQL('MATCH (inventory_item.name) AGAINST (%s IN BOOLEAN MODE)', (terms,), output_field=FloatField())
+        return queryset.annotate(**{SEARCH_RANK: rank}).filter(**{f'{SEARCH_RANK}__gt': 0})
+
+    def index_items(self, items):
+        pass
+
+    def rebuild(self):
+        pass
+
+
+def get_search_backend():
+    backend = getattr(settings, 'INVENTORY_SEARCH_BACKEND', 'auto')
+    if backend == 'auto':
+        if connection.vendor == 'mysql':
+            return MySQLFullTextSearchBackend()
+        return TrigramSearchBackend()
+    return import_string(backend)()
+
+
+class ItemSearchFilter(BaseFilterBackend):
+    # ?search= filter for ItemDetailsViewSet. Matches are ranked, and
+    # KeysetPagination pages through them by rank through get_ordering.
+
+    def get_search_query(self, request):
+        return request.query_params.get('search', '').strip()
+
+    def filter_queryset(self, request, queryset, view):
+        search_query = self.get_search_query(request)
+        if not search_query:
+            return queryset
+        logger.info(f'Search query: {search_query}')
+        return get_search_backend().search(queryset, search_query)
+
+    def get_ordering(self, request, queryset, view):
+        if self.get_search_query(request):
+            return ('-' + SEARCH_RANK, 'id')
+        return None
@@ -1,5 +1,7 @@
 from rest_framework import serializers
-from .models import Item, Supplier
+from django.db import transaction
+from django.urls import reverse
+from .models import Item, Job, Supplier
 from django.contrib.auth.models import User
 
 class SupplierSerializer(serializers.ModelSerializer):
@@ -12,6 +14,12 @@ class ItemAdminSerializer(serializers.ModelSerializer):
         model = Item
         fields = '__all__'
 
+    def update(self, item, validated_data):
+        # The item's row stays locked from reading its sales counters to the
+        # save, see inventory.signals.item_changing.
+        with transaction.atomic():
+            return super().update(item, validated_data)
+
 class ItemCustomerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Item
@@ -39,4 +47,25 @@ class PurchaseItemSerializer(serializers.Serializer):
     quantity = serializers.IntegerField()
 
 class PurchaseSerializer(serializers.Serializer):
-    purchases = serializers.ListSerializer(child=PurchaseItemSerializer())
\ No newline at end of file
+    purchases = serializers.ListSerializer(child=PurchaseItemSerializer())
+
+class JobSerializer(serializers.ModelSerializer):
+    result = serializers.SerializerMethodField()
+    result_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = ['id', 'kind', 'status', 'result', 'result_url', 'error', 'attempts', 'created_at', 'started_at', 'finished_at']
+
+    def get_result(self, job):
+        # File results are downloaded from result_url; their path stays private.
+        if job.result is None or 'file' in job.result:
+            return None
+        return job.result
+
+    def get_result_url(self, job):
+        if job.status != Job.SUCCEEDED:
+            return None
+        request = self.context.get('request')
+        url = reverse('job-result', kwargs={'pk': job.pk})
+        return request.build_absolute_uri(url) if request else url
@@ -0,0 +1,113 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .authentication import revoke_user_tokens
+from .cache import invalidate_catalogue, invalidate_items
+from .models import Item, Supplier
+from .sales import adjust_opening_balances
+from .search import get_search_backend
+from .stock_report import record_item_change, record_item_delete
+
+_muted = ContextVar('inventory_signals_muted', default=False)
+
+# Changing any of these makes the tokens a user already holds stale.
+TOKEN_USER_FIELDS = ('username', 'is_staff', 'is_superuser', 'is_active', 'password')
+
+# Purchases add to these with UPDATEs; saves that set them are adjustments.
+SALES_FIELDS = ('quantitySold', 'revenue')
+
+
+@contextmanager
+def muted_signals():
+    # For bulk writers that refresh the stock report, search index and cache
+    # once for the whole batch instead of once per row.
+    token = _muted.set(True)
+    try:
+        yield
+    finally:
+        _muted.reset(token)
+
+
+def _sales_of(item):
+    return tuple(Item._meta.get_field(field).to_python(getattr(item, field)) for field in SALES_FIELDS)
+
+
+@receiver(pre_save, sender=Item)
+def item_changing(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or _muted.get():
+        return
+    if update_fields is not None and not set(update_fields) & set(SALES_FIELDS):
+        return
+    old = None
+    if instance.pk is not None:
+        rows = Item.objects.filter(pk=instance.pk)
+        if transaction.get_connection().in_atomic_block:
+            # No purchase may add to the counters between here and the save.
+            rows = rows.select_for_update()
+        old = rows.values_list(*SALES_FIELDS).first()
+    instance._sales_before = old or (0, 0)
+
+
+@receiver(post_save, sender=Item)
+def item_saved(sender, instance, raw=False, **kwargs):
+    if not raw and not _muted.get():
+        before = getattr(instance, '_sales_before', None)
+        if before is not None:
+            del instance._sales_before
+            after = _sales_of(instance)
+            adjust_opening_balances({instance.pk: (after[0] - before[0], after[1] - before[1])})
+        record_item_change(instance)
+        get_search_backend().index_items([instance])
+        invalidate_items([instance.pk])
+
+
+@receiver(post_delete, sender=Item)
+def item_deleted(sender, instance, **kwargs):
+    if _muted.get():
+        return
+    record_item_delete()
+    invalidate_items([instance.pk])
+
+
+@receiver(m2m_changed, sender=Item.suppliers.through)
+def item_suppliers_changed(sender, instance, action, reverse, **kwargs):
+    if action.startswith('post_') and not _muted.get():
+        if reverse:
+            invalidate_catalogue()
+        else:
+            invalidate_items([instance.pk])
+
+
+@receiver(post_delete, sender=Supplier)
+def supplier_deleted(sender, instance, **kwargs):
+    if not _muted.get():
+        invalidate_catalogue()
+
+
+@receiver(pre_save, sender=User)
+def user_changing(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & set(TOKEN_USER_FIELDS):
+        return
+    old = User.objects.filter(pk=instance.pk).values(*TOKEN_USER_FIELDS).first()
+    instance._revoke_tokens = old is not None and any(
+        old[field] != getattr(instance, field) for field in TOKEN_USER_FIELDS
+    )
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, raw=False, **kwargs):
+    if getattr(instance, '_revoke_tokens', False):
+        instance._revoke_tokens = False
+        revoke_user_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    revoke_user_tokens(instance.pk)
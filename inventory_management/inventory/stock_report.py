@@ -0,0 +1,183 @@
+import logging
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import SALES_VALUE, STOCK_HEADROOM, Item, LowStockItem, StockReport
+
+logger = logging.getLogger('inventory')
+
+REPORT_ID = 1
+
+
+def get_report():
+    # Reads the snapshot instead of sorting the Item table: one query for the
+    # best sellers and one for the low-stock list.
+    report = (
+        StockReport.objects
+        .select_related('most_sold_item_revenue', 'most_sold_item_quantity')
+        .filter(pk=REPORT_ID)
+        .first()
+    )
+    if report is None:
+        report = rebuild_report()
+    return {
+        'low_stock_items': Item.objects.filter(low_stock__isnull=False),
+        'most_sold_item_revenue': report.most_sold_item_revenue,
+        'most_sold_item_quantity': report.most_sold_item_quantity,
+    }
+
+
+def best_sellers_by_revenue():
+    # Orders by the exact expression of item_sales_value_idx so the database
+    # can walk that index instead of sorting the table.
+    return Item.objects.order_by(SALES_VALUE.desc())
+
+
+def best_sellers_by_quantity():
+    return Item.objects.order_by('-quantitySold')
+
+
+def low_stock_items():
+    # Filters on the exact expression of item_reorder_idx, like the best
+    # sellers by revenue.
+    return Item.objects.alias(headroom=STOCK_HEADROOM).filter(headroom__lt=0)
+
+
+def _top_by_revenue():
+    return best_sellers_by_revenue().first()
+
+
+def _top_by_quantity():
+    return best_sellers_by_quantity().first()
+
+
+def compute_report():
+    top_revenue = _top_by_revenue()
+    top_quantity = _top_by_quantity()
+    return {
+        'most_sold_item_revenue': top_revenue,
+        'most_sold_revenue': top_revenue.quantitySold * top_revenue.price if top_revenue else 0,
+        'most_sold_item_quantity': top_quantity,
+        'most_sold_quantity': top_quantity.quantitySold if top_quantity else 0,
+        'low_stock_ids': set(low_stock_items().values_list('pk', flat=True)),
+    }
+
+
+def rebuild_report():
+    logger.info('Rebuilding stock report snapshot')
+    with transaction.atomic():
+        computed = compute_report()
+        low_stock_ids = computed.pop('low_stock_ids')
+        report, _ = StockReport.objects.update_or_create(pk=REPORT_ID, defaults=computed)
+        LowStockItem.objects.exclude(item_id__in=low_stock_ids).delete()
+        LowStockItem.objects.bulk_create(
+            [LowStockItem(item_id=pk) for pk in low_stock_ids],
+            ignore_conflicts=True,
+        )
+    return report
+
+
+def check_report():
+    # Compares the snapshot with a from-scratch computation and returns a
+    # list of human readable discrepancies (empty when consistent). Best
+    # sellers are compared by value, since ties may pick either item.
+    report = StockReport.objects.filter(pk=REPORT_ID).first()
+    if report is None:
+        return ['Stock report snapshot has not been built']
+
+    computed = compute_report()
+    problems = []
+    if report.most_sold_revenue != computed['most_sold_revenue']:
+        problems.append(
+            f'Most sold revenue is {report.most_sold_revenue}, expected {computed["most_sold_revenue"]}'
+        )
+    if report.most_sold_quantity != computed['most_sold_quantity']:
+        problems.append(
+            f'Most sold quantity is {report.most_sold_quantity}, expected {computed["most_sold_quantity"]}'
+        )
+    if (report.most_sold_item_revenue_id is None) != (computed['most_sold_item_revenue'] is None):
+        problems.append('Most sold item by revenue is missing or stale')
+    if (report.most_sold_item_quantity_id is None) != (computed['most_sold_item_quantity'] is None):
+        problems.append('Most sold item by quantity is missing or stale')
+
+    low_stock_ids = set(LowStockItem.objects.values_list('item_id', flat=True))
+    for pk in sorted(computed['low_stock_ids'] - low_stock_ids):
+        problems.append(f'Item {pk} is low on stock but missing from the report')
+    for pk in sorted(low_stock_ids - computed['low_stock_ids']):
+        problems.append(f'Item {pk} is listed as low on stock but is not')
+    return problems
+
+
+def _raise_best_sellers(revenue_item_id, revenue, quantity_item_id, quantity):
+    # Purchases only ever grow an item's sales, so a best seller can be
+    # replaced with a conditional UPDATE that only writes on a new maximum.
+    StockReport.objects.filter(
+        Q(most_sold_revenue__lt=revenue) | Q(most_sold_item_revenue__isnull=True), pk=REPORT_ID,
+    ).update(most_sold_item_revenue_id=revenue_item_id, most_sold_revenue=revenue)
+    StockReport.objects.filter(
+        Q(most_sold_quantity__lt=quantity) | Q(most_sold_item_quantity__isnull=True), pk=REPORT_ID,
+    ).update(most_sold_item_quantity_id=quantity_item_id, most_sold_quantity=quantity)
+
+
+def record_sales(sales):
+    # Called by the purchase engine inside its transaction with
+    # (item id, quantityInStock, quantitySold, price, reorderThreshold) after
+    # the purchase.
+    #
+    # The best sellers are raised once the transaction commits: the UPDATE
+    # locks the one report row, which every purchase holding it until commit
+    # would turn into a queue. Raising only ever moves to a new maximum, so
+    # the order these run in does not matter, and a failure leaves the
+    # purchase committed and the snapshot to check_stock_report.
+    if not sales:
+        return
+    transaction.on_commit(lambda: _raise_best_sellers_of(sales), robust=True)
+
+    low_stock = [LowStockItem(item_id=sale[0]) for sale in sales if sale[1] < sale[4]]
+    if low_stock:
+        LowStockItem.objects.bulk_create(low_stock, ignore_conflicts=True)
+
+
+def _raise_best_sellers_of(sales):
+    by_revenue = max(sales, key=lambda sale: sale[2] * sale[3])
+    by_quantity = max(sales, key=lambda sale: sale[2])
+    _raise_best_sellers(by_revenue[0], by_revenue[2] * by_revenue[3], by_quantity[0], by_quantity[2])
+
+
+def record_item_change(item):
+    # Called when an item is created or edited directly. Edits can lower an
+    # item's sales, in which case the affected best seller is recomputed.
+    if item.quantityInStock < item.reorderThreshold:
+        LowStockItem.objects.get_or_create(item=item)
+    else:
+        LowStockItem.objects.filter(item=item).delete()
+
+    report = StockReport.objects.filter(pk=REPORT_ID).first()
+    if report is None:
+        return
+    revenue = item.quantitySold * item.price
+    if report.most_sold_item_revenue_id == item.pk and revenue < report.most_sold_revenue:
+        top = _top_by_revenue()
+        StockReport.objects.filter(pk=REPORT_ID).update(most_sold_item_revenue=top, most_sold_revenue=top.quantitySold * top.price)
+    if report.most_sold_item_quantity_id == item.pk and item.quantitySold < report.most_sold_quantity:
+        top = _top_by_quantity()
+        StockReport.objects.filter(pk=REPORT_ID).update(most_sold_item_quantity=top, most_sold_quantity=top.quantitySold)
+    _raise_best_sellers(item.pk, revenue, item.pk, item.quantitySold)
+
+
+def record_item_delete():
+    # Deleting a best seller nulls its snapshot column; refill it.
+    report = StockReport.objects.filter(pk=REPORT_ID).first()
+    if report is None:
+        return
+    if report.most_sold_item_revenue_id is None:
+        top = _top_by_revenue()
+        StockReport.objects.filter(pk=REPORT_ID).update(
+            most_sold_item_revenue=top, most_sold_revenue=top.quantitySold * top.price if top else 0,
+        )
+    if report.most_sold_item_quantity_id is None:
+        top = _top_by_quantity()
+        StockReport.objects.filter(pk=REPORT_ID).update(
+            most_sold_item_quantity=top, most_sold_quantity=top.quantitySold if top else 0,
+        )
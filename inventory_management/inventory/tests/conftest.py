@@ -0,0 +1,8 @@
+import pytest
+from django.core.cache import cache
+
+@pytest.fixture(autouse=True)
+def clear_cache():                      # cached catalogue responses must not leak between tests
+    cache.clear()
+    yield
+    cache.clear()
@@ -0,0 +1,138 @@
+import asyncio
+import time
+
+import pytest
+from django.db import OperationalError
+from django.test import Client
+from django.urls import reverse
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+from django.contrib.auth.models import User
+from inventory import purchases
+from inventory.models import Item, Supplier
+
+@pytest.fixture
+def client():
+    return Client()
+
+@pytest.fixture
+def admin_user(db):
+    user = User.objects.create_user(username='admin', password='password', is_staff=True)
+    return user
+
+@pytest.fixture
+def worker_user(db):
+    user = User.objects.create_user(username='worker', password='password', is_staff=False)
+    return user
+
+@pytest.fixture
+def items(db):
+    supplier = Supplier.objects.create(name='Test Supplier', contact='1234567890', email='test@example.com')
+    items = [
+        Item.objects.create(item_id=i, name=f'Item {i}', quantityInStock=10, quantitySold=0, revenue=0, price=5)
+        for i in range(1, 6)
+    ]
+    items[0].suppliers.add(supplier)
+    return items
+
+def auth(user):
+    return {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(user)}'}
+
+@pytest.mark.django_db
+def test_async_list_is_keyset_paginated(client, worker_user, items):
+    url = reverse('async-item-list') + '?page_size=2'
+    names = []
+    while url:
+        response = client.get(url, **auth(worker_user))
+        assert response.status_code == status.HTTP_200_OK
+        names += [item['name'] for item in response.json()['results']]
+        url = response.json()['next']
+    assert names == [f'Item {i}' for i in range(1, 6)]
+
+@pytest.mark.django_db
+def test_async_list_searches_and_pages_back(client, worker_user, items):
+    Item.objects.create(item_id=6, name='Lamp', quantityInStock=10, quantitySold=0, revenue=0, price=5)
+    response = client.get(reverse('async-item-list') + '?search=lamp', **auth(worker_user))
+    assert [item['name'] for item in response.json()['results']] == ['Lamp']
+
+    first = client.get(reverse('async-item-list') + '?page_size=2', **auth(worker_user)).json()
+    assert first['previous'] is None
+    second = client.get(first['next'], **auth(worker_user)).json()
+    assert [item['name'] for item in second['results']] == ['Item 3', 'Item 4']
+    back = client.get(second['previous'], **auth(worker_user)).json()
+    assert back['results'] == first['results']
+
+@pytest.mark.django_db
+def test_async_list_fields_per_role(client, admin_user, items):
+    customer = client.get(reverse('async-item-list')).json()['results'][0]
+    assert set(customer) == {'item_id', 'name', 'price'}
+
+    admin = client.get(reverse('async-item-list'), **auth(admin_user)).json()['results'][0]
+    assert admin['quantityInStock'] == 10
+    assert admin['suppliers'] == list(items[0].suppliers.values_list('pk', flat=True))
+
+@pytest.mark.django_db
+def test_async_detail(client, admin_user, items):
+    response = client.get(reverse('async-item-detail', kwargs={'pk': items[1].pk}), **auth(admin_user))
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()['name'] == 'Item 2'
+
+    response = client.get(reverse('async-item-detail', kwargs={'pk': 999}), **auth(admin_user))
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+@pytest.mark.django_db
+def test_async_invalid_token(client, items):
+    response = client.get(reverse('async-item-list'), HTTP_AUTHORIZATION='Bearer nonsense')
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+@pytest.mark.django_db
+def test_async_purchase(client, worker_user, items):
+    url = reverse('async-purchase-api')
+    data = {'purchases': [{'item_id': items[0].pk, 'quantity': 3}, {'item_id': items[1].pk, 'quantity': 1}]}
+    response = client.put(url, data, content_type='application/json', **auth(worker_user))
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {'message': 'Purchase successful.', 'AmountToPay': 20.0}
+    assert type(response.json()['AmountToPay']) is float
+
+    sync = client.put(reverse('purchase-api'), data, content_type='application/json', **auth(worker_user))
+    assert response.json() == sync.json()
+    assert Item.objects.get(pk=items[0].pk).quantityInStock == 4
+
+@pytest.mark.django_db
+def test_async_purchase_errors(client, worker_user, items):
+    url = reverse('async-purchase-api')
+    response = client.put(url, {'purchases': [{'item_id': items[0].pk, 'quantity': 1}]}, content_type='application/json')
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    data = {'purchases': [{'item_id': items[0].pk, 'quantity': 11}, {'item_id': 999, 'quantity': 1}]}
+    response = client.put(url, data, content_type='application/json', **auth(worker_user))
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert [error['error'] for error in response.json()['errors']] == ['Not enough stock available', 'Item not found: 999']
+    assert Item.objects.get(pk=items[0].pk).quantityInStock == 10
+
+    response = client.put(url, {'purchases': 'none'}, content_type='application/json', **auth(worker_user))
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+@pytest.mark.django_db
+def test_async_purchase_backs_off_on_the_event_loop(client, worker_user, items, monkeypatch):
+    attempt = purchases._purchase_pessimistic
+    calls = []
+    def deadlock_once(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise OperationalError('Deadlock found when trying to get lock')
+        return attempt(*args)
+    def blocking_sleep(seconds):
+        raise AssertionError('time.sleep would hold the sync thread')
+    sleeps = []
+    async def event_loop_sleep(seconds):
+        sleeps.append(seconds)
+    monkeypatch.setattr(purchases, '_purchase_pessimistic', deadlock_once)
+    monkeypatch.setattr(time, 'sleep', blocking_sleep)
+    monkeypatch.setattr(asyncio, 'sleep', event_loop_sleep)
+
+    data = {'purchases': [{'item_id': items[0].pk, 'quantity': 3}]}
+    response = client.put(reverse('async-purchase-api'), data, content_type='application/json', **auth(worker_user))
+    assert response.status_code == status.HTTP_200_OK
+    assert len(calls) == 2 and len(sleeps) == 1
+    assert Item.objects.get(pk=items[0].pk).quantityInStock == 7
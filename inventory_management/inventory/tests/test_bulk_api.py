@@ -0,0 +1,174 @@
+import pytest
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.contrib.auth.models import User
+from inventory.models import Item, Supplier, StockReport
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def admin_user(db):
+    user = User.objects.create_user(username='admin', password='password', is_staff=True)
+    return user
+
+@pytest.fixture
+def worker_user(db):
+    user = User.objects.create_user(username='worker', password='password', is_staff=False)
+    return user
+
+@pytest.fixture
+def supplier(db):
+    return Supplier.objects.create(name='Test Supplier', contact='1234567890', email='test@example.com')
+
+def item_rows(count, start=1, **extra):
+    return [
+        dict({'item_id': i, 'name': f'Item {i}', 'quantityInStock': 10, 'quantitySold': 0, 'revenue': 0, 'price': 5}, **extra)
+        for i in range(start, start + count)
+    ]
+
+@pytest.mark.django_db
+def test_bulk_create_items(api_client, admin_user, supplier):
+    api_client.force_authenticate(user=admin_user)
+    response = api_client.post(reverse('item-bulk'), item_rows(3, suppliers=[supplier.pk]), format='json')
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data == {'created': 3}
+    assert Item.objects.count() == 3
+    assert set(Item.objects.filter(suppliers=supplier).values_list('item_id', flat=True)) == {1, 2, 3}
+
+    results = api_client.get(reverse('item-list'), {'search': 'item'}).data['results']
+    assert len(results) == 3
+    assert StockReport.objects.get().most_sold_item_quantity is not None
+
+@pytest.mark.django_db
+def test_bulk_create_items_worker_forbidden(api_client, worker_user):
+    api_client.force_authenticate(user=worker_user)
+    response = api_client.post(reverse('item-bulk'), item_rows(1), format='json')
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    assert not Item.objects.exists()
+
+@pytest.mark.django_db
+def test_bulk_create_items_reports_every_bad_row(api_client, admin_user):
+    api_client.force_authenticate(user=admin_user)
+    Item.objects.create(item_id=1, name='Existing', quantityInStock=10, quantitySold=0, revenue=0, price=5)
+    rows = item_rows(4)
+    rows[2]['item_id'] = 2
+    rows[3]['price'] = 'free'
+    rows.append({'item_id': 9, 'name': 'Orphan', 'quantityInStock': 1, 'quantitySold': 0, 'revenue': 0, 'price': 5, 'suppliers': [999]})
+
+    response = api_client.post(reverse('item-bulk'), rows, format='json')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert [error['index'] for error in response.data['errors']] == [0, 2, 3, 4]
+    assert 'item_id' in response.data['errors'][0]['errors']
+    assert 'price' in response.data['errors'][2]['errors']
+    assert Item.objects.count() == 1
+
+@pytest.mark.django_db
+def test_bulk_create_items_query_count_is_constant(api_client, admin_user, supplier, django_assert_max_num_queries):
+    api_client.force_authenticate(user=admin_user)
+    with django_assert_max_num_queries(30):
+        response = api_client.post(reverse('item-bulk'), item_rows(200, suppliers=[supplier.pk]), format='json')
+    assert response.data == {'created': 200}
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('upsert', [True, False])
+def test_bulk_update_items(upsert, monkeypatch, api_client, admin_user, supplier):
+    # Without upserts on a named column, as on MySQL.
+    monkeypatch.setattr(connection.features, 'supports_update_conflicts_with_target', upsert)
+    api_client.force_authenticate(user=admin_user)
+    api_client.post(reverse('item-bulk'), item_rows(3, suppliers=[supplier.pk]), format='json')
+    item = Item.objects.get(item_id=2)
+    api_client.get(reverse('item-detail', kwargs={'pk': item.pk}))
+
+    rows = [{'item_id': 2, 'name': 'Renamed', 'suppliers': []}, {'item_id': 3, 'price': 7}]
+    response = api_client.patch(reverse('item-bulk'), rows, format='json')
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data == {'updated': 2}
+
+    data = api_client.get(reverse('item-detail', kwargs={'pk': item.pk})).data
+    assert data['name'] == 'Renamed'
+    assert data['suppliers'] == []
+    assert Item.objects.get(item_id=3).price == 7
+    assert Item.objects.get(item_id=3).suppliers.count() == 1
+
+@pytest.mark.django_db
+def test_bulk_update_items_unknown_item(api_client, admin_user):
+    api_client.force_authenticate(user=admin_user)
+    api_client.post(reverse('item-bulk'), item_rows(1), format='json')
+    rows = [{'item_id': 1, 'name': 'Renamed'}, {'item_id': 5, 'name': 'Missing'}, {'name': 'No id'}]
+    response = api_client.patch(reverse('item-bulk'), rows, format='json')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert [error['index'] for error in response.data['errors']] == [1, 2]
+    assert Item.objects.get(item_id=1).name == 'Item 1'
+
+@pytest.mark.django_db
+def test_bulk_delete_items(api_client, admin_user):
+    api_client.force_authenticate(user=admin_user)
+    api_client.post(reverse('item-bulk'), item_rows(3), format='json')
+    assert len(api_client.get(reverse('item-list')).data['results']) == 3
+
+    response = api_client.delete(reverse('item-bulk'), [1, 3, 8], format='json')
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data == {'deleted': 2}
+    assert [item['item_id'] for item in api_client.get(reverse('item-list')).data['results']] == [2]
+
+@pytest.mark.django_db
+def test_bulk_create_suppliers(api_client, admin_user, supplier):
+    api_client.force_authenticate(user=admin_user)
+    rows = [
+        {'name': 'A', 'contact': '1111111111', 'email': 'a@example.com'},
+        {'name': 'B', 'contact': '2222222222', 'email': 'b@example.com'},
+    ]
+    response = api_client.post(reverse('supplier-bulk'), rows, format='json')
+    assert response.status_code == status.HTTP_201_CREATED
+    assert Supplier.objects.count() == 3
+
+@pytest.mark.django_db
+def test_bulk_create_suppliers_checks_uniqueness(api_client, admin_user, supplier):
+    api_client.force_authenticate(user=admin_user)
+    rows = [
+        {'name': 'A', 'contact': '1234567890', 'email': 'a@example.com'},
+        {'name': 'B', 'contact': '2222222222', 'email': 'b@example.com'},
+        {'name': 'C', 'contact': '3333333333', 'email': 'b@example.com'},
+        {'name': 'D', 'contact': '12', 'email': 'd@example.com'},
+    ]
+    response = api_client.post(reverse('supplier-bulk'), rows, format='json')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert [error['index'] for error in response.data['errors']] == [0, 2, 3]
+    assert Supplier.objects.count() == 1
+
+@pytest.mark.django_db
+def test_bulk_update_and_delete_suppliers(api_client, admin_user, supplier):
+    api_client.force_authenticate(user=admin_user)
+    other = Supplier.objects.create(name='Other', contact='2222222222', email='other@example.com')
+
+    response = api_client.patch(reverse('supplier-bulk'), [{'id': supplier.pk, 'email': 'other@example.com'}], format='json')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    response = api_client.patch(reverse('supplier-bulk'), [{'id': supplier.pk, 'email': 'test@example.com', 'name': 'Renamed'}], format='json')
+    assert response.data == {'updated': 1}
+    assert Supplier.objects.get(pk=supplier.pk).name == 'Renamed'
+
+    response = api_client.delete(reverse('supplier-bulk'), [supplier.pk, other.pk], format='json')
+    assert response.data == {'deleted': 2}
+    assert not Supplier.objects.exists()
+
+@pytest.mark.django_db
+def test_bulk_updates_check_their_keys(api_client, admin_user, supplier):
+    api_client.force_authenticate(user=admin_user)
+    api_client.post(reverse('item-bulk'), item_rows(2), format='json')
+
+    rows = [{'id': 'abc', 'name': 'Bad'}, {'id': supplier.pk, 'name': 'First'}, {'id': supplier.pk, 'name': 'Second'}, {'id': None}]
+    response = api_client.patch(reverse('supplier-bulk'), rows, format='json')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert [(error['index'], list(error['errors'])) for error in response.data['errors']] == [(0, ['id']), (2, ['id']), (3, ['id'])]
+    assert Supplier.objects.get(pk=supplier.pk).name == 'Test Supplier'
+
+    rows = [{'item_id': 1, 'name': 'First'}, {'item_id': 1, 'name': 'Second'}, {'item_id': 'x', 'name': 'Bad'}]
+    response = api_client.patch(reverse('item-bulk'), rows, format='json')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert [error['index'] for error in response.data['errors']] == [1, 2]
+    assert Item.objects.get(item_id=1).name == 'Item 1'
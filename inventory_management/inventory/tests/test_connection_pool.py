@@ -0,0 +1,108 @@
+import threading
+import time
+
+import pytest
+from django.db import OperationalError, connections
+from django.db.backends.sqlite3 import base as sqlite3
+from inventory import pool
+from inventory.metrics import registry
+
+# The pool is used with MySQL (inventory.pooled_mysql), tried here on SQLite.
+class DatabaseWrapper(pool.PooledDatabaseWrapperMixin, sqlite3.DatabaseWrapper):
+    pass
+
+@pytest.fixture(autouse=True)
+def pool_settings(settings, django_db_blocker):
+    settings.INVENTORY_DB_POOL_SIZE = 1
+    settings.INVENTORY_DB_POOL_TIMEOUT = 0.2
+    pool.pools.clear()
+    with django_db_blocker.unblock():
+        yield
+    pool.pools.clear()
+
+@pytest.fixture
+def database(tmp_path):
+    return connections.configure_settings({
+        'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': str(tmp_path / 'pooled.sqlite3')},
+    })['default']
+
+def wrapper(database):
+    return DatabaseWrapper(database, alias='pooled')
+
+def query(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+        return cursor.fetchone()
+
+def test_closed_connections_are_reused(database):
+    first = wrapper(database)
+    assert query(first) == (1,)
+    raw = first.connection
+    first.close()
+
+    second = wrapper(database)
+    assert query(second) == (1,)
+    assert second.connection is raw
+    [connection_pool] = pool.pools.values()
+    assert (connection_pool.checkouts, connection_pool.open, connection_pool.in_use) == (2, 1, 1)
+    second.close()
+    assert connection_pool.in_use == 0
+
+def test_checkouts_wait_for_a_free_connection(database):
+    holder = wrapper(database)
+    query(holder)
+    results = []
+
+    def waiter():
+        connection = wrapper(database)
+        results.append(query(connection))
+        connection.close()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    time.sleep(0.05)
+    assert not results
+    holder.close()
+    thread.join()
+    assert results == [(1,)]
+    [connection_pool] = pool.pools.values()
+    assert (connection_pool.waits, connection_pool.timeouts, connection_pool.open) == (1, 0, 1)
+
+def test_checkouts_time_out(database):
+    holder = wrapper(database)
+    query(holder)
+    with pytest.raises(OperationalError, match='No pooled connection free'):
+        query(wrapper(database))
+    [connection_pool] = pool.pools.values()
+    assert connection_pool.timeouts == 1
+    holder.close()
+
+def test_unusable_connections_are_not_reused(database, monkeypatch):
+    connection = wrapper(database)
+    query(connection)
+    connection.errors_occurred = True
+    connection.close()
+    [connection_pool] = pool.pools.values()
+    assert (connection_pool.discarded, connection_pool.open) == (1, 0)
+
+    # Idle connections failing their health check are replaced.
+    database['CONN_HEALTH_CHECKS'] = True
+    connection = wrapper(database)
+    query(connection)
+    raw = connection.connection
+    connection.close()
+    monkeypatch.setattr(DatabaseWrapper, 'is_usable', lambda self: False)
+    connection = wrapper(database)
+    query(connection)
+    assert connection.connection is not raw
+    assert (connection_pool.discarded, connection_pool.open) == (2, 1)
+    connection.close()
+
+def test_pools_are_in_the_metrics(database):
+    connection = wrapper(database)
+    query(connection)
+    text = registry.render()
+    assert 'inventory_db_pool_checkouts_total{database="pooled"} 1' in text
+    assert 'inventory_db_pool_connections_in_use{database="pooled"} 1' in text
+    connection.close()
+    assert 'inventory_db_pool_connections_idle{database="pooled"} 1' in registry.render()
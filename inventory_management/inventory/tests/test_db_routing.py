@@ -0,0 +1,115 @@
+import pytest
+from django.core.management import call_command
+from django.db import OperationalError, connections
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.contrib.auth.models import User
+from inventory import routers
+from inventory.cache import invalidate_items
+from inventory.middleware import PRIMARY_COOKIE
+from inventory.models import Item, Supplier
+
+# A second SQLite database stands in for the replica. It is not replicated
+# to, so every row tells which database a request read it from.
+routing_db = pytest.mark.django_db(transaction=True, databases=['default', 'replica'])
+
+@pytest.fixture(scope='module')
+def replica_database(django_db_setup, django_db_blocker, tmp_path_factory):
+    databases = {
+        'default': connections.settings['default'],
+        'replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': str(tmp_path_factory.mktemp('replica') / 'replica.sqlite3')},
+    }
+    connections.settings['replica'] = connections.configure_settings(databases)['replica']
+    with django_db_blocker.unblock():
+        call_command('migrate', database='replica', verbosity=0)
+    yield 'replica'
+    connections['replica'].close()
+    del connections['replica']
+    del connections.settings['replica']
+
+@pytest.fixture(autouse=True)
+def replicas(settings, replica_database):
+    settings.INVENTORY_DB_REPLICAS = [replica_database]
+    routers._health.clear()
+    yield
+    routers._health.clear()
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def admin_user():
+    return User.objects.create_user(username='admin', password='password', is_staff=True)
+
+@pytest.fixture
+def worker_user():
+    return User.objects.create_user(username='worker', password='password', is_staff=False)
+
+@pytest.fixture
+def supplier():
+    supplier = Supplier.objects.create(name='Primary', contact='1234567890')
+    Supplier.objects.using('replica').create(pk=supplier.pk, name='Replica', contact='1234567890')
+    return supplier
+
+def read_name(client, supplier):
+    response = client.get(f'/api/suppliers/{supplier.pk}/')
+    assert response.status_code == status.HTTP_200_OK
+    return response.data['name']
+
+@routing_db
+def test_safe_reads_go_to_the_replica(api_client, admin_user, supplier):
+    api_client.force_authenticate(user=admin_user)
+    assert read_name(api_client, supplier) == 'Replica'
+    assert PRIMARY_COOKIE not in api_client.cookies
+
+@routing_db
+def test_clients_read_their_writes(api_client, admin_user, supplier):
+    api_client.force_authenticate(user=admin_user)
+    response = api_client.patch(f'/api/suppliers/{supplier.pk}/', {'name': 'Renamed'}, format='json')
+    assert response.status_code == status.HTTP_200_OK
+    assert Supplier.objects.using('default').get().name == 'Renamed'
+    assert Supplier.objects.using('replica').get().name == 'Replica'
+
+    # The cookie keeps the writer on the primary; other clients are not.
+    assert api_client.cookies[PRIMARY_COOKIE]['max-age'] == 5
+    assert read_name(api_client, supplier) == 'Renamed'
+    other = APIClient()
+    other.force_authenticate(user=admin_user)
+    assert read_name(other, supplier) == 'Replica'
+
+@routing_db
+def test_purchases_read_from_the_primary(api_client, worker_user):
+    # The item exists on the primary only.
+    item = Item.objects.create(item_id=1, name='Item', quantityInStock=10, quantitySold=0, revenue=0, price=10)
+    api_client.force_authenticate(user=worker_user)
+    response = api_client.put('/api/purchase/', {'purchases': [{'item_id': item.pk, 'quantity': 2}]}, format='json')
+    assert response.status_code == status.HTTP_200_OK
+    assert Item.objects.using('default').get().quantityInStock == 8
+
+@routing_db
+def test_recently_changed_catalogue_is_read_from_the_primary(settings, api_client, admin_user):
+    # The item exists on the primary only.
+    item = Item.objects.create(item_id=1, name='Item', quantityInStock=10, quantitySold=0, revenue=0, price=10)
+    invalidate_items([item.pk])
+    api_client.force_authenticate(user=admin_user)
+    assert api_client.get(f'/api/items/{item.pk}/').status_code == status.HTTP_200_OK
+
+    settings.INVENTORY_DB_REPLICA_MAX_LAG = 0
+    invalidate_items([item.pk])
+    assert api_client.get(f'/api/items/{item.pk}/').status_code == status.HTTP_404_NOT_FOUND
+
+@routing_db
+def test_unhealthy_replicas_fall_back_to_the_primary(settings, monkeypatch, api_client, admin_user, supplier):
+    def unreachable():
+        raise OperationalError('unable to open database file')
+
+    monkeypatch.setattr(connections['replica'], 'ensure_connection', unreachable)
+    api_client.force_authenticate(user=admin_user)
+    assert read_name(api_client, supplier) == 'Primary'
+
+    # The replica is left out until it is checked again.
+    monkeypatch.undo()
+    assert read_name(api_client, supplier) == 'Primary'
+    settings.INVENTORY_DB_REPLICA_CHECK_INTERVAL = 0
+    assert read_name(api_client, supplier) == 'Replica'
@@ -0,0 +1,121 @@
+import csv
+import json
+from io import StringIO
+
+import pytest
+from django.db import connection
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from inventory.imports import ItemImporter
+from inventory.models import Item, Supplier, ItemSearchGram
+
+HEADER = ['item_id', 'name', 'quantityInStock', 'quantitySold', 'revenue', 'price', 'suppliers']
+
+@pytest.fixture
+def supplier(db):
+    return Supplier.objects.create(name='Test Supplier', contact='1234567890', email='test@example.com')
+
+def write_csv(path, rows, header=HEADER):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return str(path)
+
+def item_rows(count, start=1, suppliers=''):
+    return [[i, f'Item {i}', 10, 0, 0, '9.99', suppliers] for i in range(start, start + count)]
+
+def import_items(path, *args):
+    out = StringIO()
+    call_command('import_items', path, *args, stdout=out)
+    return out.getvalue()
+
+@pytest.mark.django_db
+def test_import_creates_items_in_chunks(tmp_path, supplier):
+    path = write_csv(tmp_path / 'items.csv', item_rows(5, suppliers='test@example.com;1234567890'))
+    output = import_items(path, '--chunk-size', '2')
+    assert '5 rows, 5 created, 0 updated, 0 rejected' in output
+    assert 'rows/sec' in output
+    assert Item.objects.count() == 5
+    assert str(Item.objects.get(item_id=3).price) == '9.99'
+    assert list(Item.objects.get(item_id=3).suppliers.all()) == [supplier]
+    assert ItemSearchGram.objects.filter(item__item_id=5).exists()
+    assert not (tmp_path / 'items.csv.checkpoint').exists()
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('upsert', [True, False])
+def test_import_upserts_on_item_id(upsert, monkeypatch, tmp_path, supplier):
+    # Without upserts on a named column, as on MySQL.
+    monkeypatch.setattr(connection.features, 'supports_update_conflicts_with_target', upsert)
+    import_items(write_csv(tmp_path / 'first.csv', item_rows(3, suppliers='test@example.com')))
+    rows = item_rows(2, start=3)
+    rows[0][1] = 'Renamed'
+    output = import_items(write_csv(tmp_path / 'second.csv', rows))
+    assert '2 rows, 1 created, 1 updated' in output
+    item = Item.objects.get(item_id=3)
+    assert item.name == 'Renamed'
+    assert item.suppliers.count() == 0
+    assert Item.objects.count() == 4
+
+@pytest.mark.django_db
+def test_import_rejects_bad_rows(tmp_path, supplier):
+    rows = item_rows(4)
+    rows[1][5] = 'free'
+    rows[2][6] = 'nobody@example.com'
+    output = import_items(write_csv(tmp_path / 'items.csv', rows))
+    assert 'Row 2 rejected' in output
+    assert 'Unknown supplier: nobody@example.com' in output
+    assert set(Item.objects.values_list('item_id', flat=True)) == {1, 4}
+
+@pytest.mark.django_db
+def test_import_dry_run_writes_nothing(tmp_path):
+    Item.objects.create(item_id=1, name='Existing', quantityInStock=10, quantitySold=0, revenue=0, price=5)
+    output = import_items(write_csv(tmp_path / 'items.csv', item_rows(3)), '--dry-run')
+    assert 'Dry run: 3 rows, 2 created, 1 updated' in output
+    assert list(Item.objects.values_list('name', flat=True)) == ['Existing']
+    assert not (tmp_path / 'items.csv.checkpoint').exists()
+
+@pytest.mark.django_db
+def test_import_resumes_from_checkpoint(tmp_path, monkeypatch):
+    path = write_csv(tmp_path / 'items.csv', item_rows(6))
+    chunks = []
+
+    def crash_on_second_chunk(self, chunk, suppliers):
+        chunks.append(chunk)
+        if len(chunks) == 2:
+            raise RuntimeError('crash')
+        original(self, chunk, suppliers)
+
+    original = ItemImporter.write_chunk
+    monkeypatch.setattr(ItemImporter, 'write_chunk', crash_on_second_chunk)
+    with pytest.raises(RuntimeError):
+        import_items(path, '--chunk-size', '2')
+    monkeypatch.undo()
+
+    with open(f'{path}.checkpoint') as f:
+        assert json.load(f)['rows'] == 2
+    output = import_items(path, '--chunk-size', '2')
+    assert 'Resuming after row 2.' in output
+    assert '6 rows, 4 created' in output
+    assert Item.objects.count() == 6
+
+@pytest.mark.django_db
+def test_import_requires_item_columns(tmp_path):
+    path = write_csv(tmp_path / 'items.csv', [[1, 'Item 1']], header=['item_id', 'name'])
+    with pytest.raises(CommandError, match='Missing columns: revenue, price'):
+        import_items(path)
+
+@pytest.mark.django_db
+def test_import_xlsx(tmp_path, supplier):
+    openpyxl = pytest.importorskip('openpyxl')
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(HEADER)
+    sheet.append([1, 'Item 1', 10.0, 0, 0, 9.99, '1234567890'])
+    workbook.save(tmp_path / 'items.xlsx')
+
+    output = import_items(str(tmp_path / 'items.xlsx'))
+    assert '1 rows, 1 created' in output
+    item = Item.objects.get(item_id=1)
+    assert item.quantityInStock == 10
+    assert list(item.suppliers.all()) == [supplier]
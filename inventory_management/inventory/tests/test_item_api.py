@@ -1,4 +1,8 @@
+import csv
+import json
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
@@ -223,4 +227,86 @@ def test_purchase_multiple_items_with_errors():
         ]
     }, format='json')
 
-    assert response.status_code == status.HTTP_400_BAD_REQUEST
\ No newline at end of file
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+@pytest.mark.django_db
+def test_list_items_is_cursor_paginated(api_client, worker_user):       # walk every page using the next cursor
+    for i in range(1, 8):
+        Item.objects.create(item_id=i, name=f'Item {i}', quantityInStock=10, quantitySold=0, revenue=0, price=10)
+    api_client.force_authenticate(user=worker_user)
+    url = reverse('item-list') + '?page_size=3'
+    item_ids = []
+    while url:
+        response = api_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results']) <= 3
+        item_ids += [item['item_id'] for item in response.data['results']]
+        url = response.data['next']
+    assert item_ids == list(range(1, 8))
+
+@pytest.mark.django_db
+def test_export_items_ndjson_worker(api_client, worker_user):           # customers only get the customer fields
+    Item.objects.create(item_id=1, name='Item 1', quantityInStock=10, quantitySold=0, revenue=0, price=10)
+    Item.objects.create(item_id=2, name='Item 2', quantityInStock=10, quantitySold=0, revenue=0, price=20)
+    api_client.force_authenticate(user=worker_user)
+    response = api_client.get(reverse('item-export'))
+    assert response.status_code == status.HTTP_200_OK
+    assert response['Content-Type'] == 'application/x-ndjson'
+    lines = b''.join(response.streaming_content).decode().splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {'item_id': 1, 'name': 'Item 1', 'price': '10.00'},
+        {'item_id': 2, 'name': 'Item 2', 'price': '20.00'},
+    ]
+
+@pytest.mark.django_db
+def test_export_items_csv_admin(api_client, admin_user):
+    supplier = Supplier.objects.create(name='Test Supplier', contact='1234567890', email='test@example.com')
+    item = Item.objects.create(item_id=1, name='Item 1', quantityInStock=10, quantitySold=2, revenue=20, price=10)
+    item.suppliers.add(supplier)
+    api_client.force_authenticate(user=admin_user)
+    response = api_client.get(reverse('item-export') + '?output=csv')
+    assert response.status_code == status.HTTP_200_OK
+    rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+    assert rows == [
+        ['id', 'item_id', 'name', 'quantityInStock', 'quantitySold', 'revenue', 'price', 'reorderThreshold', 'suppliers'],
+        [str(item.id), '1', 'Item 1', '10', '2', '20.00', '10.00', '5', str(supplier.id)],
+    ]
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('rows', [True, False])
+@pytest.mark.parametrize('search', ['', 'item'])
+def test_export_items_pages_by_id(settings, api_client, admin_user, rows, search):
+    settings.INVENTORY_ROW_SERIALIZERS = rows
+    settings.INVENTORY_EXPORT_CHUNK_SIZE = 2
+    for i in range(1, 6):
+        Item.objects.create(item_id=i, name=f'Item {i}', quantityInStock=10, quantitySold=0, revenue=0, price=10)
+    api_client.force_authenticate(user=admin_user)
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get(reverse('item-export'), {'search': search})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+    assert [json.loads(line)['item_id'] for line in lines] == [1, 2, 3, 4, 5]
+    pages = [query['sql'] for query in queries if 'FROM "inventory_item"' in query['sql']]
+    assert len(pages) == 3
+    assert all('LIMIT 2' in sql for sql in pages)
+    assert all('"inventory_item"."id" >' in sql for sql in pages[1:])
+
+@pytest.mark.django_db
+def test_export_items_unknown_format(api_client, admin_user):
+    api_client.force_authenticate(user=admin_user)
+    response = api_client.get(reverse('item-export') + '?output=xml')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+@pytest.mark.parametrize('user_fixture', ['admin_user', 'worker_user'])
+@pytest.mark.django_db
+def test_list_items_query_count_is_constant(request, api_client, user_fixture, django_assert_max_num_queries):
+    supplier1 = Supplier.objects.create(name='Supplier One', contact='1234567890', email='one@example.com')
+    supplier2 = Supplier.objects.create(name='Supplier Two', contact='0987654321', email='two@example.com')
+    for i in range(1, 31):
+        item = Item.objects.create(item_id=i, name=f'Item {i}', quantityInStock=10, quantitySold=0, revenue=0, price=10)
+        item.suppliers.add(supplier1, supplier2)
+    api_client.force_authenticate(user=request.getfixturevalue(user_fixture))
+
+    with django_assert_max_num_queries(2):          # the page, plus the suppliers of the whole page for admins
+        response = api_client.get(reverse('item-list'))
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.data['results']) == 30
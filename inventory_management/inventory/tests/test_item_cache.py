@@ -0,0 +1,118 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.contrib.auth.models import User
+from inventory.models import Item, Supplier
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def admin_user(db):
+    user = User.objects.create_user(username='admin', password='password', is_staff=True)
+    return user
+
+@pytest.fixture
+def worker_user(db):
+    user = User.objects.create_user(username='worker', password='password', is_staff=False)
+    return user
+
+@pytest.fixture
+def item(db):
+    return Item.objects.create(item_id=1, name='Test Item', quantityInStock=10, quantitySold=0, revenue=0, price=100)
+
+@pytest.mark.django_db
+def test_repeated_list_is_served_from_cache(api_client, worker_user, item, django_assert_num_queries):
+    api_client.force_authenticate(user=worker_user)
+    first = api_client.get(reverse('item-list'))
+    with django_assert_num_queries(0):
+        second = api_client.get(reverse('item-list'))
+    assert second.status_code == status.HTTP_200_OK
+    assert second.data == first.data
+
+@pytest.mark.django_db
+def test_cache_is_per_role(api_client, admin_user, worker_user, item):
+    url = reverse('item-detail', kwargs={'pk': item.pk})
+    api_client.force_authenticate(user=worker_user)
+    assert 'quantityInStock' not in api_client.get(url).data
+    api_client.force_authenticate(user=admin_user)
+    assert api_client.get(url).data['quantityInStock'] == 10
+
+@pytest.mark.django_db
+def test_conditional_get_returns_not_modified(api_client, worker_user, item):
+    api_client.force_authenticate(user=worker_user)
+    url = reverse('item-detail', kwargs={'pk': item.pk})
+    response = api_client.get(url)
+    assert response['ETag']
+
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    response = api_client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+@pytest.mark.django_db
+def test_update_invalidates_list_and_detail(api_client, admin_user, item):
+    api_client.force_authenticate(user=admin_user)
+    detail_url = reverse('item-detail', kwargs={'pk': item.pk})
+    etag = api_client.get(detail_url)['ETag']
+    api_client.get(reverse('item-list'))
+
+    api_client.patch(detail_url, {'name': 'Renamed Item'}, format='json')
+
+    response = api_client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['name'] == 'Renamed Item'
+    assert api_client.get(reverse('item-list')).data['results'][0]['name'] == 'Renamed Item'
+
+@pytest.mark.django_db
+def test_delete_invalidates_list(api_client, admin_user, item):
+    api_client.force_authenticate(user=admin_user)
+    assert len(api_client.get(reverse('item-list')).data['results']) == 1
+    api_client.delete(reverse('item-detail', kwargs={'pk': item.pk}))
+    assert api_client.get(reverse('item-list')).data['results'] == []
+    assert api_client.get(reverse('item-detail', kwargs={'pk': item.pk})).status_code == status.HTTP_404_NOT_FOUND
+
+@pytest.mark.django_db
+def test_purchase_invalidates_item(api_client, admin_user, item):
+    api_client.force_authenticate(user=admin_user)
+    url = reverse('item-detail', kwargs={'pk': item.pk})
+    assert api_client.get(url).data['quantityInStock'] == 10
+
+    api_client.put('/api/purchase/', {'purchases': [{'item_id': item.pk, 'quantity': 4}]}, format='json')
+    assert api_client.get(url).data['quantityInStock'] == 6
+
+@pytest.mark.django_db
+def test_supplier_changes_invalidate_items(api_client, admin_user, item):
+    supplier = Supplier.objects.create(name='Test Supplier', contact='1234567890', email='test@example.com')
+    api_client.force_authenticate(user=admin_user)
+    url = reverse('item-detail', kwargs={'pk': item.pk})
+    assert api_client.get(url).data['suppliers'] == []
+
+    item.suppliers.add(supplier)
+    assert api_client.get(url).data['suppliers'] == [supplier.pk]
+
+    supplier.delete()
+    assert api_client.get(url).data['suppliers'] == []
+
+@pytest.mark.django_db
+def test_purchase_keeps_customer_responses_cached(api_client, admin_user, worker_user, item, django_assert_num_queries):
+    api_client.force_authenticate(user=worker_user)
+    urls = [reverse('item-list'), reverse('item-detail', kwargs={'pk': item.pk})]
+    for url in urls:
+        api_client.get(url)
+
+    api_client.put('/api/purchase/', {'purchases': [{'item_id': item.pk, 'quantity': 4}]}, format='json')
+    with django_assert_num_queries(0):
+        for url in urls:
+            assert api_client.get(url).status_code == status.HTTP_200_OK
+
+    api_client.force_authenticate(user=admin_user)
+    assert api_client.get(urls[0]).data['results'][0]['quantityInStock'] == 6
+    item.price = 50
+    item.save()
+    api_client.force_authenticate(user=worker_user)
+    assert [entry['price'] for entry in api_client.get(urls[0]).data['results']] == ['50.00']
+    assert api_client.get(urls[1]).data['price'] == '50.00'
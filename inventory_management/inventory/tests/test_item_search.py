@@ -0,0 +1,90 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.contrib.auth.models import User
+from inventory.models import Item, ItemSearchGram
+from inventory.search import TrigramSearchBackend
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def worker_user(db):
+    user = User.objects.create_user(username='worker', password='password', is_staff=False)
+    return user
+
+@pytest.fixture
+def catalogue(db):
+    names = ['Megadrive', 'Blue Widget', 'Widget Pro', 'Gadget', 'Midgets Board Game', 'Red widget holder', 'Wire']
+    return [
+        Item.objects.create(item_id=i, name=name, quantityInStock=10, quantitySold=0, revenue=0, price=10)
+        for i, name in enumerate(names, start=1)
+    ]
+
+def search(api_client, query):
+    response = api_client.get(reverse('item-list'), {'search': query})
+    assert response.status_code == status.HTTP_200_OK
+    return [item['name'] for item in response.data['results']]
+
+@pytest.mark.django_db
+def test_search_matches_substrings(api_client, catalogue):
+    assert set(search(api_client, 'idget')) == {'Blue Widget', 'Widget Pro', 'Midgets Board Game', 'Red widget holder'}
+
+@pytest.mark.django_db
+def test_search_ranks_word_prefix_matches_first(api_client, catalogue):
+    assert search(api_client, 'gad') == ['Gadget', 'Megadrive']
+
+@pytest.mark.django_db
+def test_search_short_word_matches_word_prefix(api_client, catalogue):
+    assert set(search(api_client, 'wi')) == {'Blue Widget', 'Widget Pro', 'Red widget holder', 'Wire'}
+
+@pytest.mark.django_db
+def test_search_requires_every_word(api_client, catalogue):
+    assert search(api_client, 'red widget') == ['Red widget holder']
+    assert search(api_client, 'nothing here') == []
+
+@pytest.mark.django_db
+def test_search_needs_the_words_not_just_their_trigrams(api_client, catalogue):
+    # 'idg' and 'dge' of midge and 'get' of target, but no 'idget'.
+    Item.objects.create(item_id=8, name='Midge Target', quantityInStock=10, quantitySold=0, revenue=0, price=10)
+    assert 'Midge Target' not in search(api_client, 'idget')
+    assert search(api_client, 'midge targ') == ['Midge Target']
+
+@pytest.mark.django_db
+def test_search_is_a_single_query(api_client, worker_user, catalogue, django_assert_num_queries):
+    api_client.force_authenticate(user=worker_user)
+    with django_assert_num_queries(1):
+        search(api_client, 'widget')
+
+@pytest.mark.django_db
+def test_search_results_are_cursor_paginated(api_client, db):
+    for i in range(1, 8):
+        Item.objects.create(item_id=i, name=f'Lamp {i}', quantityInStock=10, quantitySold=0, revenue=0, price=10)
+    url = reverse('item-list') + '?search=lamp&page_size=3'
+    names = []
+    while url:
+        response = api_client.get(url)
+        names += [item['name'] for item in response.data['results']]
+        url = response.data['next']
+    assert names == [f'Lamp {i}' for i in range(1, 8)]
+
+@pytest.mark.django_db
+def test_search_index_follows_item_changes(api_client, catalogue):
+    gadget = catalogue[3]
+    gadget.name = 'Sprocket'
+    gadget.save()
+    assert search(api_client, 'gadget') == []
+    assert search(api_client, 'sprock') == ['Sprocket']
+
+    gadget.delete()
+    assert search(api_client, 'sprock') == []
+    assert not ItemSearchGram.objects.filter(item_id=gadget.pk).exists()
+
+@pytest.mark.django_db
+def test_search_index_rebuild(api_client, catalogue):
+    ItemSearchGram.objects.all().delete()
+    assert search(api_client, 'widget') == []
+    TrigramSearchBackend().rebuild()
+    assert len(search(api_client, 'widget')) == 3
@@ -0,0 +1,179 @@
+import time
+from datetime import timedelta
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.contrib.auth.models import User
+from inventory.jobs import JOB_KINDS, claim_job, prune_jobs, requeue_stale_jobs, run_job, run_pending_jobs, submit_job
+from inventory.models import Item, Job
+
+@pytest.fixture(autouse=True)
+def job_dir(settings, tmp_path):
+    settings.INVENTORY_JOB_DIR = str(tmp_path / 'jobs')
+    return tmp_path / 'jobs'
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def admin_user(db):
+    user = User.objects.create_user(username='admin', password='password', is_staff=True)
+    return user
+
+@pytest.fixture
+def worker_user(db):
+    user = User.objects.create_user(username='worker', password='password', is_staff=False)
+    return user
+
+@pytest.fixture
+def items(db):
+    return [
+        Item.objects.create(item_id=i, name=f'Item {i}', quantityInStock=i, quantitySold=0, revenue=0, price=10)
+        for i in range(1, 4)
+    ]
+
+def result(api_client, response):
+    return api_client.get(reverse('job-result', kwargs={'pk': response.data['id']}))
+
+@pytest.mark.django_db
+def test_stock_report_job(api_client, admin_user, items):
+    api_client.force_authenticate(user=admin_user)
+    response = api_client.post(reverse('stock-report-job'))
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert response.data['status'] == Job.QUEUED
+    assert response['Location'] == reverse('job-detail', kwargs={'pk': response.data['id']})
+    assert result(api_client, response).status_code == status.HTTP_409_CONFLICT
+
+    assert run_pending_jobs() == 1
+    polled = api_client.get(response['Location'])
+    assert polled.status_code == status.HTTP_200_OK
+    assert polled.data['status'] == Job.SUCCEEDED
+    assert polled.data['result_url'].endswith(reverse('job-result', kwargs={'pk': response.data['id']}))
+
+    report = result(api_client, response)
+    assert report['Content-Type'].startswith('text/html')
+    html = b''.join(report.streaming_content).decode()
+    assert 'Stock Report' in html and 'Item 1' in html
+
+@pytest.mark.django_db
+def test_identical_jobs_share_a_result_until_the_catalogue_changes(api_client, admin_user, items):
+    api_client.force_authenticate(user=admin_user)
+    first = api_client.post(reverse('stock-report-job')).data['id']
+    run_pending_jobs()
+    again = api_client.post(reverse('stock-report-job'))
+    assert again.status_code == status.HTTP_200_OK
+    assert again.data['id'] == first
+
+    api_client.put('/api/purchase/', {'purchases': [{'item_id': items[2].pk, 'quantity': 1}]}, format='json')
+    assert api_client.post(reverse('stock-report-job')).data['id'] != first
+
+@pytest.mark.django_db
+def test_export_job_per_role(api_client, admin_user, worker_user, items):
+    api_client.force_authenticate(user=worker_user)
+    response = api_client.post(reverse('export-job'), {'output': 'csv', 'search': 'item'})
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    run_pending_jobs()
+    lines = b''.join(result(api_client, response).streaming_content).decode().splitlines()
+    assert lines == ['item_id,name,price', '1,Item 1,10.00', '2,Item 2,10.00', '3,Item 3,10.00']
+
+    other = User.objects.create_user(username='other', password='password')
+    api_client.force_authenticate(user=other)
+    assert api_client.get(response['Location']).status_code == status.HTTP_404_NOT_FOUND
+    api_client.force_authenticate(user=admin_user)
+    assert api_client.get(response['Location']).status_code == status.HTTP_200_OK
+
+    assert api_client.post(reverse('export-job'), {'output': 'xml'}).status_code == status.HTTP_400_BAD_REQUEST
+
+@pytest.mark.django_db
+def test_import_job(api_client, admin_user, worker_user, items):
+    upload = SimpleUploadedFile('items.csv', b'item_id,name,revenue,price\n1,Renamed,0,5\n9,New,0,7\n')
+    api_client.force_authenticate(user=worker_user)
+    assert api_client.post(reverse('import-job'), {'file': upload}).status_code == status.HTTP_403_FORBIDDEN
+
+    api_client.force_authenticate(user=admin_user)
+    upload.seek(0)
+    response = api_client.post(reverse('import-job'), {'file': upload})
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    call_command('run_workers', '--once')
+
+    stats = result(api_client, response).data
+    assert (stats['created'], stats['updated'], stats['rejected']) == (1, 1, 0)
+    assert Item.objects.get(item_id=1).name == 'Renamed'
+    assert api_client.get(response['Location']).data['result']['created'] == 1
+
+@pytest.mark.django_db
+def test_failed_job_reports_its_error(api_client, admin_user):
+    api_client.force_authenticate(user=admin_user)
+    upload = SimpleUploadedFile('items.csv', b'item_id,name\n1,Missing columns\n')
+    response = api_client.post(reverse('import-job'), {'file': upload})
+    run_pending_jobs()
+    polled = api_client.get(response['Location']).data
+    assert polled['status'] == Job.FAILED
+    assert 'Missing columns' in polled['error']
+    assert result(api_client, response).status_code == status.HTTP_409_CONFLICT
+
+@pytest.mark.django_db
+def test_claims_are_exclusive(admin_user):
+    job = submit_job('stock_report', {}, admin_user)
+    assert claim_job().pk == job.pk
+    assert claim_job() is None
+    assert Job.objects.get(pk=job.pk).attempts == 1
+
+@pytest.mark.django_db
+def test_stale_jobs_are_requeued(settings, admin_user):
+    settings.INVENTORY_JOB_MAX_ATTEMPTS = 2
+    job = submit_job('stock_report', {}, admin_user)
+    claim_job()
+    Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=2))
+    assert requeue_stale_jobs() == 1
+    assert Job.objects.get(pk=job.pk).status == Job.QUEUED
+
+    claim_job()
+    Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=2))
+    assert requeue_stale_jobs() == 0
+    assert Job.objects.get(pk=job.pk).status == Job.FAILED
+
+@pytest.mark.django_db(transaction=True)
+def test_running_jobs_are_kept_alive(settings, admin_user, monkeypatch):
+    settings.INVENTORY_JOB_HEARTBEAT_INTERVAL = 0.01
+    job = submit_job('stock_report', {}, admin_user)
+    claimed = claim_job()
+    Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=2))
+
+    def slow_report(job):
+        time.sleep(0.2)
+        assert requeue_stale_jobs() == 0
+        return {}
+    monkeypatch.setitem(JOB_KINDS, 'stock_report', slow_report)
+    assert run_job(claimed)
+    assert Job.objects.get(pk=job.pk).status == Job.SUCCEEDED
+
+@pytest.mark.django_db
+def test_requeued_jobs_do_not_finish_twice(admin_user, monkeypatch):
+    job = submit_job('stock_report', {}, admin_user)
+    first = claim_job()
+
+    def taken_over(job):
+        # Presumed lost meanwhile, and claimed by another worker.
+        Job.objects.filter(pk=job.pk).update(status=Job.QUEUED)
+        claim_job()
+        return {'file': 'first'}
+    monkeypatch.setitem(JOB_KINDS, 'stock_report', taken_over)
+    assert not run_job(first)
+    job.refresh_from_db()
+    assert (job.status, job.attempts, job.result) == (Job.RUNNING, 2, None)
+
+@pytest.mark.django_db
+def test_prune_removes_files(admin_user, items, job_dir):
+    job = submit_job('stock_report', {}, admin_user)
+    run_pending_jobs()
+    assert (job_dir / f'{job.pk}.html').exists()
+    assert prune_jobs(timezone.now() + timedelta(seconds=1)) == 1
+    assert not (job_dir / f'{job.pk}.html').exists()
+    assert not Job.objects.exists()
@@ -0,0 +1,93 @@
+import json
+import logging
+import sys
+import threading
+
+import pytest
+from inventory.log import JSONFormatter, QueueListenerHandler
+from inventory.metrics import registry
+
+class CollectingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append((self.format(record), threading.current_thread()))
+
+@pytest.fixture
+def target():
+    return CollectingHandler()
+
+@pytest.fixture
+def handler(target):
+    handler = QueueListenerHandler([target])
+    yield handler
+    handler.close()
+
+def make_logger(handler):
+    logger = logging.getLogger('inventory.tests.queue')
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    return logger
+
+def test_json_records():
+    logger = logging.getLogger('inventory')
+    record = logger.makeRecord('inventory', logging.WARNING, __file__, 1, 'Sold %d', (3,), None, extra={'item_id': 7})
+    data = json.loads(JSONFormatter().format(record))
+    assert data['level'] == 'WARNING'
+    assert data['logger'] == 'inventory'
+    assert data['message'] == 'Sold 3'
+    assert data['item_id'] == 7
+    assert data['time'].endswith('+00:00')
+
+    try:
+        raise ValueError('bad row')
+    except ValueError:
+        record = logger.makeRecord('inventory', logging.ERROR, __file__, 1, 'Import failed', (), sys.exc_info())
+    assert 'ValueError: bad row' in json.loads(JSONFormatter().format(record))['exception']
+
+def test_records_are_written_by_the_listener_thread(handler, target):
+    logger = make_logger(handler)
+    items = ['a']
+    logger.info('Items: %s', items)
+    items.append('b')
+    handler.drain()
+    assert [message for message, _ in target.records] == ["Items: ['a']"]
+    assert target.records[0][1] is not threading.current_thread()
+
+def test_handler_levels_are_respected(handler, target):
+    target.setLevel(logging.WARNING)
+    logger = make_logger(handler)
+    logger.info('skipped')
+    logger.warning('kept')
+    handler.drain()
+    assert [message for message, _ in target.records] == ['kept']
+
+def test_full_queue_drops_records_below_warning(target):
+    dropped_before = registry.state()['log_records_dropped']
+    handler = QueueListenerHandler([target], queue_size=2)
+    handler.stop()
+    logger = make_logger(handler)
+    for i in range(5):
+        logger.info(f'Record {i}')
+    logger.error('Failed')
+    assert handler.dropped == 3
+    assert registry.state()['log_records_dropped'] == dropped_before + 3
+    # Written out by the caller rather than dropped.
+    assert target.records == [('Failed', threading.current_thread())]
+    handler.start()
+    handler.close()
+    assert [message for message, _ in target.records] == ['Failed', 'Record 0', 'Record 1']
+
+def test_settings_configure_a_queue():
+    # pytest adds its own capturing handlers next to the queue.
+    [root_handler] = [h for h in logging.getLogger().handlers if isinstance(h, QueueListenerHandler)]
+    assert {type(h).__name__ for h in root_handler.handlers} == {'StreamHandler', 'WatchedFileHandler'}
+    assert not logging.getLogger('django.db.backends').isEnabledFor(logging.DEBUG)
+
+def test_tests_do_not_log_into_the_source_tree(settings):
+    [root_handler] = [h for h in logging.getLogger().handlers if isinstance(h, QueueListenerHandler)]
+    [file_handler] = [h for h in root_handler.handlers if isinstance(h, logging.FileHandler)]
+    assert not file_handler.baseFilename.startswith(str(settings.BASE_DIR))
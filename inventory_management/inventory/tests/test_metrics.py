@@ -0,0 +1,152 @@
+import re
+
+import pytest
+from django.test import Client
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+from django.contrib.auth.models import User
+from inventory.metrics import Registry, measure, registry
+from inventory.models import Item, Supplier
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    registry.reset()
+    yield
+    registry.reset()
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def admin_user(db):
+    user = User.objects.create_user(username='admin', password='password', is_staff=True)
+    return user
+
+@pytest.fixture
+def worker_user(db):
+    user = User.objects.create_user(username='worker', password='password', is_staff=False)
+    return user
+
+@pytest.fixture
+def items(db):
+    supplier = Supplier.objects.create(name='Test Supplier', contact='1234567890', email='test@example.com')
+    items = [
+        Item.objects.create(item_id=i, name=f'Item {i}', quantityInStock=10, quantitySold=0, revenue=0, price=5)
+        for i in range(1, 4)
+    ]
+    items[0].suppliers.add(supplier)
+    return items
+
+def sample(text, name, **labels):
+    selector = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf'^{name}{{{re.escape(selector)}[,}}].* (\S+)$', text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+@pytest.mark.django_db
+def test_requests_are_counted_per_view(api_client, admin_user, items):
+    api_client.force_authenticate(user=admin_user)
+    api_client.get('/api/items/')
+    api_client.get('/api/items/')
+    api_client.get(f'/api/items/{items[0].pk}/')
+    api_client.get('/api/items/999/')
+
+    response = api_client.get(reverse('metrics'))
+    assert response.status_code == status.HTTP_200_OK
+    assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+    text = response.content.decode()
+    labels = {'view': 'item-list', 'method': 'GET', 'status': 200}
+    assert sample(text, 'inventory_requests_total', **labels) == 2
+    assert sample(text, 'inventory_request_duration_seconds_count', **labels) == 2
+    assert sample(text, 'inventory_request_queries_total', **labels) > 0
+    assert sample(text, 'inventory_response_bytes_total', **labels) > 0
+    assert sample(text, 'inventory_requests_total', view='item-detail', method='GET', status=404) == 1
+    assert 'le="+Inf"' in text
+
+@pytest.mark.django_db
+def test_server_timing_header(api_client, admin_user, items, settings):
+    settings.INVENTORY_SERVER_TIMING = True
+    api_client.force_authenticate(user=admin_user)
+    response = api_client.get('/api/items/')
+    assert re.fullmatch(r'db;dur=[\d.]+;desc="\d+ queries, 0 duplicates", total;dur=[\d.]+', response['Server-Timing'])
+
+    settings.INVENTORY_SERVER_TIMING = False
+    assert 'Server-Timing' not in api_client.get('/api/items/')
+
+@pytest.mark.django_db
+def test_duplicate_queries_are_detected(items):
+    with measure() as stats:
+        Item.objects.get(pk=items[0].pk)
+        Item.objects.get(pk=items[1].pk)
+        Item.objects.get(pk=items[0].pk)
+        Item.objects.count()
+    assert len(stats.queries) == 4
+    assert stats.duplicates == 2
+
+    # Outside a request nothing is recorded.
+    Item.objects.get(pk=items[0].pk)
+    assert len(stats.queries) == 4
+
+@pytest.mark.django_db
+def test_async_views_are_measured(admin_user, items, settings):
+    settings.INVENTORY_SERVER_TIMING = True
+    client = Client(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(admin_user)}')
+    response = client.get(reverse('async-item-list'))
+    assert response.status_code == status.HTTP_200_OK
+    assert 'queries' in response['Server-Timing']
+    text = client.get(reverse('metrics')).content.decode()
+    assert sample(text, 'inventory_request_queries_total', view='async-item-list', method='GET', status=200) > 0
+
+@pytest.mark.django_db
+def test_slow_requests_are_sampled_with_their_sql(api_client, admin_user, items, settings):
+    settings.INVENTORY_SLOW_REQUEST_SECONDS = 0
+    settings.INVENTORY_SLOW_REQUEST_SAMPLES = 2
+    api_client.force_authenticate(user=admin_user)
+    for _ in range(3):
+        api_client.get(f'/api/items/{items[0].pk}/')
+    api_client.put('/api/purchase/', {'purchases': [{'item_id': items[0].pk, 'quantity': 1}]}, format='json')
+
+    samples = api_client.get(reverse('slow-requests')).json()['slow_requests']
+    assert len(samples) == 2
+    assert samples[0]['duration_ms'] >= samples[1]['duration_ms']
+    purchase = next(s for s in samples if s['view'] == 'purchase-api')
+    assert purchase['queries'] == sum(statement['count'] for statement in purchase['sql'])
+    assert any('inventory_item' in statement['sql'] for statement in purchase['sql'])
+
+@pytest.mark.django_db
+def test_metrics_are_for_staff_without_a_token(worker_user, admin_user):
+    client = Client()
+    for url in [reverse('metrics'), reverse('slow-requests')]:
+        assert client.get(url).status_code == status.HTTP_401_UNAUTHORIZED
+        assert client.get(url, HTTP_AUTHORIZATION='Bearer nonsense').status_code == status.HTTP_401_UNAUTHORIZED
+        worker = f'Bearer {AccessToken.for_user(worker_user)}'
+        assert client.get(url, HTTP_AUTHORIZATION=worker).status_code == status.HTTP_401_UNAUTHORIZED
+        admin = f'Bearer {AccessToken.for_user(admin_user)}'
+        assert client.get(url, HTTP_AUTHORIZATION=admin).status_code == status.HTTP_200_OK
+
+@pytest.mark.django_db
+def test_metrics_token(settings):
+    settings.INVENTORY_METRICS_TOKEN = 'secret'
+    client = Client()
+    assert client.get(reverse('metrics')).status_code == status.HTTP_401_UNAUTHORIZED
+    assert client.get(reverse('slow-requests'), HTTP_AUTHORIZATION='Bearer wrong').status_code == status.HTTP_401_UNAUTHORIZED
+    assert client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret').status_code == status.HTTP_200_OK
+
+@pytest.mark.django_db
+def test_metrics_are_added_up_over_processes(api_client, admin_user, items, settings, tmp_path):
+    settings.INVENTORY_METRICS_DIR = str(tmp_path)
+    api_client.force_authenticate(user=admin_user)
+    api_client.get('/api/items/')
+    # Another worker, which served two lists and then exited.
+    other = Registry()
+    other.file = '99999999-other.json'
+    other.series['item-list', 'GET', 200].count = 2
+    other.flush()
+
+    labels = {'view': 'item-list', 'method': 'GET', 'status': 200}
+    assert sample(api_client.get(reverse('metrics')).content.decode(), 'inventory_requests_total', **labels) == 3
+    registry.retire(99999999)
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted([registry.file, 'exited.json'])
+    assert sample(api_client.get(reverse('metrics')).content.decode(), 'inventory_requests_total', **labels) == 3
@@ -0,0 +1,139 @@
+import threading
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.contrib.auth.models import User
+from inventory.models import Item
+from inventory.purchases import purchase_items, PurchaseError
+
+@pytest.fixture(params=['pessimistic', 'optimistic'])
+def api_client(request, db, settings):
+    settings.INVENTORY_PURCHASE_MODE = request.param
+    user = User.objects.create_user(username='buyer', password='password')
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+def create_items(count, quantity_in_stock=10):
+    return [
+        Item.objects.create(item_id=i, name=f'Item {i}', quantityInStock=quantity_in_stock, quantitySold=0, revenue=0, price=10)
+        for i in range(1, count + 1)
+    ]
+
+@pytest.mark.django_db
+def test_purchase_is_all_or_nothing(api_client):          # one bad line leaves every item untouched
+    item1, item2 = create_items(2)
+    response = api_client.put('/api/purchase/', {
+        'purchases': [
+            {'item_id': item1.id, 'quantity': 5},
+            {'item_id': item2.id, 'quantity': 50},
+        ]
+    }, format='json')
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data['errors'] == [{'item_id': item2.id, 'error': 'Not enough stock available'}]
+    item1.refresh_from_db()
+    assert item1.quantityInStock == 10
+    assert item1.quantitySold == 0
+
+@pytest.mark.django_db
+def test_purchase_repeated_item_checks_combined_stock(api_client):
+    item, = create_items(1)
+    response = api_client.put('/api/purchase/', {
+        'purchases': [
+            {'item_id': item.id, 'quantity': 6},
+            {'item_id': item.id, 'quantity': 6},
+        ]
+    }, format='json')
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    item.refresh_from_db()
+    assert item.quantityInStock == 10
+
+@pytest.mark.django_db
+def test_purchase_repeated_item_is_summed(api_client):
+    item, = create_items(1)
+    response = api_client.put('/api/purchase/', {
+        'purchases': [
+            {'item_id': item.id, 'quantity': 3},
+            {'item_id': item.id, 'quantity': 4},
+        ]
+    }, format='json')
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['AmountToPay'] == 70
+    item.refresh_from_db()
+    assert item.quantityInStock == 3
+    assert item.quantitySold == 7
+    assert item.revenue == 70
+
+@pytest.mark.django_db
+def test_purchase_query_count_grows_only_by_optimistic_updates(api_client, settings):
+    items = create_items(20)
+
+    def query_count(basket):
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.put('/api/purchase/', {
+                'purchases': [{'item_id': item.id, 'quantity': 1} for item in basket]
+            }, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        return len(queries)
+
+    # Pessimistic baskets take one locking SELECT and one UPDATE whatever
+    # their size; optimistic ones one conditional UPDATE per item.
+    per_item = {'pessimistic': 0, 'optimistic': 1}[settings.INVENTORY_PURCHASE_MODE]
+    assert query_count(items) - query_count(items[:2]) == per_item * 18
+
+@pytest.mark.django_db
+def test_purchase_reports_every_failing_line(api_client):
+    item, = create_items(1)
+    response = api_client.put('/api/purchase/', {
+        'purchases': [
+            {'item_id': item.id, 'quantity': 15},
+            {'item_id': 999, 'quantity': 5},
+            {'item_id': item.id, 'quantity': -5},
+        ]
+    }, format='json')
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert [error['error'] for error in response.data['errors']] == [
+        'Not enough stock available',
+        'Item not found: 999',
+        'Quantity must be greater than zero',
+    ]
+
+@pytest.mark.parametrize('mode', ['pessimistic', 'optimistic'])
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_purchases_never_oversell(mode, settings):        # many buyers racing for one item
+    settings.INVENTORY_PURCHASE_MODE = mode
+    settings.INVENTORY_PURCHASE_MAX_ATTEMPTS = 50
+    settings.INVENTORY_PURCHASE_RETRY_BACKOFF = 0.001
+    item = Item.objects.create(item_id=1, name='Hot Item', quantityInStock=25, quantitySold=0, revenue=0, price=10)
+    sold = []
+    lock = threading.Lock()
+
+    def buyer():
+        try:
+            for _ in range(5):
+                try:
+                    purchase_items([{'item_id': item.id, 'quantity': 1}])
+                except PurchaseError:
+                    continue
+                with lock:
+                    sold.append(1)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=buyer) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    item.refresh_from_db()
+    assert item.quantityInStock >= 0
+    assert item.quantitySold == len(sold) <= 25
+    assert item.quantityInStock + item.quantitySold == 25
+    assert item.revenue == 10 * len(sold)
@@ -0,0 +1,65 @@
+import pytest
+from django.db import connection
+from inventory.models import Item
+from inventory.stock_report import best_sellers_by_quantity, best_sellers_by_revenue, low_stock_items
+
+# EXPLAIN-based checks that the hot queries behind the item, purchase and
+# stock report endpoints are answered from an index instead of a full table
+# scan or a sort of the whole table.
+
+def query_plan(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET LOCAL enable_seqscan = off')      # tiny test tables would always be seq scanned
+        cursor.execute('EXPLAIN ' + sql, params)
+        columns = [column[0] for column in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    if connection.vendor == 'mysql':
+        return [f"type={row['type']} key={row['key']} extra={row['Extra']}" for row in rows]
+    return [str(next(iter(row.values()))) for row in rows]
+
+def full_scans(plan):
+    if connection.vendor == 'sqlite':
+        return [step for step in plan if (step.startswith('SCAN') and 'USING' not in step) or 'TEMP B-TREE' in step]
+    if connection.vendor == 'mysql':
+        return [step for step in plan if step.startswith('type=ALL') or 'Using filesort' in step]
+    return [step for step in plan if 'Seq Scan' in step or step.lstrip().startswith('Sort')]
+
+def assert_uses_index(queryset):
+    plan = query_plan(queryset)
+    assert not full_scans(plan), f'{queryset.query}\nuses a full scan:\n' + '\n'.join(plan)
+
+@pytest.fixture
+def catalogue(db):
+    Item.objects.bulk_create(
+        Item(item_id=i, name=f'Item {i}', quantityInStock=i % 50, quantitySold=i % 37, revenue=0, price=i % 23 + 1)
+        for i in range(1, 501)
+    )
+    if connection.vendor == 'mysql':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE TABLE inventory_item')
+
+@pytest.mark.django_db
+def test_low_stock_scan_uses_index(catalogue):
+    assert_uses_index(low_stock_items())
+    assert_uses_index(low_stock_items().values_list('pk', flat=True))
+
+@pytest.mark.django_db
+def test_best_seller_by_quantity_uses_index(catalogue):
+    assert_uses_index(best_sellers_by_quantity()[:1])
+
+@pytest.mark.django_db
+def test_best_seller_by_revenue_uses_index(catalogue):
+    assert_uses_index(best_sellers_by_revenue()[:1])
+
+@pytest.mark.django_db
+def test_item_page_uses_index(catalogue):                  # what KeysetPagination runs for a deep page
+    assert_uses_index(Item.objects.filter(pk__gt=250).order_by('id')[:100])
+
+@pytest.mark.django_db
+def test_purchase_lookup_uses_index(catalogue):
+    assert_uses_index(Item.objects.filter(pk__in=[3, 30, 300]))
@@ -0,0 +1,100 @@
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.contrib.auth.models import User
+from inventory.models import Item, Supplier
+from inventory.renderers import FastJSONRenderer
+from inventory.rows import plan_for
+from inventory.serializers import ItemAdminSerializer, ItemCustomerSerializer, JobSerializer, SupplierSerializer
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def admin_user(db):
+    user = User.objects.create_user(username='admin', password='password', is_staff=True)
+    return user
+
+@pytest.fixture
+def worker_user(db):
+    user = User.objects.create_user(username='worker', password='password', is_staff=False)
+    return user
+
+@pytest.fixture
+def catalogue(db):
+    suppliers = [
+        Supplier.objects.create(name=f'Supplier {i}', contact=f'{i:010d}', email=f'supplier{i}@example.com')
+        for i in range(1, 4)
+    ]
+    names = ['Widget', 'Widget mini', 'Gadget \u2028 line', 'Gizmo été', 'Widget max']
+    for i, name in enumerate(names, 1):
+        item = Item.objects.create(
+            item_id=i, name=name, quantityInStock=10 * i, quantitySold=i, revenue=Decimal('1.5') * i, price=Decimal('9.99'),
+        )
+        item.suppliers.set(suppliers[:i % 4])
+    return suppliers
+
+def get_both_ways(settings, client, url, params=None):
+    # The same request through the serializers and through the row plans.
+    responses = []
+    for rows in (False, True):
+        settings.INVENTORY_ROW_SERIALIZERS = rows
+        cache.clear()
+        response = client.get(url, params)
+        assert response.status_code == status.HTTP_200_OK
+        responses.append(b''.join(response.streaming_content) if response.streaming else response.content)
+    return responses
+
+@pytest.mark.django_db
+def test_plans_are_compiled_for_catalogue_serializers():
+    for serializer_class in (ItemAdminSerializer, ItemCustomerSerializer, SupplierSerializer):
+        assert plan_for(serializer_class) is not None
+    # Method fields only the serializer can render.
+    assert plan_for(JobSerializer) is None
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('user', ['admin_user', 'worker_user'])
+def test_item_pages_are_unchanged(request, settings, api_client, catalogue, user):
+    api_client.force_authenticate(user=request.getfixturevalue(user))
+    slow, fast = get_both_ways(settings, api_client, reverse('item-list'), {'page_size': 2})
+    assert slow == fast
+    # Following the cursor gives the same next page too.
+    next_url = api_client.get(reverse('item-list'), {'page_size': 2}).data['next']
+    slow, fast = get_both_ways(settings, api_client, next_url)
+    assert slow == fast
+
+@pytest.mark.django_db
+def test_search_results_are_unchanged(settings, api_client, worker_user, catalogue):
+    api_client.force_authenticate(user=worker_user)
+    slow, fast = get_both_ways(settings, api_client, reverse('item-list'), {'search': 'widget', 'page_size': 2})
+    assert slow == fast
+    assert b'Widget' in fast
+
+@pytest.mark.django_db
+def test_supplier_list_is_unchanged(settings, api_client, admin_user, catalogue):
+    api_client.force_authenticate(user=admin_user)
+    slow, fast = get_both_ways(settings, api_client, reverse('supplier-list'))
+    assert slow == fast
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('output', ['ndjson', 'csv'])
+def test_exports_are_unchanged(settings, api_client, admin_user, catalogue, output):
+    settings.INVENTORY_EXPORT_CHUNK_SIZE = 2
+    api_client.force_authenticate(user=admin_user)
+    slow, fast = get_both_ways(settings, api_client, reverse('item-export'), {'output': output})
+    assert slow == fast
+    assert fast.count(b'\n') == 5 + (output == 'csv')
+
+@pytest.mark.parametrize('media_type', [None, 'application/json; indent=4'])
+def test_fast_renderer_matches_json_renderer(media_type):
+    data = {
+        'price': '9.99', 'total': Decimal('19.98'), 'name': 'café \u2028 \u2029', 'ids': [1, 2], 'none': None,
+    }
+    assert FastJSONRenderer().render(data, media_type) == JSONRenderer().render(data, media_type)
+    assert FastJSONRenderer().render(None) == b''
@@ -0,0 +1,149 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.contrib.auth.models import User
+from inventory.models import Item, ItemSalesBucket, Sale, SaleLine
+from inventory.sales import append_sale, rollup_sales
+
+NOON = datetime(2024, 7, 10, 12, tzinfo=timezone.utc)
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def admin_user(db):
+    return User.objects.create_user(username='admin', password='password', is_staff=True)
+
+@pytest.fixture
+def worker_user(db):
+    return User.objects.create_user(username='worker', password='password', is_staff=False)
+
+@pytest.fixture
+def items(db):
+    return [
+        Item.objects.create(item_id=i, name=f'Item {i}', quantityInStock=100, quantitySold=0, revenue=0, price=10)
+        for i in range(1, 4)
+    ]
+
+def sale_at(moment, *lines):
+    # Backdates a sale and folds it into the buckets as it was at that time.
+    sale = append_sale(None, lines)
+    SaleLine.objects.filter(sale=sale).update(created_at=moment, rolled_up=False)
+    Sale.objects.filter(pk=sale.pk).update(created_at=moment)
+    rollup_sales()
+    return sale
+
+@pytest.fixture
+def sales(settings, items):
+    settings.INVENTORY_SALES_ROLLUP_ON_PURCHASE = False
+    sale_at(NOON - timedelta(days=3), (items[0].pk, 50, 10))
+    sale_at(NOON - timedelta(hours=30), (items[1].pk, 1, 100))
+    sale_at(NOON - timedelta(hours=2), (items[2].pk, 5, 1))
+    sale_at(NOON - timedelta(minutes=30), (items[2].pk, 5, 1), (items[1].pk, 1, 100))
+    return items
+
+@pytest.mark.django_db
+def test_purchase_updates_hour_and_day_buckets(api_client, worker_user, items):
+    api_client.force_authenticate(user=worker_user)
+    for _ in range(2):
+        response = api_client.put('/api/purchase/', {'purchases': [{'item_id': items[0].pk, 'quantity': 2}]}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+
+    assert {
+        (bucket.granularity, bucket.quantity, bucket.revenue)
+        for bucket in ItemSalesBucket.objects.filter(item=items[0])
+    } == {(ItemSalesBucket.HOUR, 4, 40), (ItemSalesBucket.DAY, 4, 40)}
+    assert not SaleLine.objects.filter(rolled_up=False).exists()
+    assert rollup_sales() == 0
+
+@pytest.mark.django_db
+def test_top_items_over_window(api_client, admin_user, sales):
+    api_client.force_authenticate(user=admin_user)
+    response = api_client.get(reverse('sales-analytics'), {'start': (NOON - timedelta(hours=24)).isoformat(), 'end': NOON.isoformat()})
+    assert response.status_code == status.HTTP_200_OK
+    assert [(row['item_id'], row['quantity'], row['revenue']) for row in response.data['by_revenue']] == [
+        (2, 1, '100.00'), (3, 10, '10.00'),
+    ]
+    assert [row['item_id'] for row in response.data['by_quantity']] == [3, 2]
+
+    response = api_client.get(reverse('sales-analytics'), {'start': (NOON - timedelta(days=7)).isoformat(),
+                                                           'end': NOON.isoformat(), 'limit': 1})
+    assert [(row['item_id'], row['revenue']) for row in response.data['by_revenue']] == [(1, '500.00')]
+    assert [(row['item_id'], row['quantity']) for row in response.data['by_quantity']] == [(1, 50)]
+
+@pytest.mark.django_db
+def test_window_combines_day_and_edge_hour_buckets(api_client, admin_user, sales):
+    # 11:30 on the 7th (rounded out to 11:00) to 12:00 on the 10th: the 8th
+    # and 9th come from the daily buckets, the rest of the 7th and the
+    # morning of the 10th from the hourly ones.
+    api_client.force_authenticate(user=admin_user)
+    start = NOON - timedelta(days=3, minutes=30)
+    response = api_client.get(reverse('sales-analytics'), {'start': start.isoformat(), 'end': NOON.isoformat()})
+    assert {row['item_id']: row['quantity'] for row in response.data['by_quantity']} == {1: 50, 2: 2, 3: 10}
+
+    response = api_client.get(reverse('sales-analytics'), {'start': (start + timedelta(hours=2)).isoformat(),
+                                                           'end': NOON.isoformat()})
+    assert {row['item_id'] for row in response.data['by_quantity']} == {2, 3}
+
+@pytest.mark.django_db
+def test_item_series_is_zero_filled(api_client, admin_user, sales):
+    api_client.force_authenticate(user=admin_user)
+    url = reverse('item-sales-analytics', args=[sales[2].pk])
+    response = api_client.get(url, {'start': (NOON - timedelta(hours=3)).isoformat(), 'end': NOON.isoformat()})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['granularity'] == 'hour'
+    assert [(point['quantity'], point['revenue']) for point in response.data['series']] == [
+        (0, '0.00'), (5, '5.00'), (5, '5.00'),
+    ]
+
+    response = api_client.get(url, {'start': (NOON - timedelta(days=4)).isoformat(), 'end': NOON.isoformat()})
+    assert response.data['granularity'] == 'day'
+    assert [point['quantity'] for point in response.data['series']] == [0, 0, 0, 0, 10]
+
+    response = api_client.get(url, {'start': (NOON - timedelta(hours=3)).isoformat(), 'end': NOON.isoformat(),
+                                    'granularity': 'day'})
+    assert [point['quantity'] for point in response.data['series']] == [10]
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params', [
+    {'window': 'week'},
+    {'start': 'yesterday'},
+    {'start': NOON.isoformat(), 'end': (NOON - timedelta(hours=1)).isoformat()},
+    {'window': '1d', 'granularity': 'minute'},
+    {'window': '1000d', 'granularity': 'hour'},
+])
+def test_bad_window_is_rejected(api_client, admin_user, items, params):
+    api_client.force_authenticate(user=admin_user)
+    response = api_client.get(reverse('item-sales-analytics', args=[items[0].pk]), params)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert 'error' in response.data
+
+@pytest.mark.django_db
+def test_analytics_requires_admin(api_client, worker_user, items):
+    api_client.force_authenticate(user=worker_user)
+    assert api_client.get(reverse('sales-analytics')).status_code == status.HTTP_403_FORBIDDEN
+    response = api_client.get(reverse('item-sales-analytics', args=[items[0].pk]))
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+@pytest.mark.django_db
+def test_item_series_unknown_item(api_client, admin_user):
+    api_client.force_authenticate(user=admin_user)
+    assert api_client.get(reverse('item-sales-analytics', args=[999])).status_code == status.HTTP_404_NOT_FOUND
+
+@pytest.mark.django_db
+def test_analytics_are_cached(api_client, admin_user, sales):
+    api_client.force_authenticate(user=admin_user)
+    params = {'start': (NOON - timedelta(days=1)).isoformat(), 'end': NOON.isoformat()}
+    first = api_client.get(reverse('sales-analytics'), params)
+    assert 'private' in first['Cache-Control']
+
+    with CaptureQueriesContext(connection) as queries:
+        second = api_client.get(reverse('sales-analytics'), params)
+    assert len(queries) == 0
+    assert second.data == first.data
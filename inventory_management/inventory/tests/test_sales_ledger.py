@@ -0,0 +1,183 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.contrib.auth.models import User
+from inventory.models import Item, ItemSalesBucket, Sale, SaleLine
+from inventory.sales import append_sale, check_item_counters, prune_ledger, rollup_sales
+
+@pytest.fixture
+def user(db):
+    return User.objects.create_user(username='buyer', password='password')
+
+@pytest.fixture
+def items(db):
+    return [
+        Item.objects.create(item_id=i, name=f'Item {i}', quantityInStock=100, quantitySold=0, revenue=0, price=10)
+        for i in range(1, 4)
+    ]
+
+def sale_at(moment, *lines):
+    sale = append_sale(None, lines)
+    Sale.objects.filter(pk=sale.pk).update(created_at=moment)
+    SaleLine.objects.filter(sale=sale).update(created_at=moment)
+    return sale
+
+def buckets():
+    return {
+        (bucket.item_id, bucket.start): (bucket.quantity, bucket.revenue)
+        for bucket in ItemSalesBucket.objects.filter(granularity=ItemSalesBucket.HOUR)
+    }
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('mode', ['pessimistic', 'optimistic'])
+def test_purchase_appends_sale(mode, settings, user, items):
+    settings.INVENTORY_PURCHASE_MODE = mode
+    client = APIClient()
+    client.force_authenticate(user=user)
+    response = client.put('/api/purchase/', {
+        'purchases': [{'item_id': items[0].pk, 'quantity': 2}, {'item_id': items[1].pk, 'quantity': 1},
+                      {'item_id': items[0].pk, 'quantity': 1}]
+    }, format='json')
+    assert response.status_code == status.HTTP_200_OK
+
+    sale = Sale.objects.get()
+    assert sale.user == user
+    assert sale.total == 40
+    assert {(line.item_id, line.quantity, line.amount) for line in sale.lines.all()} == {
+        (items[0].pk, 3, 30), (items[1].pk, 1, 10),
+    }
+
+@pytest.mark.django_db
+def test_failed_purchase_appends_nothing(user, items):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    client.put('/api/purchase/', {'purchases': [{'item_id': items[0].pk, 'quantity': 1000}]}, format='json')
+    assert not Sale.objects.exists()
+
+@pytest.mark.django_db
+def test_rollup_folds_lines_into_hourly_buckets(settings, items):
+    settings.INVENTORY_SALES_ROLLUP_ON_PURCHASE = False
+    ten = datetime(2024, 7, 1, 10, tzinfo=timezone.utc)
+    sale_at(ten + timedelta(minutes=5), (items[0].pk, 2, 10), (items[1].pk, 1, 10))
+    sale_at(ten + timedelta(minutes=55), (items[0].pk, 1, 10))
+    sale_at(ten + timedelta(hours=1), (items[0].pk, 4, 10))
+
+    assert rollup_sales(batch_size=2) == 4
+    assert buckets() == {
+        (items[0].pk, ten): (3, 30),
+        (items[1].pk, ten): (1, 10),
+        (items[0].pk, ten + timedelta(hours=1)): (4, 40),
+    }
+    assert rollup_sales() == 0
+
+    sale_at(ten + timedelta(minutes=30), (items[0].pk, 1, 10))
+    rollup_sales()
+    assert buckets()[items[0].pk, ten] == (4, 40)
+
+@pytest.mark.django_db
+def test_buckets_fold_without_upsert_conflict_targets(monkeypatch, user, items):
+    # As on MySQL, whose ON DUPLICATE KEY UPDATE takes no conflict target.
+    monkeypatch.setattr(connection.features, 'supports_update_conflicts_with_target', False)
+    client = APIClient()
+    client.force_authenticate(user=user)
+    for quantity in (2, 3):
+        response = client.put('/api/purchase/', {'purchases': [{'item_id': items[0].pk, 'quantity': quantity}]}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+    assert list(buckets().values()) == [(5, 50)]
+
+    SaleLine.objects.update(rolled_up=False)
+    ItemSalesBucket.objects.all().delete()
+    assert rollup_sales() == 2
+    assert list(buckets().values()) == [(5, 50)]
+
+@pytest.mark.django_db
+def test_rollup_skips_deleted_items(settings, items):
+    settings.INVENTORY_SALES_ROLLUP_ON_PURCHASE = False
+    sale_at(datetime(2024, 7, 1, 10, tzinfo=timezone.utc), (items[0].pk, 1, 10), (items[1].pk, 1, 10))
+    items[0].delete()
+    assert rollup_sales() == 2
+    assert list(buckets()) == [(items[1].pk, datetime(2024, 7, 1, 10, tzinfo=timezone.utc))]
+
+@pytest.mark.django_db
+def test_counters_check_and_rebuild(user, items):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    client.put('/api/purchase/', {'purchases': [{'item_id': items[0].pk, 'quantity': 3}]}, format='json')
+    call_command('rollup_sales', '--check')
+
+    Item.objects.filter(pk=items[0].pk).update(quantitySold=99)
+    with pytest.raises(CommandError):
+        call_command('rollup_sales', '--check')
+
+    call_command('rollup_sales', '--rebuild-counters')
+    item = Item.objects.get(pk=items[0].pk)
+    assert item.quantitySold == 3
+    assert item.revenue == 30
+    assert Item.objects.get(pk=items[1].pk).quantitySold == 0
+
+def sales_of(item_id):
+    return Item.objects.values_list('quantitySold', 'revenue').get(item_id=item_id)
+
+@pytest.mark.django_db
+def test_counters_set_on_items_are_kept(user):
+    admin = User.objects.create_user(username='admin', password='password', is_staff=True)
+    item = Item.objects.create(item_id=1, name='Item 1', quantityInStock=100, quantitySold=5, revenue=50, price=10)
+    assert check_item_counters() == []
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    client.put('/api/purchase/', {'purchases': [{'item_id': item.pk, 'quantity': 3}]}, format='json')
+    client.force_authenticate(user=admin)
+    # Below what the ledger holds for the item.
+    response = client.patch(f'/api/items/{item.pk}/', {'quantitySold': 2, 'revenue': '20.00'}, format='json')
+    assert response.status_code == status.HTTP_200_OK
+    assert check_item_counters() == []
+
+    call_command('rollup_sales', '--rebuild-counters')
+    assert sales_of(1) == (2, 20)
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('upsert', [True, False])
+def test_counters_set_by_bulk_writes_are_kept(upsert, monkeypatch, user):
+    monkeypatch.setattr(connection.features, 'supports_update_conflicts_with_target', upsert)
+    admin = User.objects.create_user(username='admin', password='password', is_staff=True)
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    rows = [
+        {'item_id': i, 'name': f'Item {i}', 'quantityInStock': 100, 'quantitySold': 5, 'revenue': 50, 'price': 10}
+        for i in (1, 2)
+    ]
+    assert client.post(reverse('item-bulk'), rows, format='json').status_code == status.HTTP_201_CREATED
+    client.force_authenticate(user=user)
+    purchases = [{'item_id': pk, 'quantity': 1} for pk in Item.objects.values_list('pk', flat=True)]
+    client.put('/api/purchase/', {'purchases': purchases}, format='json')
+
+    client.force_authenticate(user=admin)
+    rows = [{'item_id': 1, 'quantitySold': 9, 'revenue': 90}, {'item_id': 2, 'price': 12}]
+    assert client.patch(reverse('item-bulk'), rows, format='json').status_code == status.HTTP_200_OK
+    assert check_item_counters() == []
+
+    call_command('rollup_sales', '--rebuild-counters')
+    assert sales_of(1) == (9, 90)
+    assert sales_of(2) == (6, 60)
+
+@pytest.mark.django_db
+def test_prune_keeps_buckets(settings, items):
+    settings.INVENTORY_SALES_ROLLUP_ON_PURCHASE = False
+    old = datetime(2024, 7, 1, 10, tzinfo=timezone.utc)
+    sale_at(old, (items[0].pk, 1, 10))
+    recent = sale_at(datetime(2024, 7, 20, tzinfo=timezone.utc), (items[0].pk, 1, 10))
+    pending = sale_at(old, (items[1].pk, 1, 10))
+    SaleLine.objects.filter(sale=pending).update(rolled_up=False)
+    SaleLine.objects.exclude(sale=pending).update(rolled_up=True)
+    ItemSalesBucket.objects.create(item=items[0], start=old, quantity=1, revenue=10)
+
+    assert prune_ledger(datetime(2024, 7, 10, tzinfo=timezone.utc)) == 1
+    assert set(Sale.objects.values_list('pk', flat=True)) == {recent.pk, pending.pk}
+    assert buckets()[items[0].pk, old] == (1, 10)
@@ -0,0 +1,169 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.contrib.auth.models import User
+from inventory.alerts import deliver_alerts
+from inventory.models import Item, LowStockItem, StockAlert, Supplier
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def admin_user(db):
+    user = User.objects.create_user(username='admin', password='password', is_staff=True)
+    return user
+
+@pytest.fixture
+def worker_user(db):
+    user = User.objects.create_user(username='worker', password='password', is_staff=False)
+    return user
+
+@pytest.fixture
+def suppliers(db):
+    return [
+        Supplier.objects.create(name='Acme', contact='1234567890', email='acme@example.com'),
+        Supplier.objects.create(name='Globex', contact='0987654321', email='globex@example.com'),
+    ]
+
+@pytest.fixture
+def items(suppliers):
+    items = [
+        Item.objects.create(item_id=i, name=f'Item {i}', quantityInStock=30, quantitySold=0, revenue=0, price=10,
+                            reorderThreshold=20)
+        for i in range(1, 4)
+    ]
+    items[0].suppliers.add(suppliers[0])
+    items[1].suppliers.add(suppliers[0], suppliers[1])
+    return items
+
+class MemoryAlertSink:
+    def __init__(self, fail_for=()):
+        self.sent = []
+        self.fail_for = fail_for
+
+    def send(self, alert):
+        if alert['supplier'] and alert['supplier']['name'] in self.fail_for:
+            raise OSError('webhook down')
+        self.sent.append(alert)
+
+@pytest.fixture
+def sink():
+    return MemoryAlertSink()
+
+def buy(client, *lines):
+    response = client.put('/api/purchase/', {
+        'purchases': [{'item_id': item.pk, 'quantity': quantity} for item, quantity in lines]
+    }, format='json')
+    assert response.status_code == status.HTTP_200_OK
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('mode', ['pessimistic', 'optimistic'])
+def test_purchase_queues_threshold_crossings(mode, settings, api_client, worker_user, items):
+    settings.INVENTORY_PURCHASE_MODE = mode
+    api_client.force_authenticate(user=worker_user)
+    buy(api_client, (items[0], 10), (items[1], 5))
+    assert not StockAlert.objects.exists()
+
+    buy(api_client, (items[0], 1), (items[1], 5))
+    assert list(StockAlert.objects.values_list('item_id', 'quantityInStock', 'reorderThreshold')) == [
+        (items[0].pk, 19, 20),
+    ]
+    assert set(LowStockItem.objects.values_list('item_id', flat=True)) == {items[0].pk}
+
+    # Already below the threshold: no new crossing.
+    buy(api_client, (items[0], 1), (items[1], 1))
+    # Once per supplier of the item.
+    assert list(StockAlert.objects.order_by('id').values_list('item_id', 'supplier__name')) == [
+        (items[0].pk, 'Acme'), (items[1].pk, 'Acme'), (items[1].pk, 'Globex'),
+    ]
+
+@pytest.mark.django_db
+def test_stock_report_uses_item_thresholds(api_client, admin_user, items):
+    Item.objects.create(item_id=9, name='Scarce', quantityInStock=3, quantitySold=0, revenue=0, price=1)
+    Item.objects.filter(pk=items[2].pk).update(reorderThreshold=40)
+    call_command('rebuild_stock_report')
+    api_client.force_authenticate(user=admin_user)
+    response = api_client.get(reverse('stock_report'))
+    assert {item.name for item in response.context['low_stock_items']} == {'Scarce', 'Item 3'}
+
+@pytest.mark.django_db
+def test_alerts_are_batched_per_supplier(api_client, worker_user, items, sink):
+    api_client.force_authenticate(user=worker_user)
+    buy(api_client, (items[0], 15), (items[1], 15), (items[2], 15))
+    # Item 1 is restocked and crosses again: its supplier hears of it once.
+    items[0].refresh_from_db()
+    items[0].quantityInStock = 30
+    items[0].save()
+    buy(api_client, (items[0], 12))
+    # Item 2 is queued for both of its suppliers.
+    assert StockAlert.objects.count() == 5
+
+    assert deliver_alerts(sink=sink) == 5
+    assert sink.sent == [
+        {'supplier': {'id': items[0].suppliers.get().pk, 'name': 'Acme', 'email': 'acme@example.com'},
+         'items': [
+             {'id': items[0].pk, 'item_id': 1, 'name': 'Item 1', 'quantityInStock': 18, 'reorderThreshold': 20},
+             {'id': items[1].pk, 'item_id': 2, 'name': 'Item 2', 'quantityInStock': 15, 'reorderThreshold': 20},
+         ]},
+        {'supplier': {'id': items[1].suppliers.get(name='Globex').pk, 'name': 'Globex', 'email': 'globex@example.com'},
+         'items': [
+             {'id': items[1].pk, 'item_id': 2, 'name': 'Item 2', 'quantityInStock': 15, 'reorderThreshold': 20},
+         ]},
+        {'supplier': None,
+         'items': [
+             {'id': items[2].pk, 'item_id': 3, 'name': 'Item 3', 'quantityInStock': 15, 'reorderThreshold': 20},
+         ]},
+    ]
+    assert not StockAlert.objects.filter(delivered_at__isnull=True).exists()
+    assert deliver_alerts(sink=sink) == 0
+    assert len(sink.sent) == 3
+
+@pytest.mark.django_db
+def test_restocked_items_are_not_alerted(api_client, worker_user, items, sink):
+    api_client.force_authenticate(user=worker_user)
+    buy(api_client, (items[0], 15), (items[2], 15))
+    Item.objects.filter(pk=items[0].pk).update(quantityInStock=50)
+    assert deliver_alerts(batch_size=1, sink=sink) == 2
+    assert [alert['supplier'] for alert in sink.sent] == [None]
+
+@pytest.mark.django_db
+def test_failed_delivery_stays_queued(api_client, worker_user, items):
+    class FailingSink:
+        def send(self, alert):
+            raise OSError('webhook down')
+
+    api_client.force_authenticate(user=worker_user)
+    buy(api_client, (items[0], 15))
+    with pytest.raises(OSError):
+        deliver_alerts(sink=FailingSink())
+    assert StockAlert.objects.filter(delivered_at__isnull=True).count() == 1
+
+@pytest.mark.django_db
+def test_failed_delivery_only_retries_undelivered_suppliers(api_client, worker_user, items):
+    api_client.force_authenticate(user=worker_user)
+    buy(api_client, (items[1], 15), (items[2], 15))
+    failing = MemoryAlertSink(fail_for=['Globex'])
+    with pytest.raises(OSError):
+        deliver_alerts(sink=failing)
+    assert [alert['supplier']['name'] for alert in failing.sent] == ['Acme']
+
+    sink = MemoryAlertSink()
+    assert deliver_alerts(sink=sink) == 2
+    assert [alert['supplier'] and alert['supplier']['name'] for alert in sink.sent] == ['Globex', None]
+
+@pytest.mark.django_db
+def test_file_sink(settings, tmp_path, api_client, worker_user, items):
+    settings.INVENTORY_STOCK_ALERT_SINK = 'file'
+    settings.INVENTORY_STOCK_ALERT_FILE = str(tmp_path / 'alerts.jsonl')
+    api_client.force_authenticate(user=worker_user)
+    buy(api_client, (items[0], 15))
+    call_command('send_stock_alerts')
+    alerts = [json.loads(line) for line in (tmp_path / 'alerts.jsonl').read_text().splitlines()]
+    assert [(alert['supplier']['name'], [item['name'] for item in alert['items']]) for alert in alerts] == [
+        ('Acme', ['Item 1']),
+    ]
@@ -0,0 +1,100 @@
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.contrib.auth.models import User
+from inventory.models import Item, LowStockItem, StockReport
+from inventory.purchases import purchase_items
+from inventory.stock_report import check_report, rebuild_report
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def admin_user(db):
+    user = User.objects.create_user(username='admin', password='password', is_staff=True)
+    return user
+
+@pytest.fixture
+def items(db):
+    return [
+        Item.objects.create(item_id=1, name='Cheap', quantityInStock=100, quantitySold=0, revenue=0, price=1),
+        Item.objects.create(item_id=2, name='Pricey', quantityInStock=10, quantitySold=0, revenue=0, price=100),
+        Item.objects.create(item_id=3, name='Scarce', quantityInStock=3, quantitySold=0, revenue=0, price=5),
+    ]
+
+@pytest.mark.django_db
+def test_stock_report_admin(api_client, admin_user, items):
+    cheap, pricey, scarce = items
+    purchase_items([{'item_id': cheap.id, 'quantity': 50}, {'item_id': pricey.id, 'quantity': 6}])
+    api_client.force_authenticate(user=admin_user)
+    response = api_client.get(reverse('stock_report'))
+    assert response.status_code == status.HTTP_200_OK
+    assert response.context['most_sold_item_quantity'] == cheap
+    assert response.context['most_sold_item_revenue'] == pricey
+    assert set(response.context['low_stock_items']) == {scarce, pricey}
+
+@pytest.mark.django_db
+def test_stock_report_read_does_not_scan_items(api_client, admin_user, items, django_assert_num_queries):
+    rebuild_report()
+    api_client.force_authenticate(user=admin_user)
+    with django_assert_num_queries(2):              # the snapshot and the low-stock list
+        response = api_client.get(reverse('stock_report'))
+    assert response.status_code == status.HTTP_200_OK
+
+@pytest.mark.parametrize('mode', ['pessimistic', 'optimistic'])
+@pytest.mark.django_db
+def test_purchases_keep_stock_report_consistent(mode, items, django_capture_on_commit_callbacks):
+    cheap, pricey, scarce = items
+    rebuild_report()
+    with django_capture_on_commit_callbacks(execute=True):
+        purchase_items([{'item_id': cheap.id, 'quantity': 30}], mode)
+        purchase_items([{'item_id': pricey.id, 'quantity': 7}, {'item_id': scarce.id, 'quantity': 1}], mode)
+        purchase_items([{'item_id': cheap.id, 'quantity': 30}], mode)
+    assert check_report() == []
+    report = StockReport.objects.get()
+    assert report.most_sold_item_quantity == cheap
+    assert report.most_sold_item_revenue == pricey
+
+@pytest.mark.django_db
+def test_purchases_raise_best_sellers_after_commit(items, django_capture_on_commit_callbacks):
+    cheap, pricey, scarce = items
+    rebuild_report()
+    with django_capture_on_commit_callbacks() as callbacks:
+        purchase_items([{'item_id': pricey.id, 'quantity': 2}])
+    # The report row is not written inside the purchase transaction.
+    assert StockReport.objects.get().most_sold_revenue == 0
+    for callback in callbacks:
+        callback()
+    report = StockReport.objects.get()
+    assert (report.most_sold_item_revenue, report.most_sold_revenue) == (pricey, 200)
+
+@pytest.mark.django_db
+def test_item_edits_keep_stock_report_consistent(items, django_capture_on_commit_callbacks):
+    cheap, pricey, scarce = items
+    rebuild_report()
+    with django_capture_on_commit_callbacks(execute=True):
+        purchase_items([{'item_id': pricey.id, 'quantity': 2}, {'item_id': cheap.id, 'quantity': 10}])
+    pricey.refresh_from_db()
+    pricey.quantitySold = 0                  # an admin correction lowers the best seller
+    pricey.save()
+    scarce.quantityInStock = 50              # a restock takes an item off the low-stock list
+    scarce.save()
+    assert check_report() == []
+    assert StockReport.objects.get().most_sold_item_revenue == cheap
+
+    cheap.delete()
+    assert check_report() == []
+
+@pytest.mark.django_db
+def test_check_stock_report_command(items):
+    rebuild_report()
+    LowStockItem.objects.all().delete()
+    with pytest.raises(CommandError):
+        call_command('check_stock_report')
+
+    call_command('check_stock_report', '--fix')
+    call_command('check_stock_report')
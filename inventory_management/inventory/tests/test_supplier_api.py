@@ -168,4 +168,17 @@ def test_item_supplier_relationship():
     
     assert item.suppliers.count() == 2
     assert item.suppliers.filter(name='Supplier One').exists()
-    assert item.suppliers.filter(name='Supplier Two').exists()
\ No newline at end of file
+    assert item.suppliers.filter(name='Supplier Two').exists()
+
+@pytest.mark.django_db
+def test_list_suppliers_is_cursor_paginated(api_client, admin_user):
+    for i in range(5):
+        Supplier.objects.create(name=f'Supplier {i}', contact=f'{i:010d}', email=f'supplier{i}@example.com')
+    api_client.force_authenticate(user=admin_user)
+    response = api_client.get(reverse('supplier-list') + '?page_size=2')
+    assert response.status_code == status.HTTP_200_OK
+    assert [supplier['name'] for supplier in response.data['results']] == ['Supplier 0', 'Supplier 1']
+    assert response.data['previous'] is None
+
+    response = api_client.get(response.data['next'])
+    assert [supplier['name'] for supplier in response.data['results']] == ['Supplier 2', 'Supplier 3']
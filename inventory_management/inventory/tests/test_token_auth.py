@@ -0,0 +1,145 @@
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+from django.contrib.auth.models import User
+from inventory.authentication import DENYLIST_KEY, InventoryTokenObtainPairSerializer
+from inventory.models import Item, Sale, TokenRevocation
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def admin_user(db):
+    user = User.objects.create_user(username='admin', password='password', is_staff=True)
+    return user
+
+@pytest.fixture
+def worker_user(db):
+    user = User.objects.create_user(username='worker', password='password', is_staff=False)
+    return user
+
+@pytest.fixture
+def item(db):
+    return Item.objects.create(item_id=1, name='Item 1', quantityInStock=10, quantitySold=0, revenue=0, price=5)
+
+def access_token(user):
+    return str(InventoryTokenObtainPairSerializer.get_token(user).access_token)
+
+def user_queries(queries):
+    return [query['sql'] for query in queries if 'auth_user' in query['sql']]
+
+def backdate_revocation(user):
+    # Tokens issued in the second of a revocation are rejected with it.
+    TokenRevocation.objects.filter(user_id=user.pk).update(revoked_at=timezone.now() - timedelta(seconds=5))
+    cache.delete(DENYLIST_KEY)
+
+@pytest.mark.django_db
+def test_obtained_tokens_carry_user_claims(api_client, admin_user):
+    response = api_client.post(reverse('token_obtain_pair'), {'username': 'admin', 'password': 'password'})
+    assert response.status_code == status.HTTP_200_OK
+    token = AccessToken(response.data['access'])
+    assert (token['username'], token['is_staff'], token['is_superuser']) == ('admin', True, False)
+
+    refreshed = api_client.post(reverse('token_refresh'), {'refresh': response.data['refresh']}).data['access']
+    assert AccessToken(refreshed)['is_staff'] is True
+
+@pytest.mark.django_db
+def test_requests_skip_the_user_query(api_client, admin_user, item):
+    api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token(admin_user)}')
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get(reverse('item-detail', kwargs={'pk': item.pk}))
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['quantityInStock'] == 10
+    assert user_queries(queries) == []
+
+    # Served from the catalogue cache, the request needs no query at all.
+    with CaptureQueriesContext(connection) as queries:
+        api_client.get(reverse('item-detail', kwargs={'pk': item.pk}))
+    assert len(queries) == 0
+
+@pytest.mark.django_db
+def test_permissions_read_the_claims(api_client, admin_user, worker_user):
+    api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token(worker_user)}')
+    assert api_client.get(reverse('supplier-list')).status_code == status.HTTP_403_FORBIDDEN
+
+    api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token(admin_user)}')
+    response = api_client.post(reverse('supplier-list'), {'name': 'S', 'contact': '1234567890', 'email': 's@example.com'})
+    assert response.status_code == status.HTTP_201_CREATED
+
+@pytest.mark.django_db
+def test_tokens_without_claims_load_the_user(api_client, admin_user, item):
+    api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(admin_user)}')
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get(reverse('item-detail', kwargs={'pk': item.pk}))
+    assert response.data['quantityInStock'] == 10
+    assert len(user_queries(queries)) == 1
+
+@pytest.mark.django_db
+def test_purchase_with_token_user_records_buyer(api_client, worker_user, item):
+    api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token(worker_user)}')
+    response = api_client.put('/api/purchase/', {'purchases': [{'item_id': item.pk, 'quantity': 1}]}, format='json')
+    assert response.status_code == status.HTTP_200_OK
+    assert Sale.objects.get().user == worker_user
+
+@pytest.mark.django_db
+def test_changing_flags_revokes_tokens(api_client, admin_user, item):
+    token = access_token(admin_user)
+    api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    assert api_client.get(reverse('supplier-list')).status_code == status.HTTP_200_OK
+
+    admin_user.is_staff = False
+    admin_user.save()
+    response = api_client.get(reverse('supplier-list'))
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert response.data['detail'].code == 'token_revoked'
+
+    backdate_revocation(admin_user)
+    api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token(admin_user)}')
+    assert api_client.get(reverse('supplier-list')).status_code == status.HTTP_403_FORBIDDEN
+
+@pytest.mark.django_db
+def test_unrelated_changes_keep_tokens(api_client, worker_user, item):
+    api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token(worker_user)}')
+    worker_user.first_name = 'Pat'
+    worker_user.save()
+    worker_user.save(update_fields=['last_login'])
+    assert api_client.get(reverse('item-list')).status_code == status.HTTP_200_OK
+    assert not TokenRevocation.objects.exists()
+
+@pytest.mark.django_db
+def test_deleting_user_revokes_tokens(api_client, worker_user, item):
+    api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token(worker_user)}')
+    worker_user.delete()
+    assert api_client.get(reverse('item-list')).status_code == status.HTTP_401_UNAUTHORIZED
+
+@pytest.mark.django_db
+def test_denylist_is_cached(api_client, worker_user, item):
+    api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token(worker_user)}')
+    api_client.get(reverse('item-list'))
+    with CaptureQueriesContext(connection) as queries:
+        api_client.get(reverse('item-list'))
+    assert not [query for query in queries if 'tokenrevocation' in query['sql']]
+
+@pytest.mark.django_db
+def test_async_endpoints_use_the_claims(admin_user, item):
+    client = Client()
+    token = access_token(admin_user)
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse('async-item-detail', kwargs={'pk': item.pk}), HTTP_AUTHORIZATION=f'Bearer {token}')
+    assert response.json()['quantityInStock'] == 10
+    assert user_queries(queries) == []
+
+    admin_user.set_password('changed')
+    admin_user.save()
+    response = client.get(reverse('async-item-detail', kwargs={'pk': item.pk}), HTTP_AUTHORIZATION=f'Bearer {token}')
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
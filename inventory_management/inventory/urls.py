@@ -1,7 +1,19 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     path('stock_report/', views.StockReportAPIView.as_view(), name='stock_report'),
     path('api/purchase/', views.PurchaseAPIView.as_view(), name='purchase-api'),
-]
\ No newline at end of file
+    path('api/analytics/sales/', views.SalesAnalyticsAPIView.as_view(), name='sales-analytics'),
+    path('api/analytics/items/<int:pk>/', views.ItemSalesAnalyticsAPIView.as_view(), name='item-sales-analytics'),
+    path('api/jobs/stock_report/', views.StockReportJobAPIView.as_view(), name='stock-report-job'),
+    path('api/jobs/export/', views.ExportJobAPIView.as_view(), name='export-job'),
+    path('api/jobs/import/', views.ImportJobAPIView.as_view(), name='import-job'),
+    path('api/jobs/<int:pk>/', views.JobDetailAPIView.as_view(), name='job-detail'),
+    path('api/jobs/<int:pk>/result/', views.JobResultAPIView.as_view(), name='job-result'),
+    path('metrics', views.metrics, name='metrics'),
+    path('metrics/slow', views.slow_requests, name='slow-requests'),
+    path('api/async/items/', async_views.item_list, name='async-item-list'),
+    path('api/async/items/<int:pk>/', async_views.item_detail, name='async-item-detail'),
+    path('api/async/purchase/', async_views.purchase, name='async-purchase-api'),
+]
@@ -1,38 +1,91 @@
-from django.shortcuts import render
-from django.db.models import F, FloatField, ExpressionWrapper
-from .models import Item, Supplier
-from rest_framework.decorators import api_view
+import hashlib
+import hmac
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_GET
+from .models import Item, Job, Supplier
+from rest_framework.decorators import action, api_view
 from rest_framework import viewsets,status, generics
 from rest_framework.permissions import IsAuthenticated
-from .serializers import SupplierSerializer,UserSerializer, PurchaseSerializer, ItemAdminSerializer, ItemCustomerSerializer
+from .serializers import SupplierSerializer,UserSerializer, PurchaseSerializer, ItemAdminSerializer, ItemCustomerSerializer, JobSerializer
 from .permissions import IsAdminUserOrReadOnlyForItems,IsAdminUserOrReadOnlyForSuppliers
+from .analytics import AnalyticsError, item_series, parse_window, sales_summary
+from .bulk import BulkError, create_items, update_items, delete_items, create_suppliers, update_suppliers, delete_suppliers
+from .cache import CachedCatalogueMixin
+from .exports import EXPORT_FORMATS, export_lines, export_rows
+from .imports import IMPORT_FORMATS, import_format
+from .jobs import save_upload, submit_job
+from .metrics import registry
+from .search import ItemSearchFilter
+from .purchases import purchase_items, PurchaseError, PurchaseConflict
+from .rows import RowListMixin
+from .stock_report import get_report
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from django.contrib.auth.decorators import login_required, user_passes_test
 
 import logging
 
 logger = logging.getLogger('inventory')
 
-class ItemDetailsViewSet(viewsets.ModelViewSet):
+class ItemDetailsViewSet(CachedCatalogueMixin, RowListMixin, viewsets.ModelViewSet):
     queryset = Item.objects.all()
     permission_classes = [IsAdminUserOrReadOnlyForItems]
+    filter_backends = [ItemSearchFilter]
     logger = logging.getLogger('Item')
 
+    read_actions = ('list', 'retrieve', 'export')
+
+    def is_admin(self):
+        return self.request.user.is_staff or self.request.user.is_superuser
+
     def get_serializer_class(self):
         logger.info(f'User {self.request.user} is accessing ItemDetailsViewSet')
-        if self.request.user.is_staff or self.request.user.is_superuser:
+        if self.is_admin():
             return ItemAdminSerializer
         return ItemCustomerSerializer
     def get_queryset(self):
-        search_query = self.request.query_params.get('search', '')
-        if search_query:
-            queryset = Item.objects.filter(name__icontains=search_query)
-            logger.info(f'Search query: {search_query}, Found items: {queryset.count()}')
-        else:
-            queryset = Item.objects.all()
+        queryset = Item.objects.all()
+        # Load exactly what the serializer for this role renders: the admin
+        # serializer needs every item's suppliers (one extra query per page
+        # instead of one per item), the customer one only three columns.
+        if self.action in self.read_actions:
+            if self.is_admin():
+                queryset = queryset.prefetch_related('suppliers')
+            else:
+                queryset = queryset.only('id', 'item_id', 'name', 'price')
         return queryset
 
-class SupplierDetailsViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            return Response({'error': f'Unsupported export format: {output}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer()
+        queryset = self.filter_queryset(self.get_queryset()).order_by('id')
+        logger.info(f'User {request.user} is exporting items as {output}')
+        rows = export_rows(queryset, serializer, settings.INVENTORY_EXPORT_CHUNK_SIZE)
+        response = StreamingHttpResponse(
+            export_lines(rows, list(serializer.fields), output),
+            content_type=EXPORT_FORMATS[output],
+        )
+        response['Content-Disposition'] = f'attachment; filename="items.{output}"'
+        return response
+
+    @action(detail=False, methods=['post', 'patch', 'delete'], url_path='bulk')
+    def bulk(self, request):
+        logger.info(f'User {request.user} is making a bulk {request.method} of items')
+        return bulk_response(request, create_items, update_items, delete_items)
+
+class SupplierDetailsViewSet(RowListMixin, viewsets.ModelViewSet):
     queryset = Supplier.objects.all()
     serializer_class = SupplierSerializer
     permission_classes = [IsAuthenticated, IsAdminUserOrReadOnlyForSuppliers]
@@ -42,6 +95,25 @@ class SupplierDetailsViewSet(viewsets.ModelViewSet):
         logger.info(f'User {request.user} is listing suppliers')
         return super().list(request, *args, **kwargs)
 
+    @action(detail=False, methods=['post', 'patch', 'delete'], url_path='bulk')
+    def bulk(self, request):
+        logger.info(f'User {request.user} is making a bulk {request.method} of suppliers')
+        return bulk_response(request, create_suppliers, update_suppliers, delete_suppliers)
+
+def bulk_response(request, create, update, delete):
+    # POST creates and PATCH updates the rows in the request body, DELETE
+    # removes the ids in it. Every row is checked first and nothing is
+    # written unless all of them are valid.
+    try:
+        if request.method == 'POST':
+            return Response({'created': len(create(request.data))}, status=status.HTTP_201_CREATED)
+        if request.method == 'PATCH':
+            return Response({'updated': len(update(request.data))}, status=status.HTTP_200_OK)
+        return Response({'deleted': delete(request.data)}, status=status.HTTP_200_OK)
+    except BulkError as e:
+        logger.error(f'Bulk {request.method} rejected: {e.errors}')
+        return Response({'errors': e.errors}, status=status.HTTP_400_BAD_REQUEST)
+
 @api_view(['POST'])
 def create_user(request):
     logger.info('Creating a new user')
@@ -56,47 +128,20 @@ def create_user(request):
 class PurchaseAPIView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = PurchaseSerializer
+    # Stock is checked against the primary, never a lagging replica.
+    read_from_primary = True
 
     def put(self, request):
         logger.info(f'User {request.user} is making a purchase')
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         purchases = serializer.validated_data['purchases']
-        bill = 0
-        errors = []
-        for purchase in purchases:
-            item_id = purchase['item_id']
-            quantity = purchase['quantity']
-
-            try:
-                item = Item.objects.get(pk=item_id)
-            except Item.DoesNotExist:
-                error_message = f'Item not found: {item_id}'
-                logger.error(error_message)
-                errors.append({'item_id': item_id, 'error': error_message})
-                continue
-
-            if quantity <= 0:
-                error_message = 'Quantity must be greater than zero'
-                logger.error(f'Item {item_id}: {error_message}')
-                errors.append({'item_id': item_id, 'error': error_message})
-                continue
-
-            if item.quantityInStock < quantity:
-                error_message = 'Not enough stock available'
-                logger.error(f'Item {item_id}: {error_message}')
-                errors.append({'item_id': item_id, 'error': error_message})
-                continue
-
-            # Update item stock and revenue
-            item.quantityInStock -= quantity
-            item.quantitySold += quantity
-            item.revenue += quantity * item.price
-            bill += quantity * item.price
-            item.save()
-
-        if errors:
-            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            bill = purchase_items(purchases, user=request.user)
+        except PurchaseConflict as e:
+            return Response({'errors': e.errors}, status=status.HTTP_409_CONFLICT)
+        except PurchaseError as e:
+            return Response({'errors': e.errors}, status=status.HTTP_400_BAD_REQUEST)
 
         logger.info(f'Purchase successful, Amount to pay: {bill}')
         return Response({
@@ -109,19 +154,164 @@ class StockReportAPIView(generics.GenericAPIView):
     permission_classes = [IsAdminUserOrReadOnlyForSuppliers]
     def get(self, request):
         logger.info('Generating stock report')
-        low_stock_items = Item.objects.filter(quantityInStock__lt=5)
-        most_sold_item_revenue = Item.objects.annotate(
-                total_revenue=ExpressionWrapper(
-                    F('quantitySold') * F('price'),
-                    output_field=FloatField()  
-                )
-            ).order_by('-total_revenue').first()
-        most_sold_item_quantity = Item.objects.order_by('-quantitySold').first()
-
-        context = {
-            'low_stock_items': low_stock_items,
-            'most_sold_item_revenue': most_sold_item_revenue,
-            'most_sold_item_quantity': most_sold_item_quantity,
-        }
+        context = get_report()
         logger.info('Stock report generated successfully')
         return render(request, 'inventory/stock_report.html', context)
+
+
+def cached_analytics(request, compute):
+    # Analytics answers are cached per URL for a short while: they come from
+    # buckets that every purchase changes, so they are allowed to lag behind
+    # by INVENTORY_ANALYTICS_CACHE_TIMEOUT seconds.
+    timeout = settings.INVENTORY_ANALYTICS_CACHE_TIMEOUT
+    key = 'analytics:' + hashlib.md5(request.get_full_path().encode()).hexdigest()
+    data = cache.get(key)
+    if data is None:
+        try:
+            data = compute()
+        except AnalyticsError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        cache.set(key, data, timeout)
+    response = Response(data)
+    patch_cache_control(response, private=True, max_age=timeout)
+    return response
+
+
+class SalesAnalyticsAPIView(generics.GenericAPIView):
+    permission_classes = [IsAdminUserOrReadOnlyForSuppliers]
+
+    def get(self, request):
+        logger.info(f'User {request.user} is reading sales analytics')
+
+        def compute():
+            start, end = parse_window(request.query_params)
+            try:
+                limit = min(max(int(request.query_params.get('limit', 10)), 1), 100)
+            except ValueError:
+                raise AnalyticsError('limit must be a number')
+            return sales_summary(start, end, limit)
+        return cached_analytics(request, compute)
+
+
+class ItemSalesAnalyticsAPIView(generics.GenericAPIView):
+    permission_classes = [IsAdminUserOrReadOnlyForSuppliers]
+
+    def get(self, request, pk):
+        logger.info(f'User {request.user} is reading sales analytics of item {pk}')
+        item = get_object_or_404(Item.objects.only('id', 'item_id', 'name'), pk=pk)
+
+        def compute():
+            start, end = parse_window(request.query_params)
+            return item_series(item, start, end, request.query_params.get('granularity'))
+        return cached_analytics(request, compute)
+
+
+def job_response(request, job):
+    # 202 while the job is queued or running, 200 once it has finished.
+    finished = job.status in (Job.SUCCEEDED, Job.FAILED)
+    response = Response(
+        JobSerializer(job, context={'request': request}).data,
+        status=status.HTTP_200_OK if finished else status.HTTP_202_ACCEPTED,
+    )
+    response['Location'] = reverse('job-detail', kwargs={'pk': job.pk})
+    return response
+
+
+class StockReportJobAPIView(generics.GenericAPIView):
+    permission_classes = [IsAdminUserOrReadOnlyForSuppliers]
+
+    def post(self, request):
+        logger.info(f'User {request.user} is submitting a stock report job')
+        return job_response(request, submit_job('stock_report', {}, request.user))
+
+
+class ExportJobAPIView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        output = request.data.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            return Response({'error': f'Unsupported export format: {output}'}, status=status.HTTP_400_BAD_REQUEST)
+        logger.info(f'User {request.user} is submitting an export job as {output}')
+        params = {
+            'output': output,
+            'search': str(request.data.get('search', '')).strip(),
+            'admin': request.user.is_staff or request.user.is_superuser,
+        }
+        return job_response(request, submit_job('export', params, request.user))
+
+
+class ImportJobAPIView(generics.GenericAPIView):
+    permission_classes = [IsAdminUserOrReadOnlyForSuppliers]
+
+    def post(self, request):
+        uploaded = request.FILES.get('file')
+        if uploaded is None:
+            return Response({'error': 'Upload the file to import as "file"'}, status=status.HTTP_400_BAD_REQUEST)
+        output = import_format(uploaded.name)
+        if output not in IMPORT_FORMATS:
+            return Response({'error': f'Unsupported import format: {output}'}, status=status.HTTP_400_BAD_REQUEST)
+        logger.info(f'User {request.user} is submitting an import job for {uploaded.name}')
+        params = {
+            'path': save_upload(uploaded, output),
+            'format': output,
+            'dry_run': str(request.data.get('dry_run', '')).lower() in ('1', 'true'),
+        }
+        return job_response(request, submit_job('import', params, request.user))
+
+
+class JobDetailAPIView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def get_object(self):
+        # Users see their own jobs, admins every job.
+        jobs = Job.objects.all()
+        if not (self.request.user.is_staff or self.request.user.is_superuser):
+            jobs = jobs.filter(user_id=self.request.user.pk)
+        return get_object_or_404(jobs, pk=self.kwargs['pk'])
+
+    def get(self, request, pk):
+        return job_response(request, self.get_object())
+
+
+class JobResultAPIView(JobDetailAPIView):
+    def get(self, request, pk):
+        job = self.get_object()
+        if job.status != Job.SUCCEEDED:
+            return Response({'error': f'Job is {job.status}'}, status=status.HTTP_409_CONFLICT)
+        if 'file' not in job.result:
+            return Response(job.result)
+        try:
+            return FileResponse(open(job.result['file'], 'rb'), content_type=job.result['content_type'])
+        except FileNotFoundError:
+            return Response({'error': 'The job result has been pruned'}, status=status.HTTP_410_GONE)
+
+
+def metrics_authorized(request):
+    # Scrapers cannot refresh JWTs, so the metrics take a static bearer token
+    # when INVENTORY_METRICS_TOKEN is set. Without one they are for staff
+    # only, signed in or sending a JWT: /metrics/slow shows paths and SQL.
+    token = settings.INVENTORY_METRICS_TOKEN
+    if token:
+        return hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if request.user.is_staff:
+        return True
+    authenticators = [authentication() for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    try:
+        return Request(request, authenticators=authenticators).user.is_staff
+    except AuthenticationFailed:
+        return False
+
+
+@require_GET
+def metrics(request):
+    if not metrics_authorized(request):
+        return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@require_GET
+def slow_requests(request):
+    if not metrics_authorized(request):
+        return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+    return JsonResponse({'slow_requests': registry.slow_requests()})
@@ -24,10 +24,12 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/5.0/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY='django-insecure-77&brrh0wtq2n8jjo)5hx8wndx)(c%9qgugps*=8cgw58c_3$p'
+SECRET_KEY = os.getenv('DJANGO_SECRET_KEY', 'django-insecure-77&brrh0wtq2n8jjo)5hx8wndx)(c%9qgugps*=8cgw58c_3$p')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# Set DJANGO_DEBUG=True for development. Besides error pages, DEBUG keeps
+# every SQL statement of a request in memory.
+DEBUG = os.getenv('DJANGO_DEBUG', 'False') == 'True'
 
 
 
@@ -46,6 +48,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'inventory.middleware.RequestMetricsMiddleware',
+    'inventory.middleware.ReplicaRoutingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -59,8 +63,14 @@ MIDDLEWARE = [
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         # 'rest_framework.authentication.BasicAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    ]
+        'inventory.authentication.StatelessJWTAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'inventory.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'inventory.pagination.KeysetPagination',
+    'PAGE_SIZE': int(os.getenv('DJANGO_PAGE_SIZE', 100)),
 }
 
 ROOT_URLCONF = 'inventory_management.urls'
@@ -86,21 +96,72 @@ WSGI_APPLICATION = 'inventory_management.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
+# Each thread keeps its connection for DJANGO_DB_CONN_MAX_AGE seconds (0
+# closes it after every request) and checks it before reusing it. With
+# DJANGO_DB_POOL_SIZE set, the threads of a process share a pool of at most
+# that many connections per database instead (see inventory.pool): requests
+# take one and hand it back when they finish, waiting up to
+# INVENTORY_DB_POOL_TIMEOUT seconds for one to be handed back.
+
+INVENTORY_DB_POOL_SIZE = int(os.getenv('DJANGO_DB_POOL_SIZE', 0))
+INVENTORY_DB_POOL_TIMEOUT = float(os.getenv('DJANGO_DB_POOL_TIMEOUT', 10))
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': 'inventory.pooled_mysql' if INVENTORY_DB_POOL_SIZE else 'django.db.backends.mysql',
         'NAME': os.getenv('DJANGO_DB_NAME'),
         'USER': os.getenv('DJANGO_DB_USER'),
         'PASSWORD': os.getenv('DJANGO_DB_PASSWORD'),
         'HOST': os.getenv('DJANGO_DB_HOST'),  # Should match the service name in docker-compose
         'PORT': os.getenv('DJANGO_DB_PORT'),
+        'CONN_MAX_AGE': 0 if INVENTORY_DB_POOL_SIZE else int(os.getenv('DJANGO_DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
         'TEST': {
             'NAME': 'test_' + os.getenv('DJANGO_DB_NAME'),
         },
     }
 }
 
+# Read replicas of the default database, as a comma separated list of hosts
+# in DJANGO_DB_REPLICA_HOSTS. Each becomes a 'replicaN' alias that
+# inventory.routers sends reads to; writes always go to 'default'.
+for number, host in enumerate(filter(None, os.getenv('DJANGO_DB_REPLICA_HOSTS', '').split(',')), 1):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['inventory.routers.PrimaryReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Catalogue invalidations and revoked tokens are kept in the cache, so every
+# process serving the app must share it: set DJANGO_REDIS_URL (for example
+# redis://redis:6379/0) when running several workers. gunicorn.conf.py will
+# not start more than one with the local-memory cache, which is per process.
+
+if os.getenv('DJANGO_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['DJANGO_REDIS_URL'],
+            'KEY_PREFIX': 'inventory',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'inventory',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+# Seconds a cached catalogue response (GET /api/items/...) is kept.
+INVENTORY_CATALOGUE_CACHE_TIMEOUT = 300
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -145,9 +206,13 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 TEST_RUNNER = "pytest_runner.DjangoTestSuiteRunner"
     
-log_dir = Path(BASE_DIR) / 'logs'
-log_dir.mkdir(exist_ok=True)
+LOG_FILE = os.getenv('INVENTORY_LOG_FILE', os.path.join(BASE_DIR, 'logs', 'inventory.log'))
+Path(LOG_FILE).parent.mkdir(parents=True, exist_ok=True)
 
+# Loggers only queue their records: the 'queue' handler hands them to a
+# listener thread that writes them to the console and, as JSON lines, to a
+# rotating log file. Levels are set per logger; DJANGO_LOG_LEVEL and
+# INVENTORY_LOG_LEVEL override the defaults.
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -160,6 +225,9 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'inventory.log.JSONFormatter',
+        },
     },
     'handlers': {
         'console': {
@@ -167,18 +235,43 @@ LOGGING = {
             'class': 'logging.StreamHandler',
             'formatter': 'verbose',
         },
+        # Appended to by every worker process, so it is not rotated from
+        # here: rotate it with logrotate, which this handler notices and
+        # reopens the file after.
         'inventory_file': {
             'level': 'DEBUG',
-            'class': 'logging.FileHandler',
-            'filename': os.path.join(BASE_DIR, 'logs', 'inventory_debug.log'),
-            'formatter': 'verbose',
+            'class': 'logging.handlers.WatchedFileHandler',
+            'filename': LOG_FILE,
+            'encoding': 'utf-8',
+            'delay': True,
+            'formatter': 'json',
+        },
+        'queue': {
+            '()': 'inventory.log.QueueListenerHandler',
+            'handlers': ['cfg://handlers.console', 'cfg://handlers.inventory_file'],
+            'queue_size': 10000,
         },
     },
     'loggers': {
-        '': {  
-            'handlers': ['console', 'inventory_file'],
-            'level': 'DEBUG',
-            'propagate': False,
+        '': {
+            'handlers': ['queue'],
+            'level': os.getenv('DJANGO_LOG_LEVEL', 'INFO'),
+        },
+        'inventory': {
+            'level': os.getenv('INVENTORY_LOG_LEVEL', 'INFO'),
+        },
+        'Item': {
+            'level': os.getenv('INVENTORY_LOG_LEVEL', 'INFO'),
+        },
+        'Supplier': {
+            'level': os.getenv('INVENTORY_LOG_LEVEL', 'INFO'),
+        },
+        # Every SQL statement at DEBUG level.
+        'django.db.backends': {
+            'level': 'WARNING',
+        },
+        'django': {
+            'level': os.getenv('DJANGO_LOG_LEVEL', 'INFO'),
         },
     },
 }
@@ -193,8 +286,110 @@ SIMPLE_JWT = {
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    # Tokens carry username, is_staff and is_superuser, and requests are
+    # authorized from them without loading the user.
+    'TOKEN_OBTAIN_SERIALIZER': 'inventory.authentication.InventoryTokenObtainPairSerializer',
+    'TOKEN_USER_CLASS': 'inventory.authentication.InventoryTokenUser',
 }
 
+# Seconds each process may keep using its cached copy of the token denylist
+# after a revocation made elsewhere.
+INVENTORY_TOKEN_DENYLIST_CACHE_TIMEOUT = 30
+
+# Purchase engine: 'pessimistic' locks the basket's rows with SELECT ... FOR UPDATE,
+# 'optimistic' decrements stock with conditional UPDATEs and no prior read.
+# Baskets that lose a race are retried with exponential backoff (in seconds).
+INVENTORY_PURCHASE_MODE = os.getenv('INVENTORY_PURCHASE_MODE', 'pessimistic')
+INVENTORY_PURCHASE_MAX_ATTEMPTS = 5
+INVENTORY_PURCHASE_RETRY_BACKOFF = 0.01
+
+# Reorder threshold of items created without one: items with fewer units in
+# stock than their threshold are listed on the stock report.
+INVENTORY_LOW_STOCK_THRESHOLD = 5
+
+# Reorder alerts, sent by manage.py send_stock_alerts: 'log', 'file' (JSON
+# lines appended to INVENTORY_STOCK_ALERT_FILE), 'webhook' (POSTed to
+# INVENTORY_STOCK_ALERT_WEBHOOK_URL) or the dotted path of a sink class.
+INVENTORY_STOCK_ALERT_SINK = os.getenv('INVENTORY_STOCK_ALERT_SINK', 'log')
+INVENTORY_STOCK_ALERT_FILE = os.path.join(BASE_DIR, 'logs', 'stock_alerts.jsonl')
+INVENTORY_STOCK_ALERT_WEBHOOK_URL = os.getenv('INVENTORY_STOCK_ALERT_WEBHOOK_URL', '')
+INVENTORY_STOCK_ALERT_BATCH_SIZE = 1000
+
+# Item name search: 'auto' uses the FULLTEXT index on MySQL and the trigram
+# index everywhere else, or give the dotted path of a backend class.
+INVENTORY_SEARCH_BACKEND = os.getenv('INVENTORY_SEARCH_BACKEND', 'auto')
+
+# Rows fetched per database round trip by the streaming item export.
+INVENTORY_EXPORT_CHUNK_SIZE = 2000
+
+# Bulk endpoints: rows accepted per request, and rows per INSERT/UPDATE statement.
+INVENTORY_BULK_MAX_ROWS = 10000
+INVENTORY_BULK_BATCH_SIZE = 500
+
+# Rows upserted per transaction (and per checkpoint) by manage.py import_items.
+INVENTORY_IMPORT_CHUNK_SIZE = 2000
+
+# Background jobs (manage.py run_workers): where results and uploads are
+# kept, worker processes (0 for one per core), seconds an idle worker waits
+# before polling again, seconds identical stock report and export jobs share
+# a result, seconds between heartbeats of a running job, and seconds without
+# one before a running job is presumed lost and retried.
+INVENTORY_JOB_DIR = os.getenv('INVENTORY_JOB_DIR', os.path.join(BASE_DIR, 'jobs'))
+INVENTORY_JOB_WORKERS = int(os.getenv('INVENTORY_JOB_WORKERS', 0))
+INVENTORY_JOB_POLL_INTERVAL = 1.0
+INVENTORY_JOB_RESULT_TIMEOUT = 300
+INVENTORY_JOB_HEARTBEAT_INTERVAL = 10
+INVENTORY_JOB_TIMEOUT = 60
+INVENTORY_JOB_MAX_ATTEMPTS = 3
+
+# Request metrics (GET /metrics): a Server-Timing header on every response
+# (with DEBUG only by default, as it tells any client how long its queries took),
+# the bearer token scrapers must send (without one only staff users get the
+# metrics), and
+# requests slower than INVENTORY_SLOW_REQUEST_SECONDS sampled with their SQL
+# at /metrics/slow, keeping the slowest INVENTORY_SLOW_REQUEST_SAMPLES with
+# at most INVENTORY_SLOW_REQUEST_MAX_STATEMENTS statements each.
+INVENTORY_SERVER_TIMING = os.getenv('INVENTORY_SERVER_TIMING', str(DEBUG)) == 'True'
+INVENTORY_METRICS_TOKEN = os.getenv('INVENTORY_METRICS_TOKEN', '')
+INVENTORY_SLOW_REQUEST_SECONDS = 1.0
+INVENTORY_SLOW_REQUEST_SAMPLES = 20
+INVENTORY_SLOW_REQUEST_MAX_STATEMENTS = 20
+
+# Metrics are kept per process. When several processes serve the app (see
+# gunicorn.conf.py), each also writes its metrics to a file in
+# INVENTORY_METRICS_DIR, at most every INVENTORY_METRICS_FLUSH_INTERVAL
+# seconds, and /metrics adds them all up.
+INVENTORY_METRICS_DIR = os.getenv('INVENTORY_METRICS_DIR', '')
+INVENTORY_METRICS_FLUSH_INTERVAL = 5
+
+# Database aliases reads may be sent to (see DATABASES above). A replica more
+# than INVENTORY_DB_REPLICA_MAX_LAG seconds behind (MySQL only) or unreachable
+# is left out until a check, at most every INVENTORY_DB_REPLICA_CHECK_INTERVAL
+# seconds, finds it healthy again; with none healthy, reads go to the primary.
+# Clients read from the primary for INVENTORY_DB_REPLICA_MAX_LAG seconds after
+# they wrote, and so does everyone for catalogue pages changed within that time.
+INVENTORY_DB_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+INVENTORY_DB_REPLICA_MAX_LAG = float(os.getenv('INVENTORY_DB_REPLICA_MAX_LAG', 5))
+INVENTORY_DB_REPLICA_CHECK_INTERVAL = 10
+
+# Item and supplier lists are read with values() and rendered by a field
+# plan of their serializer (see inventory.rows). Set to False to go through
+# the serializers for every row instead; the output is the same.
+INVENTORY_ROW_SERIALIZERS = True
+
+# Ledger lines folded into the hourly sales buckets per transaction by
+# manage.py rollup_sales.
+INVENTORY_SALES_ROLLUP_BATCH_SIZE = 5000
+
+# Purchases add to the hourly and daily sales buckets as they happen. Set to
+# False to leave that to rollup_sales and keep the purchase path insert-only.
+INVENTORY_SALES_ROLLUP_ON_PURCHASE = True
+
+# Seconds the sales analytics endpoints cache an answer for, and the most
+# points a per-item series may have.
+INVENTORY_ANALYTICS_CACHE_TIMEOUT = 60
+INVENTORY_ANALYTICS_MAX_POINTS = 2000
+
 ALLOWED_HOSTS = [ "*" ]
 
 CORS_ALLOW_ALL_ORIGINS = True
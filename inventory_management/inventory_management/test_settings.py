@@ -0,0 +1,8 @@
+import os
+import tempfile
+
+# The test suite logs to a temporary directory instead of logs/ in the
+# source tree.
+os.environ.setdefault('INVENTORY_LOG_FILE', os.path.join(tempfile.mkdtemp(prefix='inventory-tests-'), 'inventory.log'))
+
+from .settings import *  # noqa: E402,F401,F403